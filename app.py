@@ -2,11 +2,14 @@
 # Imports
 # ----------------------------------------------------------------------------#
 import sys
+import importlib
 import json
-import dateutil.parser
-import babel
+import statistics
+import subprocess
 from flask import (
+    Blueprint,
     Flask,
+    current_app,
     render_template,
     request,
     Response,
@@ -15,29 +18,83 @@ from flask import (
     url_for,
     abort,
     jsonify,
+    make_response,
+    session,
+    _request_ctx_stack,
 )
 from flask_moment import Moment
-from flask_sqlalchemy import SQLAlchemy
 import logging
 from logging import Formatter, FileHandler
-from flask_wtf import Form
-from forms import *
 from flask_migrate import Migrate
-from sqlalchemy.orm import load_only
-from sqlalchemy import distinct
+from sqlalchemy.orm import joinedload, load_only
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import IntegrityError, OperationalError
 import datetime
-
-from models import Venue, Venue_Genre, Artist, Artist_Genre, Show
+import functools
+import hashlib
+import timeit
+from itertools import groupby
+from operator import itemgetter
+import click
+
+from models import db, Venue, Venue_Genre, Artist, Artist_Genre, Show
+from search import build_search_document, rebuild_search_index, search_catalog
+from counters import record_new_show, refresh_show_counters, roll_past_shows
+from query_plans import captured_statements, explain, table_scans
+from archive import archive_shows, shows_with_archive
+from page_cache import PageCache
+from assets import build_assets, register_assets
+from genres import GENRE_MATCHES, GENRE_NAMES, genre_mask, sync_genres
+from scheduling import DEFAULT_SHOW_DURATION, conflicting_shows
+from tombstones import (
+    deletion_status,
+    live,
+    purge_venue,
+    tombstone_venue,
+    venues_being_deleted,
+)
+from pooling import (
+    apply_statement_timeouts,
+    checkout_metrics,
+    engine_options,
+    is_statement_timeout,
+    statement_timeout,
+)
+from replicas import READ_PRIMARY_ENVIRON, ReplicaRouter, copy_sqlite_database
+from jobs import JOB_HANDLERS, Worker, enqueue, job_handler, job_stats
+from facets import (
+    FACETS,
+    entity_facet_values,
+    facet_counts,
+    facet_criterion,
+    rebuild_facet_counts,
+    update_facet_counts,
+)
 
 # ----------------------------------------------------------------------------#
 # App Config.
 # ----------------------------------------------------------------------------#
 
-app = Flask(__name__)
-moment = Moment(app)
-app.config.from_object("config")
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
+# Extensions are created unbound; create_app() attaches them to the app. The
+# views are registered on the `main` blueprint, so their endpoints are named
+# main.<view>. `db` is the one SQLAlchemy instance, defined in models.py.
+moment = Moment()
+migrate = Migrate()
+replicas = ReplicaRouter()
+page_cache = PageCache()
+views = Blueprint("main", __name__, cli_group=None)
+
+apply_statement_timeouts(db.session)
+
+# Modules that only some views and commands need, imported where they are
+# used so that a worker starts without them. The gunicorn master imports them
+# before forking (see gunicorn.conf.py), so that workers share them.
+LAZY_MODULES = ["babel.dates", "dateutil.parser", "forms", "importer", "mock_data_gen"]
+
+
+def import_lazy_modules():
+    for name in LAZY_MODULES:
+        importlib.import_module(name)
 
 
 # ----------------------------------------------------------------------------#
@@ -45,23 +102,387 @@ migrate = Migrate(app, db)
 # ----------------------------------------------------------------------------#
 
 
-def format_datetime(value, format="medium"):
-    date = dateutil.parser.parse(value)
-    if format == "full":
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == "medium":
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format)
+DATETIME_FORMATS = {
+    "full": "EEEE MMMM, d, y 'at' h:mma",
+    "medium": "EE MM, dd, y h:mma",
+}
+
+
+@functools.lru_cache(maxsize=None)
+def compile_datetime_format(format, locale):
+    """Parse a babel pattern and its locale once per (format, locale)."""
+    import babel.dates
+
+    pattern = babel.dates.parse_pattern(DATETIME_FORMATS.get(format, format))
+    return pattern, babel.Locale.parse(locale or babel.dates.LC_TIME)
+
+
+# Recurring shows share start times, so rendered values are memoized.
+@views.app_template_filter("datetime")
+@functools.lru_cache(maxsize=4096)
+def format_datetime(value, format="medium", locale=None):
+    import babel.dates
+
+    # Legacy callers still pass start times as strings.
+    if isinstance(value, str):
+        import dateutil.parser
+
+        value = dateutil.parser.parse(value)
+
+    # Like babel.dates.format_datetime, naive datetimes are read as UTC.
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=babel.dates.UTC)
+
+    pattern, parsed_locale = compile_datetime_format(format, locale)
+    return pattern.apply(value, parsed_locale)
+
+
+# ----------------------------------------------------------------------------#
+# Detail pages.
+# ----------------------------------------------------------------------------#
+
+# For each entity with a detail page: the model on the other side of its shows,
+# the Show columns pointing at the entity and at that counterpart, and the
+# prefix the templates use for the counterpart's fields.
+DETAIL_PAGE_COUNTERPARTS = {
+    Venue: (Artist, "venue_id", "artist_id", "artist"),
+    Artist: (Venue, "artist_id", "venue_id", "venue"),
+}
+
+
+def load_detail_page(model, entity_id):
+    """Load a venue or artist with its genres and shows in two queries.
+
+    Returns None if the entity does not exist, otherwise a tuple of
+    (entity, genres, past_shows, upcoming_shows) where the shows are the dicts
+    rendered by the detail templates.
+    """
+    entity = (
+        db.session.query(model)
+        .options(joinedload(model.genres))
+        .filter(model.id == entity_id, live(model))
+        .one_or_none()
+    )
+
+    if entity is None:
+        return None
+
+    counterpart, own_key, counterpart_key, prefix = DETAIL_PAGE_COUNTERPARTS[model]
+
+    # Past shows may live in either the hot table or the archive.
+    all_shows = shows_with_archive(lambda model: getattr(model, own_key) == entity_id)
+
+    shows = (
+        db.session.query(
+            all_shows.c.start_time,
+            counterpart.id,
+            counterpart.name,
+            counterpart.image_link,
+        )
+        .select_from(all_shows)
+        .join(counterpart, counterpart.id == all_shows.c[counterpart_key])
+        .filter(live(counterpart))
+        .order_by(all_shows.c.start_time)
+        .all()
+    )
+
+    now = datetime.datetime.now()
+
+    past_shows = []
+    upcoming_shows = []
+    for start_time, counterpart_id, name, image_link in shows:
+        show_data = {
+            prefix + "_id": counterpart_id,
+            prefix + "_name": name,
+            prefix + "_image_link": image_link,
+            "start_time": start_time,
+        }
+        if start_time < now:
+            past_shows.append(show_data)
+        else:
+            upcoming_shows.append(show_data)
+
+    genres = [item.genre for item in entity.genres]
+
+    return entity, genres, past_shows, upcoming_shows
+
+
+# ----------------------------------------------------------------------------#
+# Search.
+# ----------------------------------------------------------------------------#
+
+
+def search_results(model, search_term):
+    """Results of /venues/search or /artists/search, as the templates render them.
+
+    Each hit's number of upcoming shows is the counter maintained on its row
+    (see counters.py), so the whole search is the one search_catalog query.
+    """
+    try:
+        hits = search_catalog(db.session, model, search_term)
+    except OperationalError as error:
+        if not is_statement_timeout(error):
+            raise
+        db.session.rollback()
+        flash("That search took too long. Please try a more specific term.")
+        hits = []
+
+    return {
+        "count": len(hits),
+        "data": [
+            {
+                "id": hit.id,
+                "name": hit.name,
+                "num_upcoming_shows": hit.upcoming_shows_count,
+            }
+            for hit in hits
+        ],
+    }
+
+
+# ----------------------------------------------------------------------------#
+# Conditional requests.
+# ----------------------------------------------------------------------------#
+
+
+def as_utc(value, naive_is_utc):
+    if value is None:
+        return None
+    if naive_is_utc:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    # Show start times are naive local time.
+    return value.astimezone(datetime.timezone.utc)
+
+
+def detail_page_validator(model, entity_id):
+    """Return (etag, last_modified) for a venue or artist page, or None.
+
+    Everything that changes the page bumps the entity's updated_at: edits,
+    new shows and counter refreshes (counters.py), archiving, tombstoned
+    venues and edits of a counterpart it has shows with. The one exception is
+    a show starting and moving from upcoming to past, which next_show_at
+    records until the counters are rolled. So this is a single primary-key read.
+    """
+    entity = (
+        db.session.query(model.updated_at, model.next_show_at)
+        .filter(model.id == entity_id, live(model))
+        .first()
+    )
+
+    if entity is None:
+        return None
+
+    started = entity.next_show_at
+    if started is not None and started > datetime.datetime.now():
+        started = None
+
+    changes = [
+        as_utc(entity.updated_at, naive_is_utc=True),
+        as_utc(started, naive_is_utc=False),
+    ]
+
+    etag = hashlib.md5(repr(changes).encode()).hexdigest()
+    last_modified = max(change for change in changes if change is not None)
+
+    return etag, last_modified.replace(microsecond=0)
+
+
+def conditional_detail_page(model, id_arg):
+    """Answer If-None-Match / If-Modified-Since on a detail page with a 304.
+
+    The validator is computed before the wrapped view runs, so a revalidation
+    costs one primary-key read and no rendering.
+    """
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**view_args):
+            # Pages with pending flashed messages are never validated.
+            if "_flashes" in session:
+                return view(**view_args)
+
+            validator = detail_page_validator(model, view_args[id_arg])
+            if validator is None:
+                return view(**view_args)
+
+            etag, last_modified = validator
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            elif request.if_modified_since:
+                if_modified_since = request.if_modified_since
+                if if_modified_since.tzinfo is None:
+                    if_modified_since = as_utc(if_modified_since, naive_is_utc=True)
+                not_modified = last_modified <= if_modified_since
+            else:
+                not_modified = False
+
+            if not_modified:
+                response = make_response("", 304)
+            else:
+                response = make_response(view(**view_args))
+                if response.status_code != 200 or _request_ctx_stack.top.flashes:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+# ----------------------------------------------------------------------------#
+# Page cache invalidation.
+# ----------------------------------------------------------------------------#
+
+# For venues and artists: the cached listing endpoint, the cached detail
+# endpoint and the name of the detail endpoint's id argument.
+CACHED_PAGES = {
+    Venue: ("main.venues", "main.show_venue", "venue_id"),
+    Artist: ("main.artists", "main.show_artist", "artist_id"),
+}
+
+
+def played_counterparts(model, entity_id):
+    """Ids of the artists a venue has shows with, or of the venues an artist has."""
+    _, own_key, counterpart_key, _ = DETAIL_PAGE_COUNTERPARTS[model]
+    all_shows = shows_with_archive(lambda show: getattr(show, own_key) == entity_id)
+
+    counterparts = db.session.query(all_shows.c[counterpart_key]).distinct()
+
+    return [counterpart_id for (counterpart_id,) in counterparts]
+
+
+def touch(model, entity_ids):
+    """Bump updated_at of venues or artists in the open transaction."""
+    if entity_ids:
+        db.session.query(model).filter(model.id.in_(entity_ids)).update(
+            {model.updated_at: datetime.datetime.utcnow()}, synchronize_session=False
+        )
+
+
+def purge_entity_pages(model, entity_id, counterpart_ids):
+    """Purge every cached page that renders venue or artist `entity_id`.
+
+    That is its listing, its detail page, the shows board and the detail pages
+    of the counterparts it has shows with.
+    """
+    listing, detail, id_arg = CACHED_PAGES[model]
+    _, counterpart_detail, counterpart_id_arg = CACHED_PAGES[
+        DETAIL_PAGE_COUNTERPARTS[model][0]
+    ]
 
+    page_cache.purge(listing)
+    page_cache.purge(detail, **{id_arg: entity_id})
+    page_cache.purge("main.shows")
+    for counterpart_id in counterpart_ids:
+        page_cache.purge(counterpart_detail, **{counterpart_id_arg: counterpart_id})
+
+
+# ----------------------------------------------------------------------------#
+# Jobs.
+# ----------------------------------------------------------------------------#
+
+# Work that views and schedulers hand to `flask worker` (see jobs.py).
+
+COUNTED_LISTINGS = {"venues": Venue, "artists": Artist}
+
+
+@job_handler("purge_venue")
+def purge_venue_job(session, venue_id):
+    """Remove a tombstoned venue's rows; each batch commits on its own."""
+    for _ in purge_venue(session, venue_id):
+        pass
+
+
+@job_handler("refresh_show_counters")
+def refresh_show_counters_job(session, listing, ids=None):
+    model = COUNTED_LISTINGS[listing]
+    refresh_show_counters(session, model, None if ids is None else model.id.in_(ids))
+
+
+@job_handler("roll_past_shows")
+def roll_past_shows_job(session):
+    roll_past_shows(session)
+
+
+@job_handler("rebuild_search_index")
+def rebuild_search_index_job(session):
+    rebuild_search_index(session.connection())
+
+
+@job_handler("archive_shows")
+def archive_shows_job(session, older_than_days=90, batch_size=1000):
+    cutoff = datetime.datetime.now() - datetime.timedelta(days=older_than_days)
+    for _ in archive_shows(session, cutoff, batch_size):
+        pass
+
+
+@job_handler("warm_page")
+def warm_page_job(session, path):
+    """Render a page into the shared page cache ahead of its next visitor."""
+    client = current_app.test_client()
+    client.get(path, environ_base={READ_PRIMARY_ENVIRON: True})
+
+
+def warm_pages_later(*pages):
+    """Queue re-rendering of purged (endpoint, view args) pages, and commit.
+
+    Pages are only worth warming when the worker shares their cache with the
+    web processes. Warming is an optimization, so it is queued after the
+    pages are purged rather than in the transaction that changed them.
+    """
+    if not current_app.config["SHARED_CACHE_PATH"] or page_cache.ttl <= 0:
+        return
+
+    try:
+        for endpoint, view_args in pages:
+            path = url_for(endpoint, **view_args)
+            enqueue(db.session, "warm_page", {"path": path}, dedup_key=f"warm:{path}")
+        db.session.commit()
+    except:
+        db.session.rollback()
+        print(sys.exc_info())
+
+
+# ----------------------------------------------------------------------------#
+# Facets.
+# ----------------------------------------------------------------------------#
+
+SEEKING_LABELS = {Venue: "Seeking talent", Artist: "Seeking venues"}
+
+
+def requested_facets(model):
+    """Facet selection and counts for /venues or /artists.
+
+    The selection comes from the query string, e.g.
+    ?state=CA&city=San Francisco, CA&genre=Jazz&genre=Folk&match=any&seeking=yes
+    """
+    selected = {facet: request.args.getlist(facet) for facet in FACETS}
+    selected["genre"] = [genre for genre in selected["genre"] if genre in GENRE_NAMES]
+
+    match = request.args.get("match", "all")
+    if match not in GENRE_MATCHES:
+        match = "all"
+
+    return {
+        "selected": selected,
+        "match": match,
+        "criterion": facet_criterion(model, selected, match),
+        "counts": facet_counts(db.session, model),
+        "seeking_label": SEEKING_LABELS[model],
+    }
 
-app.jinja_env.filters["datetime"] = format_datetime
 
 # ----------------------------------------------------------------------------#
 # Controllers.
 # ----------------------------------------------------------------------------#
 
 
-@app.route("/")
+@views.route("/")
 def index():
     return render_template("pages/home.html")
 
@@ -70,38 +491,37 @@ def index():
 #  ----------------------------------------------------------------
 
 
-@app.route("/venues")
+@views.route("/venues")
+@replicas.reads
+@page_cache.cached
 def venues():
 
     response_data = []
+    filters = {}
 
     try:
-        venue_locations = db.session.query(distinct(Venue.city), Venue.state).all()
-
-        today = datetime.datetime.now()
-
-        for location in venue_locations:
-            city = location[0]
-            state = location[1]
-
+        filters = requested_facets(Venue)
+        # Venues in the same city/state come out next to each other, with their
+        # maintained upcoming show counter read straight from the row.
+        venue_query = db.session.query(
+            Venue.id,
+            Venue.name,
+            Venue.city,
+            Venue.state,
+            Venue.upcoming_shows_count,
+        ).filter(live(Venue))
+        if filters["criterion"] is not None:
+            venue_query = venue_query.filter(filters["criterion"])
+        venue_rows = venue_query.order_by(Venue.state, Venue.city, Venue.id).all()
+
+        for (city, state), rows in groupby(venue_rows, key=itemgetter(2, 3)):
             location_data = {"city": city, "state": state, "venues": []}
 
-            venues = Venue.query.filter_by(city=city, state=state).all()
-
-            for venue in venues:
-                venue_name = venue.name
-                venue_id = venue.id
-
-                upcoming_shows = (
-                    Show.query.filter_by(venue_id=venue_id)
-                    .filter(Show.start_time > today)
-                    .all()
-                )
-
+            for venue_id, venue_name, _, _, num_upcoming_shows in rows:
                 venue_data = {
                     "id": venue_id,
                     "name": venue_name,
-                    "num_upcoming_shows": len(upcoming_shows),
+                    "num_upcoming_shows": num_upcoming_shows,
                 }
 
                 location_data["venues"].append(venue_data)
@@ -115,82 +535,40 @@ def venues():
         return render_template("pages/home.html")
 
     finally:
-        return render_template("pages/venues.html", areas=response_data)
+        return render_template(
+            "pages/venues.html", areas=response_data, filters=filters
+        )
 
 
 # Done
-@app.route("/venues/search", methods=["POST"])
+@views.route("/venues/search", methods=["POST"])
+@statement_timeout("SEARCH_STATEMENT_TIMEOUT_MS")
+@replicas.reads
 def search_venues():
-    search_query = request.form.get("search_term", "")
-
-    search_response = {"count": 0, "data": []}
-
-    fields = ["id", "name"]
-    venue_search_results = (
-        db.session.query(Venue)
-        .filter(Venue.name.ilike(f"%{search_query}%"))
-        .options(load_only(*fields))
-        .all()
-    )
-
-    search_response["count"] = len(venue_search_results)
-
-    for result in venue_search_results:
-        item = {
-            "id": result.id,
-            "name": result.name,
-        }
-        search_response["data"].append(item)
+    search_term = request.form.get("search_term", "")
 
     return render_template(
         "pages/search_venues.html",
-        results=search_response,
-        search_term=request.form.get("search_term", ""),
+        results=search_results(Venue, search_term),
+        search_term=search_term,
     )
 
 
 # Done
-@app.route("/venues/<int:venue_id>")
+@views.route("/venues/<int:venue_id>")
+@replicas.reads
+@conditional_detail_page(Venue, "venue_id")
+@page_cache.cached
 def show_venue(venue_id):
     data = {}
 
     try:
-        requested_venue = Venue.query.get(venue_id)
+        details = load_detail_page(Venue, venue_id)
 
-        if requested_venue is None:
+        if details is None:
             return not_found_error(404)
 
-        genres = []
-        for item in requested_venue.genres:
-            genres.append(item.genre)
-
-        shows = Show.query.filter_by(venue_id=venue_id)
-
-        today = datetime.datetime.now()
-
-        raw_past_shows = shows.filter(Show.start_time < today).all()
-        past_shows = []
-        for show in raw_past_shows:
-            artist = Artist.query.get(show.artist_id)
-            show_data = {
-                "artist_id": artist.id,
-                "artist_name": artist.name,
-                "artist_image_link": artist.image_link,
-                "start_time": str(show.start_time),
-            }
-            past_shows.append(show_data)
-
-        raw_upcoming_shows = shows.filter(Show.start_time >= today).all()
-        upcoming_shows = []
-        for show in raw_upcoming_shows:
-            artist = Artist.query.get(show.artist_id)
-            show_data = {
-                "artist_id": artist.id,
-                "artist_name": artist.name,
-                "artist_image_link": artist.image_link,
-                "start_time": str(show.start_time),
-            }
-            upcoming_shows.append(show_data)
+        requested_venue, genres, past_shows, upcoming_shows = details
 
         data = {
             "id": requested_venue.id,
@@ -224,14 +602,16 @@ def show_venue(venue_id):
 #  ----------------------------------------------------------------
 
 
-@app.route("/venues/create", methods=["GET"])
+@views.route("/venues/create", methods=["GET"])
 def create_venue_form():
+    from forms import VenueForm
+
     form = VenueForm()
     return render_template("forms/new_venue.html", form=form)
 
 
 # Done
-@app.route("/venues/create", methods=["POST"])
+@views.route("/venues/create", methods=["POST"])
 def create_venue_submission():
 
     try:
@@ -250,16 +630,22 @@ def create_venue_submission():
             address=address,
             phone=phone,
             facebook_link=facebook_link,
+            search_document=build_search_document(name, city, state, genres),
+            genre_mask=genre_mask(genres),
         )
 
         genres_for_this_venue = []
-        for genre in genres:
+        for genre in dict.fromkeys(genres):
             current_genre = Venue_Genre(genre=genre)
             current_genre.venue = new_venue
             genres_for_this_venue.append(current_genre)
 
         db.session.add(new_venue)
+        update_facet_counts(
+            db.session, Venue, added=entity_facet_values(Venue, new_venue)
+        )
         db.session.commit()
+        page_cache.purge("main.venues")
 
         db.session.refresh(new_venue)
         flash("Venue " + new_venue.name + " was successfully listed!")
@@ -278,13 +664,42 @@ def create_venue_submission():
         return render_template("pages/home.html")
 
 
-@app.route("/venues/<venue_id>/delete", methods=["POST"])
+@views.route("/venues/<venue_id>/delete", methods=["POST"])
 def delete_venue(venue_id):
-    venue_name = Venue.query.get(venue_id).name
     try:
-        venue_to_be_deleted = db.session.query(Venue).filter(Venue.id == venue_id)
-        venue_to_be_deleted.delete()
+        venue_to_be_deleted = Venue.query.filter(
+            Venue.id == venue_id, live(Venue)
+        ).first()
+        if venue_to_be_deleted is None:
+            return not_found_error(404)
+        venue_name = venue_to_be_deleted.name
+
+        # The venue is only tombstoned here, which hides it at once; its shows
+        # and genres are removed by `flask worker` (see tombstones.py).
+        affected_artist_ids = played_counterparts(Venue, venue_id)
+        update_facet_counts(
+            db.session,
+            Venue,
+            removed=entity_facet_values(Venue, venue_to_be_deleted),
+        )
+        tombstone_venue(venue_to_be_deleted)
+        db.session.add(venue_to_be_deleted)
+        # Its shows stop counting for its artists now, not when they are purged.
+        db.session.flush()
+        if affected_artist_ids:
+            refresh_show_counters(
+                db.session, Artist, Artist.id.in_(affected_artist_ids)
+            )
+        # Queued with the tombstone, so the purge cannot be lost.
+        enqueue(
+            db.session,
+            "purge_venue",
+            {"venue_id": int(venue_id)},
+            dedup_key=f"purge_venue:{venue_id}",
+        )
         db.session.commit()
+        purge_entity_pages(Venue, int(venue_id), affected_artist_ids)
+        warm_pages_later(("main.venues", {}), ("main.shows", {}))
         flash("Venue: " + venue_name + " was successfully deleted.")
 
     except:
@@ -298,7 +713,7 @@ def delete_venue(venue_id):
 
     finally:
         db.session.close()
-        return redirect(url_for("index"))
+        return redirect(url_for("main.index"))
 
     # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
     # clicking that button delete it from the db then redirect the user to the homepage
@@ -306,92 +721,59 @@ def delete_venue(venue_id):
     # ----------------------- My solution to this was to redirect on the frontend window.location.href = response.url because I couldn't get my redirection to work properly on the backend.
 
 
+@views.route("/venues/<int:venue_id>/deletion")
+def venue_deletion_status(venue_id):
+    status = deletion_status(db.session, venue_id)
+    if status is None:
+        return jsonify({"errorMessage": "This venue is not being deleted."}), 404
+    return jsonify(status)
+
+
 #  Artists
 #  ----------------------------------------------------------------
-@app.route("/artists")
+@views.route("/artists")
+@replicas.reads
+@page_cache.cached
 def artists():
     fields = ["id", "name"]
-    artists_data = db.session.query(Artist).options(load_only(*fields)).all()
+    filters = requested_facets(Artist)
+
+    artist_query = db.session.query(Artist).options(load_only(*fields))
+    if filters["criterion"] is not None:
+        artist_query = artist_query.filter(filters["criterion"])
+    artists_data = artist_query.all()
 
-    return render_template("pages/artists.html", artists=artists_data)
+    return render_template("pages/artists.html", artists=artists_data, filters=filters)
 
 
 # Done
-@app.route("/artists/search", methods=["POST"])
+@views.route("/artists/search", methods=["POST"])
+@statement_timeout("SEARCH_STATEMENT_TIMEOUT_MS")
+@replicas.reads
 def search_artists():
-    search_query = request.form.get("search_term", "")
-
-    search_response = {"count": 0, "data": []}
-
-    fields = ["id", "name"]
-    artist_search_results = (
-        db.session.query(Artist)
-        .filter(Artist.name.ilike(f"%{search_query}%"))
-        .options(load_only(*fields))
-        .all()
-    )
-
-    num_upcoming_shows = 0
-
-    search_response["count"] = len(artist_search_results)
-
-    for result in artist_search_results:
-        item = {
-            "id": result.id,
-            "name": result.name,
-            "num_upcoming_shows": num_upcoming_shows,
-        }
-        search_response["data"].append(item)
+    search_term = request.form.get("search_term", "")
 
     return render_template(
         "pages/search_artists.html",
-        results=search_response,
-        search_term=request.form.get("search_term", ""),
+        results=search_results(Artist, search_term),
+        search_term=search_term,
     )
 
 
-@app.route("/artists/<int:artist_id>")
+@views.route("/artists/<int:artist_id>")
+@replicas.reads
+@conditional_detail_page(Artist, "artist_id")
+@page_cache.cached
 def show_artist(artist_id):
     data = {}
 
     try:
-        requested_artist = Artist.query.get(artist_id)
+        details = load_detail_page(Artist, artist_id)
 
-        if requested_artist is None:
+        if details is None:
             return not_found_error(404)
-            # Figure out a better way to do this
 
-        genres = []
-        for item in requested_artist.genres:
-            genres.append(item.genre)
-
-        shows = Show.query.filter_by(artist_id=artist_id)
-
-        today = datetime.datetime.now()
-
-        raw_past_shows = shows.filter(Show.start_time < today).all()
-        past_shows = []
-        for show in raw_past_shows:
-            venue = Venue.query.get(show.venue_id)
-            show_data = {
-                "venue_id": venue.id,
-                "venue_name": venue.name,
-                "venue_image_link": venue.image_link,
-                "start_time": str(show.start_time),
-            }
-            past_shows.append(show_data)
-
-        raw_upcoming_shows = shows.filter(Show.start_time >= today).all()
-        upcoming_shows = []
-        for show in raw_upcoming_shows:
-            venue = Venue.query.get(show.venue_id)
-            show_data = {
-                "venue_id": venue.id,
-                "venue_name": venue.name,
-                "venue_image_link": venue.image_link,
-                "start_time": str(show.start_time),
-            }
-            upcoming_shows.append(show_data)
+        requested_artist, genres, past_shows, upcoming_shows = details
 
         data = {
             "id": requested_artist.id,
@@ -421,8 +803,10 @@ def show_artist(artist_id):
 
 #  Update
 #  ----------------------------------------------------------------
-@app.route("/artists/<int:artist_id>/edit", methods=["GET"])
+@views.route("/artists/<int:artist_id>/edit", methods=["GET"])
 def edit_artist(artist_id):
+    from forms import ArtistForm
+
     form = ArtistForm()
 
     data = {}
@@ -455,7 +839,7 @@ def edit_artist(artist_id):
     except:
         print(sys.exc_info())
         flash("Something went wrong. Please try again.")
-        return redirect(url_for("index"))
+        return redirect(url_for("main.index"))
 
     finally:
         db.session.close()
@@ -463,7 +847,7 @@ def edit_artist(artist_id):
     return render_template("forms/edit_artist.html", form=form, artist=data)
 
 
-@app.route("/artists/<int:artist_id>/edit", methods=["POST"])
+@views.route("/artists/<int:artist_id>/edit", methods=["POST"])
 def edit_artist_submission(artist_id):
     try:
         artist_to_be_updated = Artist.query.get(artist_id)
@@ -471,6 +855,8 @@ def edit_artist_submission(artist_id):
         if artist_to_be_updated is None:
             return not_found_error(404)
 
+        facets_before = entity_facet_values(Artist, artist_to_be_updated)
+
         name = request.form.get("name")
         city = request.form.get("city")
         state = request.form.get("state")
@@ -483,16 +869,29 @@ def edit_artist_submission(artist_id):
         artist_to_be_updated.state = state
         artist_to_be_updated.phone = phone
         artist_to_be_updated.facebook_link = facebook_link
+        # Genre rows live in their own table, so touch the artist explicitly.
+        artist_to_be_updated.updated_at = datetime.datetime.utcnow()
+        artist_to_be_updated.search_document = build_search_document(
+            name, city, state, genres
+        )
+        artist_to_be_updated.genre_mask = genre_mask(genres)
         artist_to_be_updated.image_link = "https://images.unsplash.com/photo-1549213783-8284d0336c4f?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=300&q=80"
 
-        genres_for_this_artist = []
-        for genre in genres:
-            current_genre = Artist_Genre(genre=genre)
-            current_genre.artist = artist_to_be_updated
-            genres_for_this_artist.append(current_genre)
+        sync_genres(db.session, Artist, artist_id, genres)
+        update_facet_counts(
+            db.session,
+            Artist,
+            removed=facets_before,
+            added=entity_facet_values(Artist, artist_to_be_updated),
+        )
+
+        # Their detail pages show this artist, so they change with it.
+        counterpart_ids = played_counterparts(Artist, artist_id)
+        touch(Venue, counterpart_ids)
 
         db.session.add(artist_to_be_updated)
         db.session.commit()
+        purge_entity_pages(Artist, artist_id, counterpart_ids)
 
         db.session.refresh(artist_to_be_updated)
         flash("This venue was successfully updated!")
@@ -509,17 +908,19 @@ def edit_artist_submission(artist_id):
     finally:
         db.session.close()
 
-    return redirect(url_for("show_artist", artist_id=artist_id))
+    return redirect(url_for("main.show_artist", artist_id=artist_id))
 
 
-@app.route("/venues/<int:venue_id>/edit", methods=["GET"])
+@views.route("/venues/<int:venue_id>/edit", methods=["GET"])
 def edit_venue(venue_id):
+    from forms import VenueForm
+
     form = VenueForm()
 
     data = {}
 
     try:
-        requested_venue = Venue.query.get(venue_id)
+        requested_venue = Venue.query.filter(Venue.id == venue_id, live(Venue)).first()
 
         if requested_venue is None:
             return not_found_error(404)
@@ -547,7 +948,7 @@ def edit_venue(venue_id):
     except:
         print(sys.exc_info())
         flash("Something went wrong. Please try again.")
-        return redirect(url_for("index"))
+        return redirect(url_for("main.index"))
 
     finally:
         db.session.close()
@@ -555,7 +956,7 @@ def edit_venue(venue_id):
     return render_template("forms/edit_venue.html", form=form, venue=data)
 
 
-@app.route("/venues/<int:venue_id>/edit", methods=["POST"])
+@views.route("/venues/<int:venue_id>/edit", methods=["POST"])
 def edit_venue_submission(venue_id):
     try:
         name = request.form.get("name")
@@ -566,7 +967,13 @@ def edit_venue_submission(venue_id):
         genres = request.form.getlist("genres")
         facebook_link = request.form.get("facebook_link")
 
-        venue_to_be_updated = Venue.query.get(venue_id)
+        venue_to_be_updated = Venue.query.filter(
+            Venue.id == venue_id, live(Venue)
+        ).first()
+        if venue_to_be_updated is None:
+            return not_found_error(404)
+
+        facets_before = entity_facet_values(Venue, venue_to_be_updated)
 
         venue_to_be_updated.name = name
         venue_to_be_updated.city = city
@@ -574,15 +981,28 @@ def edit_venue_submission(venue_id):
         venue_to_be_updated.address = address
         venue_to_be_updated.phone = phone
         venue_to_be_updated.facebook_link = facebook_link
+        # Genre rows live in their own table, so touch the venue explicitly.
+        venue_to_be_updated.updated_at = datetime.datetime.utcnow()
+        venue_to_be_updated.search_document = build_search_document(
+            name, city, state, genres
+        )
+        venue_to_be_updated.genre_mask = genre_mask(genres)
+
+        sync_genres(db.session, Venue, venue_id, genres)
+        update_facet_counts(
+            db.session,
+            Venue,
+            removed=facets_before,
+            added=entity_facet_values(Venue, venue_to_be_updated),
+        )
 
-        genres_for_this_venue = []
-        for genre in genres:
-            current_genre = Venue_Genre(genre=genre)
-            current_genre.venue = venue_to_be_updated
-            genres_for_this_venue.append(current_genre)
+        # Their detail pages show this venue, so they change with it.
+        counterpart_ids = played_counterparts(Venue, venue_id)
+        touch(Artist, counterpart_ids)
 
         db.session.add(venue_to_be_updated)
         db.session.commit()
+        purge_entity_pages(Venue, venue_id, counterpart_ids)
 
         db.session.refresh(venue_to_be_updated)
         flash("This venue was successfully updated!")
@@ -599,21 +1019,23 @@ def edit_venue_submission(venue_id):
     finally:
         db.session.close()
 
-    return redirect(url_for("show_venue", venue_id=venue_id))
+    return redirect(url_for("main.show_venue", venue_id=venue_id))
 
 
 #  Create Artist
 #  ----------------------------------------------------------------
 
 
-@app.route("/artists/create", methods=["GET"])
+@views.route("/artists/create", methods=["GET"])
 def create_artist_form():
+    from forms import ArtistForm
+
     form = ArtistForm()
     return render_template("forms/new_artist.html", form=form)
 
 
 # Done
-@app.route("/artists/create", methods=["POST"])
+@views.route("/artists/create", methods=["POST"])
 def create_artist_submission():
     try:
         name = request.form.get("name")
@@ -624,17 +1046,27 @@ def create_artist_submission():
         facebook_link = request.form.get("facebook_link")
 
         new_artist = Artist(
-            name=name, city=city, state=state, phone=phone, facebook_link=facebook_link
+            name=name,
+            city=city,
+            state=state,
+            phone=phone,
+            facebook_link=facebook_link,
+            search_document=build_search_document(name, city, state, genres),
+            genre_mask=genre_mask(genres),
         )
 
         genres_for_this_artist = []
-        for genre in genres:
+        for genre in dict.fromkeys(genres):
             current_genre = Artist_Genre(genre=genre)
             current_genre.artist = new_artist
             genres_for_this_artist.append(current_genre)
 
         db.session.add(new_artist)
+        update_facet_counts(
+            db.session, Artist, added=entity_facet_values(Artist, new_artist)
+        )
         db.session.commit()
+        page_cache.purge("main.artists")
 
         db.session.refresh(new_artist)
         flash("Artist " + new_artist.name + " was successfully listed!")
@@ -657,129 +1089,202 @@ def create_artist_submission():
 #  ----------------------------------------------------------------
 
 
-@app.route("/shows")
+def encode_show_cursor(start_time, artist_id, venue_id):
+    return f"{start_time.isoformat()}_{artist_id}_{venue_id}"
+
+
+def decode_show_cursor(cursor):
+    start_time, artist_id, venue_id = cursor.rsplit("_", 2)
+    return (
+        datetime.datetime.fromisoformat(start_time),
+        int(artist_id),
+        int(venue_id),
+    )
+
+
+@views.route("/shows")
+@replicas.reads
+@page_cache.cached
 def shows():
-    # displays list of shows at /shows
-    # TODO: replace with real venues data.
-    # num_shows should be aggregated based on number of upcoming shows per venue.
-    data = [
-        {
-            "venue_id": 1,
-            "venue_name": "The Musical Hop",
-            "artist_id": 4,
-            "artist_name": "Guns N Petals",
-            "artist_image_link": "https://images.unsplash.com/photo-1549213783-8284d0336c4f?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=300&q=80",
-            "start_time": "2019-05-21T21:30:00.000Z",
-        },
-        {
-            "venue_id": 3,
-            "venue_name": "Park Square Live Music & Coffee",
-            "artist_id": 5,
-            "artist_name": "Matt Quevedo",
-            "artist_image_link": "https://images.unsplash.com/photo-1495223153807-b916f75de8c5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=334&q=80",
-            "start_time": "2019-06-15T23:00:00.000Z",
-        },
-        {
-            "venue_id": 3,
-            "venue_name": "Park Square Live Music & Coffee",
-            "artist_id": 6,
-            "artist_name": "The Wild Sax Band",
-            "artist_image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
-            "start_time": "2035-04-01T20:00:00.000Z",
-        },
-        {
-            "venue_id": 3,
-            "venue_name": "Park Square Live Music & Coffee",
-            "artist_id": 6,
-            "artist_name": "The Wild Sax Band",
-            "artist_image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
-            "start_time": "2035-04-08T20:00:00.000Z",
-        },
-        {
-            "venue_id": 3,
-            "venue_name": "Park Square Live Music & Coffee",
-            "artist_id": 6,
-            "artist_name": "The Wild Sax Band",
-            "artist_image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
-            "start_time": "2035-04-15T20:00:00.000Z",
-        },
-    ]
+    # Keyset pagination on (start_time, artist_id, venue_id): ?after=<cursor>
+    # returns the page following a show, ?before=<cursor> the page preceding it.
+    page_size = current_app.config["SHOWS_PAGE_SIZE"]
     all_shows_data = []
+    pagination = {"before": None, "after": None}
 
     try:
-        shows = Show.query.all()
-        for show in shows:
-            venue_id = show.venue_id
-            artist_id = show.artist_id
-            artist = Artist.query.get(artist_id)
+        before = request.args.get("before")
+        after = request.args.get("after")
+
+        show_key = tuple_(Show.start_time, Show.artist_id, Show.venue_id)
+
+        shows_query = (
+            db.session.query(
+                Show.start_time,
+                Show.artist_id,
+                Show.venue_id,
+                Artist.name.label("artist_name"),
+                Artist.image_link.label("artist_image_link"),
+                Venue.name.label("venue_name"),
+            )
+            .join(Artist, Artist.id == Show.artist_id)
+            .join(Venue, Venue.id == Show.venue_id)
+            .filter(live(Venue))
+        )
+
+        if before:
+            shows_query = shows_query.filter(
+                show_key < tuple_(*decode_show_cursor(before))
+            ).order_by(
+                Show.start_time.desc(), Show.artist_id.desc(), Show.venue_id.desc()
+            )
+        else:
+            if after:
+                shows_query = shows_query.filter(
+                    show_key > tuple_(*decode_show_cursor(after))
+                )
+            shows_query = shows_query.order_by(
+                Show.start_time, Show.artist_id, Show.venue_id
+            )
+
+        # One extra row tells us whether there is another page in this direction.
+        rows = shows_query.limit(page_size + 1).all()
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+
+        if before:
+            rows.reverse()
 
+        for row in rows:
             each_show_data = {
-                "venue_id": venue_id,
-                "venue_name": Venue.query.get(venue_id).name,
-                "artist_id": artist_id,
-                "artist_name": artist.name,
-                "artist_image_link": artist.image_link,
-                "start_time": str(show.start_time),
+                "venue_id": row.venue_id,
+                "venue_name": row.venue_name,
+                "artist_id": row.artist_id,
+                "artist_name": row.artist_name,
+                "artist_image_link": row.artist_image_link,
+                "start_time": row.start_time,
             }
 
             all_shows_data.append(each_show_data)
 
+        if rows:
+            first, last = rows[0], rows[-1]
+            if (before and has_more) or after:
+                pagination["before"] = encode_show_cursor(*first[:3])
+            if (not before and has_more) or before:
+                pagination["after"] = encode_show_cursor(*last[:3])
+
     except:
         db.session.rollback()
         print(sys.exc_info())
         flash("Something went wrong, please try again.")
 
     finally:
-        return render_template("pages/shows.html", shows=all_shows_data)
+        return render_template(
+            "pages/shows.html", shows=all_shows_data, pagination=pagination
+        )
 
 
-@app.route("/shows/create")
+@views.route("/shows/create")
 def create_shows():
+    from forms import ShowForm
+
     # renders form. do not touch.
     form = ShowForm()
     return render_template("forms/new_show.html", form=form)
 
 
+def describe_conflict(show, artist_id):
+    """One line about a booked show that overlaps a requested booking."""
+    when = f"{show.start_time:%Y-%m-%d %H:%M} to {show.end_time:%Y-%m-%d %H:%M}"
+    if show.artist_id == artist_id:
+        return f"The artist plays venue {show.venue_id} from {when}."
+    return f"The venue hosts artist {show.artist_id} from {when}."
+
+
 # Done
-@app.route("/shows/create", methods=["POST"])
+@views.route("/shows/create", methods=["POST"])
 def create_show_submission():
+    import dateutil.parser
+    from forms import ShowForm
 
     # called to create new shows in the db, upon submitting new show listing form
     # TODO: insert form data as a new Show record in the db, instead
 
     errors = {"invalid_artist_id": False, "invalid_venue_id": False}
+    conflicts = []
 
     try:
         artist_id = request.form.get("artist_id")
         venue_id = request.form.get("venue_id")
-        start_time = request.form.get("start_time")
-
-        # TODO-STEP1: Check if artist is present in the db
-        found_artist = Artist.query.get(artist_id)
-        if found_artist is None:
-            errors["invalid_artist_id"] = True
+        start_time = dateutil.parser.parse(request.form.get("start_time"))
+
+        # The duration is held to the form's own rules, which the browser
+        # only enforces for visitors who use the form.
+        form = ShowForm(request.form, meta={"csrf": False})
+        if not form.duration.validate(form):
+            flash("The duration must be a whole number of minutes from 15 to 720.")
+            return render_template("pages/home.html")
+        end_time = start_time + (
+            datetime.timedelta(minutes=form.duration.data)
+            if form.duration.data
+            else DEFAULT_SHOW_DURATION
+        )
 
-        # TODO-STEP2: Check if venue is present in the db
-        found_venue = Venue.query.get(venue_id)
-        if found_venue is None:
-            errors["invalid_venue_id"] = True
+        # TODO-STEP1 and TODO-STEP2: Check that the artist and the venue are
+        # present in the db, both in one query.
+        artist_name, venue_name = db.session.query(
+            select([Artist.name]).where(Artist.id == artist_id).label("artist_name"),
+            select([Venue.name])
+            .where(Venue.id == venue_id)
+            .where(live(Venue))
+            .label("venue_name"),
+        ).one()
+        errors["invalid_artist_id"] = artist_name is None
+        errors["invalid_venue_id"] = venue_name is None
 
         # TODO-STEP3: If the above tests pass, add the record to the DB as usual. Else, set the errors above.
-        if found_venue is not None and found_artist is not None:
+        if venue_name is not None and artist_name is not None:
+            artist_id, venue_id = int(artist_id), int(venue_id)
+            conflicts = [
+                describe_conflict(show, artist_id)
+                for show in conflicting_shows(
+                    db.session, artist_id, venue_id, start_time, end_time
+                )
+            ]
+
+        if venue_name is not None and artist_name is not None and not conflicts:
             new_show = Show(
-                artist_id=found_artist.id,
-                venue_id=found_venue.id,
+                artist_id=artist_id,
+                venue_id=venue_id,
                 start_time=start_time,
+                end_time=end_time,
             )
             db.session.add(new_show)
+            record_new_show(db.session, artist_id, venue_id, start_time)
             db.session.commit()
+            page_cache.purge("main.venues")
+            page_cache.purge("main.shows")
+            page_cache.purge("main.show_venue", venue_id=venue_id)
+            page_cache.purge("main.show_artist", artist_id=artist_id)
+            warm_pages_later(
+                ("main.venues", {}),
+                ("main.shows", {}),
+                ("main.show_venue", {"venue_id": venue_id}),
+                ("main.show_artist", {"artist_id": artist_id}),
+            )
             flash(
                 "The show by "
-                + found_artist.name
+                + artist_name
                 + " has been successfully scheduled at the following venue: "
-                + found_venue.name
+                + venue_name
             )
 
+    except IntegrityError:
+        # On Postgres, a show booked concurrently trips the exclusion constraint.
+        db.session.rollback()
+        conflicts = ["Another show was booked for the same time in the meantime."]
+
     except:
         print(sys.exc_info())
         db.session.rollback()
@@ -788,6 +1293,10 @@ def create_show_submission():
     finally:
         db.session.close()
 
+    if conflicts:
+        form = ShowForm()
+        return render_template("forms/new_show.html", form=form, conflicts=conflicts)
+
     if errors["invalid_artist_id"] is True:
         flash(
             "There is no artist with id "
@@ -806,25 +1315,448 @@ def create_show_submission():
     flash("Show was successfully listed!")
 
 
-@app.errorhandler(404)
+#  Commands
+#  ----------------------------------------------------------------
+
+
+@views.cli.command("rebuild-search-index")
+def rebuild_search_index_command():
+    """Create the search index for this database and backfill every row."""
+    with db.engine.begin() as connection:
+        rebuild_search_index(connection)
+
+
+@views.cli.command("rebuild-show-counters")
+def rebuild_show_counters_command():
+    """Recompute every venue's and artist's show counters from scratch."""
+    for model in (Venue, Artist):
+        refresh_show_counters(db.session, model)
+    db.session.commit()
+
+
+@views.cli.command("rebuild-facet-counts")
+def rebuild_facet_counts_command():
+    """Recount the facet values shown on /venues and /artists."""
+    rebuild_facet_counts(db.session)
+    db.session.commit()
+
+
+@views.cli.command("purge-deleted-venues")
+@click.option(
+    "--batch-size", type=click.IntRange(min=1), default=1000, show_default=True
+)
+def purge_deleted_venues_command(batch_size):
+    """Finish removing the shows and genres of deleted venues."""
+    for venue_id in venues_being_deleted(db.session):
+        removed = sum(purge_venue(db.session, venue_id, batch_size))
+        print(f"Venue {venue_id}: removed {removed} rows.")
+
+
+@views.cli.command("sync-replicas")
+def sync_replicas_command():
+    """Copy an SQLite primary over its SQLite replicas, for local testing."""
+    primary = current_app.config["SQLALCHEMY_DATABASE_URI"]
+    for bind, url in sorted(current_app.config["SQLALCHEMY_BINDS"].items()):
+        copy_sqlite_database(primary, url)
+        print(f"Copied {primary} to {bind} ({url}).")
+
+
+@views.cli.command("roll-past-shows")
+def roll_past_shows_command():
+    """Move shows that have started since the last run from upcoming to past."""
+    refreshed = roll_past_shows(db.session)
+    db.session.commit()
+    print(f"Refreshed show counters on {refreshed} venues and artists.")
+
+
+@views.cli.command("worker")
+@click.option("--threads", type=click.IntRange(min=1), default=4, show_default=True)
+@click.option(
+    "--poll-interval",
+    type=click.FloatRange(min=0.1),
+    default=1.0,
+    show_default=True,
+    help="Seconds to wait between polls when no job is due.",
+)
+def worker_command(threads, poll_interval):
+    """Run queued jobs until interrupted."""
+    app = current_app._get_current_object()
+    worker = Worker(app, db.session, threads, poll_interval)
+    print(f"Worker {worker.worker_id} running {threads} threads.")
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        # Jobs already started have finished once the pool has shut down.
+        print(f"Worker {worker.worker_id} stopped.")
+
+
+@views.cli.command("enqueue")
+@click.argument("kind", type=click.Choice(sorted(JOB_HANDLERS)))
+@click.option("--payload", default="{}", help="Job arguments as a JSON object.")
+@click.option("--dedup-key", default=None)
+def enqueue_command(kind, payload, dedup_key):
+    """Queue a job for `flask worker`, e.g. from a scheduler."""
+    job = enqueue(db.session, kind, json.loads(payload), dedup_key=dedup_key)
+    db.session.commit()
+    print(f"Job {job.id} {kind} is {job.status}.")
+
+
+@views.cli.command("explain-routes")
+def explain_routes_command():
+    """EXPLAIN every query the read-only pages issue and flag table scans.
+
+    Listing pages that render every row (/venues, /artists) are expected to
+    scan; every other statement should be served by an index.
+    """
+    venue = db.session.query(Venue.id).first()
+    artist = db.session.query(Artist.id).first()
+
+    paths = ["/venues", "/artists", "/shows"]
+    if venue is not None:
+        paths.append(f"/venues/{venue.id}")
+    if artist is not None:
+        paths.append(f"/artists/{artist.id}")
+
+    client = current_app.test_client()
+    dialect = db.engine.dialect.name
+
+    # Cached pages issue no queries, and replicas are queried on engines that
+    # are not listened to, so the pages are rendered from the primary with the
+    # page cache off.
+    ttl, page_cache.ttl = page_cache.ttl, 0
+    try:
+        captured = []
+        for path in paths:
+            with captured_statements(db.engine) as statements:
+                client.get(path, environ_base={READ_PRIMARY_ENVIRON: True})
+            captured.append((path, statements))
+    finally:
+        page_cache.ttl = ttl
+
+    for path, statements in captured:
+        print(path)
+        if not statements:
+            print("  no queries captured")
+        for statement, parameters in statements:
+            scans = table_scans(dialect, explain(db.engine, statement, parameters))
+            summary = " ".join(statement.split())[:70]
+            if scans:
+                print(f"  SCAN   {summary}")
+                for line in scans:
+                    print(f"         {line}")
+            else:
+                print(f"  index  {summary}")
+
+
+@views.cli.command("archive-shows")
+@click.option(
+    "--older-than",
+    "older_than_days",
+    type=click.IntRange(min=0),
+    default=90,
+    show_default=True,
+    help="Archive shows that started more than this many days ago.",
+)
+@click.option(
+    "--batch-size", type=click.IntRange(min=1), default=1000, show_default=True
+)
+def archive_shows_command(older_than_days, batch_size):
+    """Move old shows from the shows table into shows_archive in batches."""
+    cutoff = datetime.datetime.now() - datetime.timedelta(days=older_than_days)
+
+    archived = 0
+    for moved in archive_shows(db.session, cutoff, batch_size):
+        archived += moved
+        print(f"Archived {archived} shows so far.")
+
+    print(f"Archived {archived} shows that started before {cutoff:%Y-%m-%d %H:%M}.")
+
+
+@views.cli.command("build-assets")
+def build_assets_command():
+    """Bundle, minify, fingerprint and precompress the static CSS/JS."""
+    manifest = build_assets(current_app.static_folder)
+    for name, path in sorted(manifest.items()):
+        print(f"{name} -> {path}")
+
+
+@views.cli.command("import")
+@click.argument("kind", type=click.Choice(["artists", "shows", "venues"]))
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--batch-size", type=click.IntRange(min=1), default=5000, show_default=True
+)
+@click.option(
+    "--rejects",
+    "rejects_path",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Where to write rejected rows as JSONL [default: PATH.rejects.jsonl].",
+)
+def import_command(kind, path, batch_size, rejects_path):
+    """Bulk load venues, artists or shows from a .csv or .jsonl file.
+
+    Rows are validated with the site's forms; genres may be a list (JSONL) or
+    a comma-separated string. Shows refer to existing artist and venue ids.
+    """
+    from importer import import_file
+
+    rejects_path = rejects_path or f"{path}.rejects.jsonl"
+
+    inserted = rejected = 0
+    with open(rejects_path, "w", encoding="utf-8") as rejects:
+        for report in import_file(db.session, kind, path, batch_size, rejects):
+            inserted += report["inserted"]
+            rejected += report["rejected"]
+            print(
+                f"Batch {report['batch']}: {report['inserted']}/{report['read']} "
+                f"rows inserted, {report['rows_per_second']:,.0f} rows/s."
+            )
+
+    for endpoint in ("main.venues", "main.artists", "main.shows"):
+        page_cache.purge(endpoint)
+
+    print(f"Imported {inserted} {kind}; {rejected} rejected rows in {rejects_path}.")
+
+
+@views.cli.command("generate-data")
+@click.option("--venues", type=click.IntRange(min=1), default=10000, show_default=True)
+@click.option("--artists", type=click.IntRange(min=1), default=50000, show_default=True)
+@click.option("--shows", type=click.IntRange(min=0), default=5000000, show_default=True)
+@click.option("--seed", default="fyyur", show_default=True)
+@click.option(
+    "--anchor",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    help="Date that splits past from upcoming shows [default: today].",
+)
+@click.option("--past-days", type=click.IntRange(min=1), default=730, show_default=True)
+@click.option(
+    "--future-days", type=click.IntRange(min=1), default=365, show_default=True
+)
+@click.option(
+    "--output",
+    type=click.Path(file_okay=False, writable=True),
+    help="Write JSONL files for `flask import` here instead of to the database.",
+)
+@click.option(
+    "--batch-size", type=click.IntRange(min=1), default=10000, show_default=True
+)
+def generate_data_command(
+    venues, artists, shows, seed, anchor, past_days, future_days, output, batch_size
+):
+    """Generate a deterministic synthetic catalog for load testing."""
+    from mock_data_gen import write_database, write_files
+
+    anchor = anchor.date() if anchor else datetime.date.today()
+
+    if output:
+        for kind, written, path in write_files(
+            output, seed, venues, artists, shows, anchor, past_days, future_days
+        ):
+            print(f"Wrote {written} {kind} to {path}.")
+        return
+
+    started = timeit.default_timer()
+    for kind, written in write_database(
+        db.session,
+        seed,
+        venues,
+        artists,
+        shows,
+        anchor,
+        past_days,
+        future_days,
+        batch_size,
+    ):
+        elapsed = timeit.default_timer() - started
+        print(f"Inserted {written} {kind} ({elapsed:.1f}s).")
+
+    for endpoint in ("main.venues", "main.artists", "main.shows"):
+        page_cache.purge(endpoint)
+
+
+@views.cli.command("bench-datetime-filter")
+@click.option("--tiles", type=click.IntRange(min=1), default=1000, show_default=True)
+@click.option("--repeat", type=click.IntRange(min=1), default=20, show_default=True)
+def bench_datetime_filter_command(tiles, repeat):
+    """Time rendering a /shows page of TILES shows through the datetime filter.
+
+    Compares legacy string start times with datetimes, with and without the
+    memo. Start times repeat weekly, as recurring shows do.
+    """
+    first_show = datetime.datetime(2035, 4, 1, 20, 0)
+    start_times = [
+        first_show + datetime.timedelta(weeks=tile % 52) for tile in range(tiles)
+    ]
+
+    unmemoized = format_datetime.__wrapped__
+    variants = [
+        ("strings, no memo", [str(t) for t in start_times], unmemoized),
+        ("datetimes, no memo", start_times, unmemoized),
+        ("datetimes, memo", start_times, format_datetime),
+    ]
+
+    with current_app.test_request_context("/shows"):
+        for label, values, datetime_filter in variants:
+            shows = [
+                {
+                    "venue_id": 1,
+                    "venue_name": "The Musical Hop",
+                    "artist_id": 1,
+                    "artist_name": "Guns N Petals",
+                    "artist_image_link": "",
+                    "start_time": value,
+                }
+                for value in values
+            ]
+
+            current_app.jinja_env.filters["datetime"] = datetime_filter
+            format_datetime.cache_clear()
+            elapsed = timeit.timeit(
+                lambda: render_template(
+                    "pages/shows.html",
+                    shows=shows,
+                    pagination={"before": None, "after": None},
+                ),
+                number=repeat,
+            )
+            print(f"{label:>20}: {elapsed / repeat * 1000:8.2f} ms per render")
+
+    current_app.jinja_env.filters["datetime"] = format_datetime
+
+
+# Run in a fresh interpreter by `flask bench-startup`; prints the seconds spent
+# importing app, in create_app() and serving a first request.
+STARTUP_SCRIPT = """
+import time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+application.test_client().get("/")
+served = time.perf_counter()
+print(imported - started, created - imported, served - created)
+"""
+
+
+@views.cli.command("bench-startup")
+@click.option("--repeat", type=click.IntRange(min=1), default=5, show_default=True)
+@click.option(
+    "--top",
+    type=click.IntRange(min=0),
+    default=15,
+    show_default=True,
+    help="Number of slowest top-level imports to list.",
+)
+def bench_startup_command(repeat, top):
+    """Time cold worker starts, each in a fresh interpreter.
+
+    A run imports app, calls create_app() and serves /, as a gunicorn worker
+    does when the app is not preloaded. One more run under -X importtime
+    lists the top-level imports that cost the most.
+    """
+
+    def run(*options):
+        return subprocess.run(
+            [sys.executable, *options, "-c", STARTUP_SCRIPT],
+            cwd=current_app.root_path,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            check=True,
+        )
+
+    timings = [[float(t) for t in run().stdout.split()[-3:]] for _ in range(repeat)]
+    phases = ["import app", "create_app()", "first request"]
+    for phase, seconds in zip(phases, zip(*timings)):
+        print(f"{phase:>15}: {statistics.median(seconds) * 1000:8.1f} ms median")
+    total = statistics.median(sum(run_timings) for run_timings in timings)
+    print(f"{'total':>15}: {total * 1000:8.1f} ms median")
+
+    if not top:
+        return
+
+    imports = []
+    for line in run("-X", "importtime").stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package", where
+        # nested imports are indented under the module importing them.
+        fields = line.partition("import time:")[2].split("|")
+        if len(fields) == 3 and fields[1].strip().isdigit():
+            name = fields[2][1:]
+            if not name.startswith(" "):
+                imports.append((int(fields[1]), name))
+
+    print("Slowest top-level imports:")
+    for cumulative_us, name in sorted(imports, reverse=True)[:top]:
+        print(f"{cumulative_us / 1000:8.1f} ms  {name}")
+
+
+@views.route("/cache/stats")
+def cache_stats():
+    return jsonify(page_cache.stats())
+
+
+@views.route("/db/pool/stats")
+def db_pool_stats():
+    # Per process: each gunicorn worker reports its own pool.
+    return jsonify(
+        dict(checkout_metrics.stats(db.engine.pool), routing=replicas.stats())
+    )
+
+
+@views.route("/jobs/stats")
+def jobs_stats():
+    return jsonify(job_stats(db.session))
+
+
+@views.app_errorhandler(404)
 def not_found_error(error):
     return render_template("errors/404.html"), 404
 
 
-@app.errorhandler(500)
+@views.app_errorhandler(500)
 def server_error(error):
     return render_template("errors/500.html"), 500
 
 
-if not app.debug:
-    file_handler = FileHandler("error.log")
-    file_handler.setFormatter(
-        Formatter("%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]")
+# ----------------------------------------------------------------------------#
+# App factory.
+# ----------------------------------------------------------------------------#
+
+
+def create_app(config="config"):
+    """Build the app. `flask` finds this factory; gunicorn runs app:create_app()."""
+    app = Flask(__name__)
+    app.config.from_object(config)
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config)
+
+    db.init_app(app)
+    migrate.init_app(app, db)
+    moment.init_app(app)
+    replicas.init_app(app)
+    page_cache.init_app(app)
+    register_assets(app)
+    app.register_blueprint(views)
+
+    # The logger is named after the module and so shared by every app built
+    # here, e.g. by tests and bench-startup: it gets one handler.
+    file_logging = any(
+        isinstance(handler, FileHandler) for handler in app.logger.handlers
     )
-    app.logger.setLevel(logging.INFO)
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.info("errors")
+    if not app.debug and not app.testing and not file_logging:
+        file_handler = FileHandler("error.log")
+        file_handler.setFormatter(
+            Formatter(
+                "%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]"
+            )
+        )
+        app.logger.setLevel(logging.INFO)
+        file_handler.setLevel(logging.INFO)
+        app.logger.addHandler(file_handler)
+        app.logger.info("errors")
+
+    return app
+
 
 # ----------------------------------------------------------------------------#
 # Launch.
@@ -832,12 +1764,12 @@ if not app.debug:
 
 # Default port:
 if __name__ == "__main__":
-    app.run()
+    create_app().run()
 
 # Or specify port manually:
 """
 if __name__ == '__main__':
 		port = int(os.environ.get('PORT', 5000))
-		app.run(host='0.0.0.0', port=port)
+		create_app().run(host='0.0.0.0', port=port)
 """
 
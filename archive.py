@@ -0,0 +1,73 @@
+import datetime
+
+from sqlalchemy import select, union_all
+
+from models import Venue, Artist, Show, Show_Archive
+
+# ----------------------------------------------------------------------------#
+# Show archive.
+# ----------------------------------------------------------------------------#
+
+# Old shows are moved from the hot `shows` table into `shows_archive`, which
+# only detail pages and counters read. Rows keep their id when archived.
+# Archiving touches the venues and artists of the moved shows, since their
+# detail pages are validated from updated_at alone.
+
+SHOW_COLUMNS = ["id", "artist_id", "venue_id", "start_time", "end_time", "updated_at"]
+
+
+def shows_with_archive(criterion_for):
+    """Union of matching rows from `shows` and `shows_archive`, as a subquery.
+
+    `criterion_for` is called with each of the two models and returns the
+    filter to apply to it, e.g. ``lambda model: model.venue_id == 1``.
+    """
+    return union_all(
+        *[
+            select([getattr(model, column) for column in SHOW_COLUMNS]).where(
+                criterion_for(model)
+            )
+            for model in (Show, Show_Archive)
+        ]
+    ).alias("all_shows")
+
+
+def archive_shows(session, cutoff, batch_size):
+    """Move shows that started before `cutoff` into the archive, in batches.
+
+    Each batch is its own short transaction, so locks on `shows` are held
+    only briefly. Yields the number of rows moved by each batch.
+    """
+    show_columns = [getattr(Show, column) for column in SHOW_COLUMNS]
+
+    while True:
+        rows = (
+            session.query(Show.id, Show.venue_id, Show.artist_id)
+            .filter(Show.start_time < cutoff)
+            .order_by(Show.start_time)
+            .limit(batch_size)
+            .all()
+        )
+
+        if not rows:
+            return
+
+        batch = [row.id for row in rows]
+
+        session.execute(
+            Show_Archive.__table__.insert().from_select(
+                SHOW_COLUMNS, select(show_columns).where(Show.id.in_(batch))
+            )
+        )
+        session.execute(Show.__table__.delete().where(Show.id.in_(batch)))
+        now = datetime.datetime.utcnow()
+        for model, ids in (
+            (Venue, {row.venue_id for row in rows}),
+            (Artist, {row.artist_id for row in rows}),
+        ):
+            session.execute(
+                model.__table__.update().where(model.id.in_(ids)).values(updated_at=now)
+            )
+        session.commit()
+
+        yield len(batch)
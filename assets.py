@@ -0,0 +1,160 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+from flask import request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # .br variants are skipped without the Brotli package
+    brotli = None
+
+# ----------------------------------------------------------------------------#
+# Static assets.
+# ----------------------------------------------------------------------------#
+
+# `flask build-assets` concatenates and minifies each bundle below, writes it
+# to static/dist/ under a content-hashed name with .gz/.br variants, and
+# records the names in static/dist/manifest.json. Templates ask for bundles
+# through `asset_urls`, which falls back to the source files when no manifest
+# has been built (local development).
+
+BUNDLES = {
+    "app.css": [
+        "css/bootstrap.min.css",
+        "css/layout.main.css",
+        "css/main.css",
+        "css/main.responsive.css",
+        "css/main.quickfix.css",
+    ],
+    "head.js": [
+        "js/libs/modernizr-2.8.2.min.js",
+        "js/libs/moment.min.js",
+        "js/script.js",
+    ],
+    "app.js": [
+        "js/libs/jquery-1.11.1.min.js",
+        "js/libs/bootstrap-3.1.1.min.js",
+        "js/plugins.js",
+    ],
+    "respond.js": ["js/libs/respond-1.4.2.min.js"],
+}
+
+DIST_DIRECTORY = "dist"
+MANIFEST_NAME = "manifest.json"
+
+# Bundled files are named after their content, so they never change in place.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Variants tried in order of preference: (file suffix, Content-Encoding).
+PRECOMPRESSED_VARIANTS = [(".br", "br"), (".gz", "gzip")]
+
+
+def minify_css(source):
+    source = re.sub(r"/\*.*?\*/", "", source, flags=re.S)
+    source = re.sub(r"\s+", " ", source)
+    source = re.sub(r"\s*([{};,>])\s*", r"\1", source)
+    return source.replace(";}", "}").strip()
+
+
+def minify_js(source):
+    # Only whole-line comments and blank lines are dropped: anything more needs
+    # a real JavaScript parser, and the libraries are shipped minified already.
+    lines = [line.rstrip() for line in source.splitlines()]
+    return "\n".join(
+        line for line in lines if line.strip() and not line.lstrip().startswith("//")
+    )
+
+
+def build_bundle(static_folder, sources):
+    minify = minify_css if sources[0].endswith(".css") else minify_js
+    parts = []
+    for source in sources:
+        with open(os.path.join(static_folder, source), encoding="utf-8") as f:
+            text = f.read()
+        parts.append(text if ".min." in source else minify(text))
+    # A semicolon between scripts keeps one file's last statement from running
+    # into the next file's first.
+    separator = "\n" if sources[0].endswith(".css") else ";\n"
+    return separator.join(parts).encode("utf-8")
+
+
+def build_assets(static_folder):
+    """Write every bundle, its compressed variants and the manifest.
+
+    Returns the manifest as {bundle name: path relative to the static folder}.
+    """
+    dist_folder = os.path.join(static_folder, DIST_DIRECTORY)
+    # Earlier builds are kept: pages cached or still open in browsers may
+    # reference them until they expire.
+    os.makedirs(dist_folder, exist_ok=True)
+
+    manifest = {}
+    for name, sources in BUNDLES.items():
+        content = build_bundle(static_folder, sources)
+        stem, extension = os.path.splitext(name)
+        digest = hashlib.sha256(content).hexdigest()[:12]
+        filename = f"{stem}.{digest}{extension}"
+
+        path = os.path.join(dist_folder, filename)
+        with open(path, "wb") as f:
+            f.write(content)
+        with open(path + ".gz", "wb") as f:
+            f.write(gzip.compress(content, compresslevel=9))
+        if brotli is not None:
+            with open(path + ".br", "wb") as f:
+                f.write(brotli.compress(content))
+
+        manifest[name] = f"{DIST_DIRECTORY}/{filename}"
+
+    with open(os.path.join(dist_folder, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    return manifest
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, DIST_DIRECTORY, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def register_assets(app):
+    """Add the `asset_urls` template global and the /static/dist/ route."""
+    manifest = load_manifest(app.static_folder)
+    dist_folder = os.path.join(app.static_folder, DIST_DIRECTORY)
+
+    def asset_urls(name):
+        if manifest is None:
+            return [url_for("static", filename=source) for source in BUNDLES[name]]
+        return [url_for("static", filename=manifest[name])]
+
+    def serve_asset(filename):
+        accepted = request.accept_encodings
+        for suffix, encoding in PRECOMPRESSED_VARIANTS:
+            if encoding in accepted and os.path.isfile(
+                os.path.join(dist_folder, filename + suffix)
+            ):
+                response = send_from_directory(dist_folder, filename + suffix)
+                response.headers["Content-Encoding"] = encoding
+                response.mimetype = mimetypes.guess_type(filename)[0]
+                break
+        else:
+            response = send_from_directory(dist_folder, filename)
+
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        response.vary.add("Accept-Encoding")
+        return response
+
+    app.add_template_global(asset_urls)
+    # More specific than Flask's /static/<path:filename>, so it wins for dist/.
+    app.add_url_rule(
+        f"{app.static_url_path}/{DIST_DIRECTORY}/<path:filename>",
+        "dist_asset",
+        serve_asset,
+    )
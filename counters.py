@@ -0,0 +1,96 @@
+import datetime
+
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.orm import aliased
+
+from models import Venue, Artist, Show, Show_Archive
+
+# ----------------------------------------------------------------------------#
+# Show counters.
+# ----------------------------------------------------------------------------#
+
+# Venues and artists carry upcoming_shows_count, past_shows_count and
+# next_show_at so that listings never have to count rows in `shows`. A show is
+# past once its start_time is earlier than now, matching the detail pages.
+# Shows at tombstoned venues stop counting at once, although their rows are
+# only purged later (see tombstones.py).
+
+SHOW_KEYS = {
+    Venue: Show.venue_id,
+    Artist: Show.artist_id,
+}
+
+
+def record_new_show(session, artist_id, venue_id, start_time):
+    """Bump the counters of a new show's artist and venue in the open transaction."""
+    is_upcoming = start_time >= datetime.datetime.now()
+
+    for model, entity_id in ((Venue, venue_id), (Artist, artist_id)):
+        if is_upcoming:
+            values = {
+                model.upcoming_shows_count: model.upcoming_shows_count + 1,
+                model.next_show_at: case(
+                    [
+                        (
+                            or_(
+                                model.next_show_at.is_(None),
+                                model.next_show_at > start_time,
+                            ),
+                            start_time,
+                        )
+                    ],
+                    else_=model.next_show_at,
+                ),
+            }
+        else:
+            values = {model.past_shows_count: model.past_shows_count + 1}
+
+        session.execute(
+            model.__table__.update().where(model.id == entity_id).values(values)
+        )
+
+
+def refresh_show_counters(session, model, criterion=None):
+    """Recompute counters of `model` rows matching `criterion` from both show tables."""
+    show_key = SHOW_KEYS[model]
+    archive_key = getattr(Show_Archive, show_key.key)
+    now = datetime.datetime.now()
+
+    deleted_venue = aliased(Venue)
+    deleted_venue_ids = select([deleted_venue.id]).where(
+        deleted_venue.deleted_at.isnot(None)
+    )
+    counted = Show.venue_id.notin_(deleted_venue_ids)
+
+    upcoming = and_(show_key == model.id, Show.start_time >= now, counted)
+    past = and_(show_key == model.id, Show.start_time < now, counted)
+    # Only past shows are ever archived.
+    archived = and_(
+        archive_key == model.id, Show_Archive.venue_id.notin_(deleted_venue_ids)
+    )
+
+    statement = model.__table__.update().values(
+        upcoming_shows_count=select([func.count()]).where(upcoming).as_scalar(),
+        past_shows_count=select([func.count()]).where(past).as_scalar()
+        + select([func.count()]).where(archived).as_scalar(),
+        next_show_at=select([func.min(Show.start_time)]).where(upcoming).as_scalar(),
+    )
+
+    if criterion is not None:
+        statement = statement.where(criterion)
+
+    return session.execute(statement).rowcount
+
+
+def roll_past_shows(session):
+    """Refresh only the rows whose next show has started since the last roll.
+
+    Meant to run periodically (e.g. from the Heroku scheduler via
+    `flask roll-past-shows`); it touches one indexed range of next_show_at.
+    """
+    now = datetime.datetime.now()
+
+    return sum(
+        refresh_show_counters(session, model, model.next_show_at < now)
+        for model in SHOW_KEYS
+    )
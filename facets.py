@@ -0,0 +1,146 @@
+from collections import Counter
+
+from sqlalchemy import and_, func, or_, text, tuple_
+
+from models import Venue, Artist, Facet_Count
+from genres import GENRE_BITS, genre_filter
+from tombstones import live
+
+# ----------------------------------------------------------------------------#
+# Facets.
+# ----------------------------------------------------------------------------#
+
+# /venues and /artists can be narrowed by state, city, genre and whether the
+# venue or artist is seeking the other. The number of entities having each
+# facet value is kept in `facet_counts` and adjusted in the same transaction
+# as every create, edit or delete, so listings read their counts from a
+# handful of rows instead of grouping the whole table.
+
+FACET_LISTINGS = {Venue: "venues", Artist: "artists"}
+
+SEEKING_COLUMNS = {Venue: "seeking_talent", Artist: "seeking_venue"}
+
+FACETS = ["state", "city", "genre", "seeking"]
+
+
+def city_value(city, state):
+    return f"{city}, {state}"
+
+
+def facet_values(model, state, city, genre_mask, seeking):
+    """(facet, value) pairs under which one venue or artist is counted."""
+    values = [("state", state), ("city", city_value(city, state))]
+    values.extend(
+        ("genre", name) for name, bit in GENRE_BITS.items() if (genre_mask or 0) & bit
+    )
+    values.append(("seeking", "yes" if seeking else "no"))
+    return values
+
+
+def entity_facet_values(model, entity):
+    return facet_values(
+        model,
+        entity.state,
+        entity.city,
+        entity.genre_mask,
+        getattr(entity, SEEKING_COLUMNS[model]),
+    )
+
+
+# One statement per value, so that two transactions adding the first entity
+# with a value cannot both miss the row and both insert it. The syntax is the
+# same on PostgreSQL and SQLite (3.24+).
+UPSERT_FACET_COUNT = text(
+    "INSERT INTO facet_counts (listing, facet, value, count) "
+    "VALUES (:listing, :facet, :value, :count) "
+    "ON CONFLICT (listing, facet, value) "
+    "DO UPDATE SET count = facet_counts.count + excluded.count"
+)
+
+
+def update_facet_counts(session, model, removed=(), added=()):
+    """Apply the difference between two lists of facet values to the counts.
+
+    Values present in both lists cost nothing, so an edit that changes no
+    facet writes no rows.
+    """
+    deltas = Counter(added)
+    deltas.subtract(removed)
+
+    listing = FACET_LISTINGS[model]
+    # Sorted, so concurrent transactions lock the rows in the same order.
+    rows = [
+        {"listing": listing, "facet": facet, "value": value, "count": delta}
+        for (facet, value), delta in sorted(deltas.items())
+        if delta != 0
+    ]
+    if rows:
+        session.execute(UPSERT_FACET_COUNT, rows)
+
+
+def rebuild_facet_counts(session):
+    """Recount every facet value from the venues and artists tables."""
+    session.execute(Facet_Count.__table__.delete())
+
+    for model, listing in FACET_LISTINGS.items():
+        seeking = getattr(model, SEEKING_COLUMNS[model])
+        columns = [model.state, model.city, model.genre_mask, seeking]
+
+        counts = Counter()
+        rows = session.query(*columns, func.count()).filter(live(model))
+        for *values, count in rows.group_by(*columns):
+            for key in facet_values(model, *values):
+                counts[key] += count
+
+        if counts:
+            session.execute(
+                Facet_Count.__table__.insert(),
+                [
+                    {"listing": listing, "facet": facet, "value": value, "count": count}
+                    for (facet, value), count in counts.items()
+                ],
+            )
+
+
+def facet_counts(session, model):
+    """{facet: [(value, count), ...]} for a listing, most common values first."""
+    rows = (
+        session.query(Facet_Count.facet, Facet_Count.value, Facet_Count.count)
+        .filter(Facet_Count.listing == FACET_LISTINGS[model], Facet_Count.count > 0)
+        .order_by(Facet_Count.facet, Facet_Count.count.desc(), Facet_Count.value)
+    )
+
+    counts = {facet: [] for facet in FACETS}
+    for facet, value, count in rows:
+        counts[facet].append((value, count))
+    return counts
+
+
+def facet_criterion(model, selected, match="all"):
+    """Filter for a facet selection, or None when nothing is selected.
+
+    `selected` maps facets to the chosen values. Values of one facet are
+    alternatives; facets are combined with AND. Genres follow `match`.
+    """
+    criteria = []
+
+    if selected.get("state"):
+        criteria.append(model.state.in_(selected["state"]))
+
+    cities = [value.rsplit(", ", 1) for value in selected.get("city", [])]
+    cities = [tuple(city) for city in cities if len(city) == 2]
+    if cities:
+        criteria.append(tuple_(model.city, model.state).in_(cities))
+
+    if selected.get("genre"):
+        criteria.append(genre_filter(model, selected["genre"], match))
+
+    seeking = set(selected.get("seeking", [])) & {"yes", "no"}
+    if len(seeking) == 1:
+        column = getattr(model, SEEKING_COLUMNS[model])
+        if "yes" in seeking:
+            criteria.append(column.is_(True))
+        else:
+            criteria.append(or_(column.is_(False), column.is_(None)))
+
+    return and_(*criteria) if criteria else None
@@ -0,0 +1,99 @@
+from sqlalchemy import event
+
+from models import Genre, Venue, Venue_Genre, Artist, Artist_Genre
+
+# ----------------------------------------------------------------------------#
+# Genres.
+# ----------------------------------------------------------------------------#
+
+# Genres are kept as one row per (venue or artist, genre). Edits compare the
+# submitted genres with the stored ones and only write the difference.
+#
+# Each venue and artist also carries `genre_mask`, with bit n set for the
+# genre whose id in the `genres` table is n, so listings can filter by genre
+# with one bitwise test on the row instead of joining the genre rows.
+
+GENRE_MODELS = {Venue: (Venue_Genre, "venue_id"), Artist: (Artist_Genre, "artist_id")}
+
+# The one list of genres: the forms offer these, and the `genres` table is
+# seeded from it, both by its migration and by create_all(). The rows are in
+# id order and ids are bit positions in the masks, so genres may only be
+# appended, with a migration inserting the new rows.
+GENRE_NAMES = [
+    "Alternative",
+    "Blues",
+    "Classical",
+    "Country",
+    "Electronic",
+    "Folk",
+    "Funk",
+    "Hip-Hop",
+    "Heavy Metal",
+    "Instrumental",
+    "Jazz",
+    "Musical Theatre",
+    "Pop",
+    "Punk",
+    "R&B",
+    "Reggae",
+    "Rock n Roll",
+    "Soul",
+    "Other",
+]
+
+GENRE_BITS = {name: 1 << genre_id for genre_id, name in enumerate(GENRE_NAMES)}
+
+GENRE_MATCHES = ("all", "any")
+
+
+def genre_rows():
+    """The rows of the `genres` table, as dicts."""
+    return [{"id": genre_id, "name": name} for genre_id, name in enumerate(GENRE_NAMES)]
+
+
+@event.listens_for(Genre.__table__, "after_create")
+def seed_genres(table, connection, **kw):
+    connection.execute(table.insert(), genre_rows())
+
+
+def genre_mask(genres):
+    """Bitmask of `genres`; names outside GENRE_NAMES have no bit and are ignored."""
+    mask = 0
+    for genre in genres:
+        mask |= GENRE_BITS.get(genre, 0)
+    return mask
+
+
+def genre_filter(model, genres, match="all"):
+    """Criterion for venues or artists having all (or any) of `genres`."""
+    mask = genre_mask(genres)
+    masked = model.genre_mask.op("&")(mask)
+    return masked == mask if match == "all" else masked != 0
+
+
+def sync_genres(session, model, entity_id, genres):
+    """Make the genre rows of a venue or artist match `genres`.
+
+    Issues at most one DELETE and one INSERT, and no writes when nothing
+    changed. Returns the (added, removed) sets of genres.
+    """
+    genre_model, key = GENRE_MODELS[model]
+    owner = getattr(genre_model, key)
+
+    rows = session.query(genre_model.genre).filter(owner == entity_id)
+    current = {genre for (genre,) in rows}
+    wanted = set(genres)
+    added, removed = wanted - current, current - wanted
+
+    if removed:
+        session.query(genre_model).filter(
+            owner == entity_id, genre_model.genre.in_(removed)
+        ).delete(synchronize_session=False)
+    if added:
+        # Sorted so that rows, and so the order pages list genres in, are stable.
+        session.execute(
+            genre_model.__table__.insert(),
+            [{key: entity_id, "genre": genre} for genre in sorted(added)],
+        )
+
+    return added, removed
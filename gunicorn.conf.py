@@ -0,0 +1,17 @@
+# ----------------------------------------------------------------------------#
+# Gunicorn.
+# ----------------------------------------------------------------------------#
+
+# Run with --preload: the master builds the app once and forks it into the
+# workers, which share that memory until they write to it. Nothing connects to
+# the database before the fork; engines and the shared cache connect on first
+# use in each worker. `flask bench-startup` times what a worker would
+# otherwise spend starting cold.
+
+
+def when_ready(server):
+    """Before forking, import the modules views otherwise import on first use."""
+    from app import LAZY_MODULES, import_lazy_modules
+
+    import_lazy_modules()
+    server.log.info("Preloaded %s", ", ".join(LAZY_MODULES))
@@ -0,0 +1,363 @@
+import csv
+import datetime
+import io
+import json
+import time
+from itertools import islice
+
+from sqlalchemy import false, select, text
+from werkzeug.datastructures import MultiDict
+from wtforms import DateTimeField
+from wtforms.validators import DataRequired
+
+from forms import ArtistForm, ShowForm, VenueForm
+from models import Venue, Artist, Show
+from counters import refresh_show_counters
+from genres import GENRE_MODELS, genre_mask
+from facets import SEEKING_COLUMNS, facet_values, update_facet_counts
+from scheduling import DEFAULT_SHOW_DURATION, IntervalIndex
+from tombstones import live
+from search import build_search_document
+
+# ----------------------------------------------------------------------------#
+# Bulk import.
+# ----------------------------------------------------------------------------#
+
+# `flask import` streams a CSV or JSONL file, validates every row with the
+# same WTForms form the site uses, and writes each batch in one transaction:
+# COPY on Postgres, executemany elsewhere. Rows that fail validation, or that
+# belong to a batch the database rejects, are written to a side file.
+
+
+class ShowImportForm(ShowForm):
+    # ShowForm defaults start_time to when the server started, which would
+    # pass DataRequired for a row without one.
+    start_time = DateTimeField("start_time", validators=[DataRequired()])
+
+
+IMPORT_FORMS = {
+    "venues": VenueForm,
+    "artists": ArtistForm,
+    "shows": ShowImportForm,
+}
+
+# Model columns accepted from the file beyond the form's own fields.
+EXTRA_COLUMNS = {
+    "venues": {"website": str, "seeking_description": str, "seeking_talent": bool},
+    "artists": {"seeking_description": str, "seeking_venue": bool},
+    "shows": {},
+}
+
+TRUE_VALUES = {"1", "true", "t", "yes", "y"}
+
+# How insert_rows() writes NULL in the CSV it COPYs to Postgres.
+COPY_NULL = r"\N"
+
+
+def read_rows(path):
+    """Yield (line number, row dict) from a .csv or .jsonl file."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for line_number, line in enumerate(f, start=1):
+                if line.strip():
+                    yield line_number, json.loads(line)
+        else:
+            # Line 1 is the header.
+            for line_number, row in enumerate(csv.DictReader(f), start=2):
+                yield line_number, row
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def validate_row(kind, row):
+    """Return (clean record, None) or (None, errors) using the site's form."""
+    formdata = MultiDict()
+    for key, value in row.items():
+        if key == "genres" and isinstance(value, str):
+            value = [genre.strip() for genre in value.split(",") if genre.strip()]
+        if isinstance(value, list):
+            for item in value:
+                formdata.add(key, item)
+        elif value is not None:
+            formdata.add(key, str(value))
+
+    form = IMPORT_FORMS[kind](formdata=formdata, meta={"csrf": False})
+    if not form.validate():
+        return None, form.errors
+
+    record = dict(form.data)
+    for column, kind_of_value in EXTRA_COLUMNS[kind].items():
+        value = row.get(column)
+        if kind_of_value is bool and value is not None:
+            value = str(value).strip().lower() in TRUE_VALUES
+        record[column] = (value or None) if kind_of_value is str else value
+
+    return record, None
+
+
+def with_defaults(table, record):
+    """Fill scalar Python-side column defaults, which COPY would not apply.
+
+    Blank fields count as missing: a CSV cell or form field left empty
+    arrives as "".
+    """
+    for column in table.columns:
+        if record.get(column.name) in (None, "") and column.default is not None:
+            if column.default.is_scalar:
+                record[column.name] = column.default.arg
+    return record
+
+
+def allocate_ids(session, table, count):
+    """Reserve `count` primary keys for `table` so child rows can refer to them.
+
+    Call it in the transaction that inserts the rows.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        rows = session.execute(
+            text(
+                "SELECT nextval(pg_get_serial_sequence(:table, 'id')) "
+                "FROM generate_series(1, :count)"
+            ),
+            {"table": table.name, "count": count},
+        )
+        return [row[0] for row in rows]
+
+    # Other writers must not take ids above max(id) until this transaction,
+    # which also inserts the rows, commits. A no-op delete takes SQLite's
+    # database write lock now rather than at the first insert; elsewhere the
+    # highest row is locked FOR UPDATE.
+    if session.get_bind().dialect.name == "sqlite":
+        session.execute(table.delete().where(false()))
+    last = session.execute(
+        select([table.c.id]).order_by(table.c.id.desc()).limit(1).with_for_update()
+    ).scalar()
+    start = last or 0
+    return list(range(start + 1, start + 1 + count))
+
+
+def insert_rows(session, table, records):
+    """Insert dict records into `table` with COPY on Postgres, else executemany."""
+    if not records:
+        return
+
+    connection = session.connection()
+    columns = list(records[0])
+
+    if connection.dialect.name == "postgresql":
+        # COPY reads an unquoted empty CSV field as NULL by default, which
+        # would turn every "" into NULL. NULLs are spelled out instead.
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(
+            [
+                COPY_NULL if record[column] is None else record[column]
+                for column in columns
+            ]
+            for record in records
+        )
+        buffer.seek(0)
+        cursor = connection.connection.cursor()
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(columns)}) FROM STDIN"
+            f" WITH (FORMAT csv, NULL '{COPY_NULL}')",
+            buffer,
+        )
+    else:
+        connection.execute(table.insert(), records)
+
+
+def insert_entities(session, model, records):
+    """Insert venue or artist records and their genres; returns the new ids."""
+    genre_model, genre_key = GENRE_MODELS[model]
+    ids = allocate_ids(session, model.__table__, len(records))
+    now = datetime.datetime.utcnow()
+
+    entities = []
+    genres = []
+    for entity_id, record in zip(ids, records):
+        # A genre listed twice is stored once.
+        record_genres = list(dict.fromkeys(record.pop("genres")))
+        record.pop("csrf_token", None)
+        record.update(
+            id=entity_id,
+            updated_at=now,
+            search_document=build_search_document(
+                record["name"], record["city"], record["state"], record_genres
+            ),
+            genre_mask=genre_mask(record_genres),
+        )
+        entities.append(with_defaults(model.__table__, record))
+        genres.extend({genre_key: entity_id, "genre": genre} for genre in record_genres)
+
+    insert_rows(session, model.__table__, entities)
+    insert_rows(session, genre_model.__table__, genres)
+
+    seeking = SEEKING_COLUMNS[model]
+    update_facet_counts(
+        session,
+        model,
+        added=[
+            value
+            for entity in entities
+            for value in facet_values(
+                model,
+                entity["state"],
+                entity["city"],
+                entity["genre_mask"],
+                entity[seeking],
+            )
+        ],
+    )
+    return ids
+
+
+def entity_writer(model):
+    def write(session, records):
+        insert_entities(session, model, [record for _, record in records])
+        return [], len(records)
+
+    return write
+
+
+def write_shows(session, records):
+    """Insert shows whose artist and venue exist and that overlap no booking."""
+    now = datetime.datetime.utcnow()
+    rejected = []
+    candidates = []
+
+    for line_number, record in records:
+        try:
+            artist_id, venue_id = int(record["artist_id"]), int(record["venue_id"])
+        except (TypeError, ValueError):
+            errors = {"ids": ["artist_id and venue_id must be integers"]}
+            rejected.append((line_number, errors))
+            continue
+        start_time = record["start_time"]
+        duration = record.get("duration")
+        end_time = start_time + (
+            datetime.timedelta(minutes=duration) if duration else DEFAULT_SHOW_DURATION
+        )
+        candidates.append((line_number, artist_id, venue_id, start_time, end_time))
+
+    if not candidates:
+        return rejected, 0
+
+    # Foreign keys and conflicts are resolved for the whole batch at once.
+    artist_ids = {candidate[1] for candidate in candidates}
+    venue_ids = {candidate[2] for candidate in candidates}
+    known_artists = {
+        artist_id
+        for (artist_id,) in session.query(Artist.id).filter(Artist.id.in_(artist_ids))
+    }
+    live_venues = session.query(Venue.id).filter(Venue.id.in_(venue_ids), live(Venue))
+    known_venues = {venue_id for (venue_id,) in live_venues}
+    booked = IntervalIndex.for_shows(
+        session,
+        artist_ids,
+        venue_ids,
+        min(candidate[3] for candidate in candidates),
+        max(candidate[4] for candidate in candidates),
+    )
+
+    shows = []
+    for line_number, artist_id, venue_id, start_time, end_time in candidates:
+        conflict = booked.conflict(
+            ("artist", artist_id), start_time, end_time
+        ) or booked.conflict(("venue", venue_id), start_time, end_time)
+        if artist_id not in known_artists:
+            rejected.append((line_number, {"artist_id": [f"no artist {artist_id}"]}))
+        elif venue_id not in known_venues:
+            rejected.append((line_number, {"venue_id": [f"no venue {venue_id}"]}))
+        elif conflict:
+            # Shows already stored carry their id; rows of this file, their line.
+            start, end, booking = conflict
+            errors = [f"overlaps {booking} from {start} to {end}"]
+            rejected.append((line_number, {"start_time": errors}))
+        else:
+            booking = f"line {line_number}"
+            booked.add(("artist", artist_id), start_time, end_time, booking)
+            booked.add(("venue", venue_id), start_time, end_time, booking)
+            shows.append(
+                {
+                    "artist_id": artist_id,
+                    "venue_id": venue_id,
+                    "start_time": start_time,
+                    "end_time": end_time,
+                    "updated_at": now,
+                }
+            )
+
+    insert_rows(session, Show.__table__, shows)
+
+    written_artists = {show["artist_id"] for show in shows}
+    written_venues = {show["venue_id"] for show in shows}
+    if written_artists:
+        refresh_show_counters(session, Artist, Artist.id.in_(written_artists))
+        refresh_show_counters(session, Venue, Venue.id.in_(written_venues))
+
+    return rejected, len(shows)
+
+
+WRITERS = {
+    "venues": entity_writer(Venue),
+    "artists": entity_writer(Artist),
+    "shows": write_shows,
+}
+
+
+def import_file(session, kind, path, batch_size, rejects):
+    """Import `path` into `kind`, writing rejected rows to the `rejects` file.
+
+    Yields a per-batch report dict: batch number, rows read, rows inserted,
+    rows rejected and rows per second.
+    """
+    write = WRITERS[kind]
+
+    for batch_number, batch in enumerate(batches(read_rows(path), batch_size), 1):
+        started = time.perf_counter()
+        rows = dict(batch)
+
+        valid = []
+        rejected = []
+        for line_number, row in batch:
+            record, errors = validate_row(kind, row)
+            if errors:
+                rejected.append((line_number, errors))
+            else:
+                valid.append((line_number, record))
+
+        try:
+            write_rejected, inserted = write(session, valid)
+            session.commit()
+            rejected.extend(write_rejected)
+        except Exception as error:
+            session.rollback()
+            inserted = 0
+            rejected.extend(
+                (line_number, {"batch": [str(error)]}) for line_number, _ in valid
+            )
+
+        for line_number, errors in sorted(rejected, key=lambda item: item[0]):
+            rejects.write(
+                json.dumps(
+                    {"line": line_number, "row": rows[line_number], "errors": errors},
+                    default=str,
+                )
+                + "\n"
+            )
+
+        elapsed = time.perf_counter() - started
+        yield {
+            "batch": batch_number,
+            "read": len(batch),
+            "inserted": inserted,
+            "rejected": len(rejected),
+            "rows_per_second": len(batch) / elapsed if elapsed else float("inf"),
+        }
@@ -0,0 +1,347 @@
+import datetime
+import json
+import os
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import case, func
+
+from models import Job
+
+# ----------------------------------------------------------------------------#
+# Job queue.
+# ----------------------------------------------------------------------------#
+
+# Work that should not hold up a request is stored as a row in `jobs`,
+# usually in the same transaction as the change that calls for it, so that
+# it runs exactly when that change commits. `flask worker` claims due jobs
+# and runs their handlers on a thread pool. A job that raises is retried with
+# exponential backoff until it runs out of attempts. Jobs enqueued with the
+# same dedup key while one is still queued collapse into that one.
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+# Queued duplicates made redundant by a job with the same dedup key.
+SKIPPED = "skipped"
+
+MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = datetime.timedelta(seconds=5)
+RETRY_MAX_DELAY = datetime.timedelta(hours=1)
+
+# A job whose lease has not been renewed for this long is assumed to have
+# lost its worker and is queued again. Workers renew the leases of the jobs
+# they run every LEASE_RENEWAL_INTERVAL, so long jobs keep theirs.
+JOB_LEASE = datetime.timedelta(minutes=15)
+LEASE_RENEWAL_INTERVAL = datetime.timedelta(minutes=1)
+
+# Finished jobs are kept this long for /jobs/stats, then deleted by the
+# worker every JOB_PURGE_INTERVAL, so that the table only grows with the queue.
+JOB_RETENTION = datetime.timedelta(days=7)
+JOB_PURGE_INTERVAL = datetime.timedelta(hours=1)
+
+# Handlers by job kind, registered with @job_handler. Each is called with the
+# worker's session and the job's payload as keyword arguments.
+JOB_HANDLERS = {}
+
+
+def job_handler(kind):
+    def register(handler):
+        JOB_HANDLERS[kind] = handler
+        return handler
+
+    return register
+
+
+def enqueue(
+    session, kind, payload=None, dedup_key=None, delay=None, max_attempts=MAX_ATTEMPTS
+):
+    """Add a job to the open transaction; returns it, or the queued duplicate.
+
+    Nothing runs until the caller commits.
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    if dedup_key is not None:
+        queued = (
+            session.query(Job)
+            .filter(Job.dedup_key == dedup_key, Job.status == QUEUED)
+            .first()
+        )
+        if queued is not None:
+            return queued
+
+    now = datetime.datetime.utcnow()
+    job = Job(
+        kind=kind,
+        payload=json.dumps(payload or {}, sort_keys=True),
+        dedup_key=dedup_key,
+        status=QUEUED,
+        attempts=0,
+        max_attempts=max_attempts,
+        run_at=now + (delay or datetime.timedelta()),
+        created_at=now,
+    )
+    session.add(job)
+    return job
+
+
+def retry_delay(attempts):
+    """Backoff before the next attempt: doubling from the base, with jitter."""
+    delay = min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+    return delay * random.uniform(1, 1.25)
+
+
+def requeue_expired(session):
+    """Queue again the jobs whose worker stopped while running them.
+
+    Jobs that have used up their attempts fail instead, so that a job which
+    keeps killing its worker does not run forever. Returns how many expired.
+    """
+    now = datetime.datetime.utcnow()
+    expired = Job.status == RUNNING, Job.locked_at < now - JOB_LEASE
+
+    failed = (
+        session.query(Job)
+        .filter(*expired, Job.attempts >= Job.max_attempts)
+        .update(
+            {
+                Job.status: FAILED,
+                Job.locked_by: None,
+                Job.locked_at: None,
+                Job.finished_at: now,
+                Job.last_error: "Lease expired",
+            },
+            synchronize_session=False,
+        )
+    )
+    requeued = (
+        session.query(Job)
+        .filter(*expired)
+        .update(
+            {Job.status: QUEUED, Job.locked_by: None, Job.locked_at: None},
+            synchronize_session=False,
+        )
+    )
+    session.commit()
+    return failed + requeued
+
+
+def purge_finished_jobs(session, retention=JOB_RETENTION):
+    """Delete jobs that finished more than `retention` ago; returns how many."""
+    purged = (
+        session.query(Job)
+        .filter(
+            Job.status.in_([DONE, FAILED, SKIPPED]),
+            Job.finished_at < datetime.datetime.utcnow() - retention,
+        )
+        .delete(synchronize_session=False)
+    )
+    session.commit()
+    return purged
+
+
+def renew_leases(session, worker_id, job_ids):
+    """Extend the leases of this worker's running jobs; returns how many."""
+    if not job_ids:
+        return 0
+    renewed = (
+        session.query(Job)
+        .filter(
+            Job.id.in_(job_ids), Job.status == RUNNING, Job.locked_by == worker_id
+        )
+        .update({Job.locked_at: datetime.datetime.utcnow()}, synchronize_session=False)
+    )
+    session.commit()
+    return renewed
+
+
+def claim_next(session, worker_id):
+    """Mark the next due job as running for this worker; returns its id or None.
+
+    The claim is a conditional UPDATE, so when workers race for a job only
+    one of them matches the row and the others move on to the next one.
+    """
+    while True:
+        now = datetime.datetime.utcnow()
+        candidate = (
+            session.query(Job.id, Job.dedup_key)
+            .filter(Job.status == QUEUED, Job.run_at <= now)
+            .order_by(Job.run_at, Job.id)
+            .first()
+        )
+        if candidate is None:
+            session.commit()
+            return None
+
+        claimed = (
+            session.query(Job)
+            .filter(Job.id == candidate.id, Job.status == QUEUED)
+            .update(
+                {
+                    Job.status: RUNNING,
+                    Job.locked_by: worker_id,
+                    Job.locked_at: now,
+                    Job.started_at: now,
+                    Job.attempts: Job.attempts + 1,
+                },
+                synchronize_session=False,
+            )
+        )
+        if claimed and candidate.dedup_key is not None:
+            # This run covers everything enqueued under the key until now.
+            session.query(Job).filter(
+                Job.dedup_key == candidate.dedup_key,
+                Job.status == QUEUED,
+                Job.run_at <= now,
+            ).update(
+                {Job.status: SKIPPED, Job.finished_at: now}, synchronize_session=False
+            )
+        session.commit()
+
+        if claimed:
+            return candidate.id
+
+
+def run_job(session, job_id):
+    """Run a claimed job and record its outcome; returns (kind, status, seconds)."""
+    job = session.query(Job).get(job_id)
+    kind, payload = job.kind, json.loads(job.payload)
+
+    started = time.perf_counter()
+    try:
+        JOB_HANDLERS[kind](session, **payload)
+        session.commit()
+        error = None
+    except Exception as exception:
+        session.rollback()
+        error = f"{type(exception).__name__}: {exception}"
+    elapsed = time.perf_counter() - started
+
+    job = session.query(Job).get(job_id)
+    now = datetime.datetime.utcnow()
+    job.duration_ms = int(elapsed * 1000)
+    job.locked_by = None
+    job.locked_at = None
+    job.last_error = error
+    if error is None:
+        job.status = DONE
+        job.finished_at = now
+    elif job.attempts < job.max_attempts:
+        job.status = QUEUED
+        job.run_at = now + retry_delay(job.attempts)
+    else:
+        job.status = FAILED
+        job.finished_at = now
+    status = job.status
+    session.commit()
+
+    return kind, status, elapsed
+
+
+class Worker:
+    """Claims due jobs and runs them on a pool of threads.
+
+    Each job runs in its own application context, and so in its own session.
+    """
+
+    def __init__(self, app, session, threads=4, poll_interval=1.0, log=print):
+        self.app = app
+        self.session = session
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.log = log
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.stopping = threading.Event()
+
+    def execute(self, job_id):
+        try:
+            with self.app.app_context():
+                kind, status, elapsed = run_job(self.session, job_id)
+        except Exception as exception:
+            # The job stays running until its lease expires, then runs again.
+            self.log(f"job {job_id}: could not record its outcome: {exception}")
+            return
+        self.log(f"job {job_id} {kind}: {status} in {elapsed * 1000:.1f} ms")
+
+    def run(self):
+        # Job ids by the future running them.
+        running = {}
+        renewed_at = time.monotonic()
+        # Purge on the first poll, then every JOB_PURGE_INTERVAL.
+        purged_at = None
+        with ThreadPoolExecutor(self.threads, thread_name_prefix="job") as executor:
+            while not self.stopping.is_set():
+                running = {
+                    future: job_id
+                    for future, job_id in running.items()
+                    if not future.done()
+                }
+
+                claimed = 0
+                with self.app.app_context():
+                    # A database error only costs this poll; the next one
+                    # starts from a clean session.
+                    try:
+                        now = time.monotonic()
+                        if now - renewed_at >= LEASE_RENEWAL_INTERVAL.total_seconds():
+                            renew_leases(
+                                self.session, self.worker_id, list(running.values())
+                            )
+                            renewed_at = now
+
+                        requeue_expired(self.session)
+                        if (
+                            purged_at is None
+                            or now - purged_at >= JOB_PURGE_INTERVAL.total_seconds()
+                        ):
+                            purged = purge_finished_jobs(self.session)
+                            if purged:
+                                self.log(f"worker: purged {purged} finished jobs")
+                            purged_at = now
+
+                        while len(running) < self.threads:
+                            job_id = claim_next(self.session, self.worker_id)
+                            if job_id is None:
+                                break
+                            running[executor.submit(self.execute, job_id)] = job_id
+                            claimed += 1
+                    except Exception as exception:
+                        self.log(f"worker: poll failed: {exception}")
+                        self.session.rollback()
+                        claimed = 0
+
+                if not claimed:
+                    self.stopping.wait(self.poll_interval)
+
+
+def job_stats(session):
+    """Per job kind: jobs by status and the timing of the finished ones."""
+    finished = Job.status.in_([DONE, FAILED])
+    rows = session.query(
+        Job.kind,
+        Job.status,
+        func.count(Job.id),
+        func.avg(case([(finished, Job.duration_ms)])),
+        func.max(case([(finished, Job.duration_ms)])),
+        func.min(Job.run_at),
+    ).group_by(Job.kind, Job.status)
+
+    stats = {}
+    now = datetime.datetime.utcnow()
+    for kind, status, count, average_ms, max_ms, first_run_at in rows:
+        kind_stats = stats.setdefault(kind, {"jobs": {}})
+        kind_stats["jobs"][status] = count
+        if status == DONE:
+            kind_stats["average_ms"] = float(average_ms or 0)
+            kind_stats["max_ms"] = max_ms
+        if status == QUEUED:
+            # How long the oldest due job has been waiting.
+            lag = (now - first_run_at).total_seconds()
+            kind_stats["queue_lag_seconds"] = max(lag, 0)
+    return stats
@@ -0,0 +1,52 @@
+"""Added a genres lookup table and genre_mask bitmasks on venues and artists
+
+Revision ID: 0b7d2e94c6a1
+Revises: f3a95c1e7d28
+Create Date: 2026-10-18 15:37:08.214470
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from genres import genre_rows
+
+
+# revision identifiers, used by Alembic.
+revision = '0b7d2e94c6a1'
+down_revision = 'f3a95c1e7d28'
+branch_labels = None
+depends_on = None
+
+
+MASKED_TABLES = [
+    ('venues', 'venue_genres', 'venue_id'),
+    ('artists', 'artist_genres', 'artist_id'),
+]
+
+
+def upgrade():
+    genres = op.create_table('genres',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    # Seeded from genres.GENRE_NAMES: the id of each genre is its position
+    # there, and its bit in the masks.
+    op.bulk_insert(genres, genre_rows())
+
+    for table, genre_table, owner in MASKED_TABLES:
+        op.add_column(table, sa.Column('genre_mask', sa.BigInteger(), server_default='0', nullable=False))
+        # Genres outside the list have no row in `genres`, and so no bit.
+        op.execute(
+            f'UPDATE {table} SET genre_mask = genre_mask | ('
+            f'SELECT CAST(coalesce(sum(DISTINCT CAST(1 AS BIGINT) << genres.id), 0) AS BIGINT) '
+            f'FROM {genre_table} JOIN genres ON genres.name = {genre_table}.genre '
+            f'WHERE {genre_table}.{owner} = {table}.id)'
+        )
+
+
+def downgrade():
+    for table, _, _ in reversed(MASKED_TABLES):
+        op.drop_column(table, 'genre_mask')
+    op.drop_table('genres')
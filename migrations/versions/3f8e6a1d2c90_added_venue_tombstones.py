@@ -0,0 +1,24 @@
+"""Added deleted_at to venues for background deletion
+
+Revision ID: 3f8e6a1d2c90
+Revises: 9c41f7e2b6d5
+Create Date: 2026-10-18 17:21:36.604187
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f8e6a1d2c90'
+down_revision = '9c41f7e2b6d5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('venues', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('venues', 'deleted_at')
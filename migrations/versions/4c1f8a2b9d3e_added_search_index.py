@@ -0,0 +1,81 @@
+"""Added search_document columns and a search index for venues and artists
+
+Revision ID: 4c1f8a2b9d3e
+Revises: 70dc02d8c35f
+Create Date: 2026-10-18 10:12:31.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c1f8a2b9d3e'
+down_revision = '70dc02d8c35f'
+branch_labels = None
+depends_on = None
+
+
+SEARCHABLE_TABLES = {
+    'venues': ('venue_genres', 'venue_id'),
+    'artists': ('artist_genres', 'artist_id'),
+}
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    genre_agg = "string_agg(genre, ' ')" if dialect == 'postgresql' else "group_concat(genre, ' ')"
+
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    for table, (genre_table, genre_key) in SEARCHABLE_TABLES.items():
+        op.add_column(table, sa.Column('search_document', sa.Text(), nullable=True))
+        op.execute(
+            f"UPDATE {table} SET search_document = "
+            f"coalesce(name, '') || ' ' || coalesce(city, '') || ' ' || coalesce(state, '')"
+            f" || coalesce((SELECT ' ' || {genre_agg} FROM {genre_table}"
+            f" WHERE {genre_table}.{genre_key} = {table}.id), '')"
+        )
+
+        if dialect == 'postgresql':
+            op.execute(
+                f'CREATE INDEX ix_{table}_search_document_trgm '
+                f'ON {table} USING gin (search_document gin_trgm_ops)'
+            )
+        elif dialect == 'sqlite':
+            op.execute(
+                f"CREATE VIRTUAL TABLE {table}_fts USING fts5("
+                f"search_document, content='{table}', content_rowid='id', tokenize='trigram')"
+            )
+            op.execute(
+                f"CREATE TRIGGER {table}_fts_ai AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO {table}_fts(rowid, search_document) "
+                f"VALUES (new.id, new.search_document); END"
+            )
+            op.execute(
+                f"CREATE TRIGGER {table}_fts_ad AFTER DELETE ON {table} BEGIN "
+                f"INSERT INTO {table}_fts({table}_fts, rowid, search_document) "
+                f"VALUES ('delete', old.id, old.search_document); END"
+            )
+            op.execute(
+                f"CREATE TRIGGER {table}_fts_au AFTER UPDATE OF search_document ON {table} BEGIN "
+                f"INSERT INTO {table}_fts({table}_fts, rowid, search_document) "
+                f"VALUES ('delete', old.id, old.search_document); "
+                f"INSERT INTO {table}_fts(rowid, search_document) "
+                f"VALUES (new.id, new.search_document); END"
+            )
+            op.execute(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    for table in SEARCHABLE_TABLES:
+        if dialect == 'postgresql':
+            op.execute(f'DROP INDEX IF EXISTS ix_{table}_search_document_trgm')
+        elif dialect == 'sqlite':
+            for trigger in ('ai', 'ad', 'au'):
+                op.execute(f'DROP TRIGGER IF EXISTS {table}_fts_{trigger}')
+            op.execute(f'DROP TABLE IF EXISTS {table}_fts')
+        op.drop_column(table, 'search_document')
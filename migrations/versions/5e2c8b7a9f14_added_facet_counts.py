@@ -0,0 +1,52 @@
+"""Added facet_counts for faceted browsing of venues and artists
+
+Revision ID: 5e2c8b7a9f14
+Revises: 0b7d2e94c6a1
+Create Date: 2026-10-18 16:12:40.772913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e2c8b7a9f14'
+down_revision = '0b7d2e94c6a1'
+branch_labels = None
+depends_on = None
+
+
+FACETED_TABLES = {
+    'venues': 'seeking_talent',
+    'artists': 'seeking_venue',
+}
+
+
+def upgrade():
+    op.create_table('facet_counts',
+    sa.Column('listing', sa.String(length=20), nullable=False),
+    sa.Column('facet', sa.String(length=20), nullable=False),
+    sa.Column('value', sa.String(length=250), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('listing', 'facet', 'value')
+    )
+
+    # The same values as facets.facet_values, counted in SQL.
+    for table, seeking in FACETED_TABLES.items():
+        selects = [
+            f"SELECT 'state', state, count(*) FROM {table} GROUP BY state",
+            f"SELECT 'city', city || ', ' || state, count(*) FROM {table} GROUP BY city, state",
+            f"SELECT 'genre', genres.name, count(*) FROM {table} JOIN genres "
+            f"ON ({table}.genre_mask & (CAST(1 AS BIGINT) << genres.id)) <> 0 GROUP BY genres.name",
+            f"SELECT 'seeking', CASE WHEN {seeking} THEN 'yes' ELSE 'no' END, count(*) "
+            f"FROM {table} GROUP BY CASE WHEN {seeking} THEN 'yes' ELSE 'no' END",
+        ]
+        for select in selects:
+            op.execute(
+                f"INSERT INTO facet_counts (listing, facet, value, count) "
+                f"SELECT '{table}', facet.* FROM ({select}) AS facet"
+            )
+
+
+def downgrade():
+    op.drop_table('facet_counts')
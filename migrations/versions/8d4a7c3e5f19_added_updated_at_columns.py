@@ -0,0 +1,38 @@
+"""Added updated_at to venues, artists, shows and shows_archive
+
+Revision ID: 8d4a7c3e5f19
+Revises: 2b6e9f4d1a83
+Create Date: 2026-10-18 14:10:42.338615
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d4a7c3e5f19'
+down_revision = '2b6e9f4d1a83'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ['venues', 'artists', 'shows', 'shows_archive']
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    # The application stores updated_at as naive UTC.
+    utc_now = "now() AT TIME ZONE 'utc'" if dialect == 'postgresql' else 'CURRENT_TIMESTAMP'
+
+    for table in TABLES:
+        # Added nullable and backfilled, since SQLite cannot add a column
+        # with a non-constant default.
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.execute(f'UPDATE {table} SET updated_at = {utc_now}')
+        if dialect != 'sqlite':
+            op.alter_column(table, 'updated_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        op.drop_column(table, 'updated_at')
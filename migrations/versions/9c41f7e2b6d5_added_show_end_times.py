@@ -0,0 +1,98 @@
+"""Added end_time to shows and, on Postgres, constraints against double bookings
+
+Revision ID: 9c41f7e2b6d5
+Revises: 5e2c8b7a9f14
+Create Date: 2026-10-18 16:48:03.119254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c41f7e2b6d5'
+down_revision = '5e2c8b7a9f14'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ['shows', 'shows_archive']
+
+# Existing shows get scheduling.DEFAULT_SHOW_DURATION.
+DEFAULT_END_TIME = {
+    'postgresql': "start_time + interval '2 hours'",
+    'sqlite': "datetime(start_time, '+2 hours')",
+}
+
+# The end times set above are made up, so where one runs into the next show
+# of the same venue or artist it is cut back to that show's start.
+TRIM_OVERLAPPING_END_TIMES = """
+UPDATE shows SET end_time = (
+    SELECT min(other.start_time) FROM shows AS other
+    WHERE (other.venue_id = shows.venue_id OR other.artist_id = shows.artist_id)
+    AND other.start_time > shows.start_time AND other.start_time < shows.end_time
+)
+WHERE EXISTS (
+    SELECT 1 FROM shows AS other
+    WHERE (other.venue_id = shows.venue_id OR other.artist_id = shows.artist_id)
+    AND other.start_time > shows.start_time AND other.start_time < shows.end_time
+)
+"""
+
+# Pairs still overlapping after trimming: shows of one venue or artist
+# starting at the same moment.
+OVERLAPPING_SHOWS = """
+SELECT a.id, b.id, a.start_time FROM shows AS a JOIN shows AS b
+ON a.id < b.id
+AND (a.venue_id = b.venue_id OR a.artist_id = b.artist_id)
+AND a.start_time < b.end_time AND b.start_time < a.end_time
+ORDER BY a.start_time, a.id, b.id
+"""
+
+EXCLUSION_CONSTRAINTS = [
+    ('ex_shows_venue_id_during', 'venue_id'),
+    ('ex_shows_artist_id_during', 'artist_id'),
+]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    for table in TABLES:
+        op.add_column(table, sa.Column('end_time', sa.DateTime(), nullable=True))
+        op.execute(f'UPDATE {table} SET end_time = {DEFAULT_END_TIME[dialect]}')
+        if dialect != 'sqlite':
+            op.alter_column(table, 'end_time', existing_type=sa.DateTime(), nullable=False)
+
+    op.execute(TRIM_OVERLAPPING_END_TIMES)
+
+    if dialect == 'postgresql':
+        # Double bookings cannot be resolved here: the upgrade stops, and
+        # rolls back, until one show of each pair is rebooked or deleted.
+        overlaps = op.get_bind().execute(sa.text(OVERLAPPING_SHOWS)).fetchall()
+        if overlaps:
+            pairs = '\n'.join(
+                f'  shows {first} and {second} at {start_time}'
+                for first, second, start_time in overlaps
+            )
+            raise RuntimeError(
+                f'{len(overlaps)} pairs of shows share a venue or artist at the '
+                f'same time:\n{pairs}'
+            )
+
+        # btree_gist lets the integer ids share a GiST index with the ranges.
+        op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+        for name, column in EXCLUSION_CONSTRAINTS:
+            op.execute(
+                f'ALTER TABLE shows ADD CONSTRAINT {name} EXCLUDE USING gist '
+                f'({column} WITH =, tsrange(start_time, end_time) WITH &&)'
+            )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for name, _ in reversed(EXCLUSION_CONSTRAINTS):
+            op.drop_constraint(name, 'shows')
+
+    for table in reversed(TABLES):
+        op.drop_column(table, 'end_time')
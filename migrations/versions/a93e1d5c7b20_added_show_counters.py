@@ -0,0 +1,55 @@
+"""Added upcoming/past show counters and next_show_at to venues and artists
+
+Revision ID: a93e1d5c7b20
+Revises: 4c1f8a2b9d3e
+Create Date: 2026-10-18 11:02:47.518304
+
+"""
+import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a93e1d5c7b20'
+down_revision = '4c1f8a2b9d3e'
+branch_labels = None
+depends_on = None
+
+
+COUNTED_TABLES = {
+    'venues': 'venue_id',
+    'artists': 'artist_id',
+}
+
+
+def upgrade():
+    now = datetime.datetime.now()
+
+    for table, show_key in COUNTED_TABLES.items():
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(), server_default='0', nullable=False))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(), server_default='0', nullable=False))
+        op.add_column(table, sa.Column('next_show_at', sa.DateTime(), nullable=True))
+        op.create_index(op.f(f'ix_{table}_next_show_at'), table, ['next_show_at'], unique=False)
+
+        op.get_bind().execute(
+            sa.text(
+                f'UPDATE {table} SET '
+                f'upcoming_shows_count = (SELECT count(*) FROM shows '
+                f'WHERE shows.{show_key} = {table}.id AND shows.start_time >= :now), '
+                f'past_shows_count = (SELECT count(*) FROM shows '
+                f'WHERE shows.{show_key} = {table}.id AND shows.start_time < :now), '
+                f'next_show_at = (SELECT min(shows.start_time) FROM shows '
+                f'WHERE shows.{show_key} = {table}.id AND shows.start_time >= :now)'
+            ),
+            now=now,
+        )
+
+
+def downgrade():
+    for table in COUNTED_TABLES:
+        op.drop_index(op.f(f'ix_{table}_next_show_at'), table_name=table)
+        op.drop_column(table, 'next_show_at')
+        op.drop_column(table, 'past_shows_count')
+        op.drop_column(table, 'upcoming_shows_count')
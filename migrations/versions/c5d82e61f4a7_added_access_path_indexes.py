@@ -0,0 +1,43 @@
+"""Added indexes for the shows, genre and location access paths
+
+Revision ID: c5d82e61f4a7
+Revises: a93e1d5c7b20
+Create Date: 2026-10-18 11:40:09.260731
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d82e61f4a7'
+down_revision = 'a93e1d5c7b20'
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns) -- each one matches a query shape in app.py:
+#   detail pages and counters filter shows by venue/artist and range on time,
+#   /shows walks (start_time, artist_id, venue_id) as a keyset,
+#   /venues groups by state/city, detail pages load genres by owner id.
+INDEXES = [
+    ('ix_shows_venue_id_start_time', 'shows', ['venue_id', 'start_time']),
+    ('ix_shows_artist_id_start_time', 'shows', ['artist_id', 'start_time']),
+    ('ix_shows_start_time_artist_id_venue_id', 'shows', ['start_time', 'artist_id', 'venue_id']),
+    ('ix_venues_state_city', 'venues', ['state', 'city']),
+    ('ix_venue_genres_venue_id', 'venue_genres', ['venue_id']),
+    ('ix_artist_genres_artist_id', 'artist_genres', ['artist_id']),
+]
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
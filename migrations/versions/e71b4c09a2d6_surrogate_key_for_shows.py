@@ -0,0 +1,86 @@
+"""Gave shows a surrogate id so an artist can play a venue more than once
+
+Revision ID: e71b4c09a2d6
+Revises: c5d82e61f4a7
+Create Date: 2026-10-18 12:21:55.904318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e71b4c09a2d6'
+down_revision = 'c5d82e61f4a7'
+branch_labels = None
+depends_on = None
+
+
+SHOW_INDEXES = [
+    ('ix_shows_venue_id_start_time', ['venue_id', 'start_time']),
+    ('ix_shows_artist_id_start_time', ['artist_id', 'start_time']),
+    ('ix_shows_start_time_artist_id_venue_id', ['start_time', 'artist_id', 'venue_id']),
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        # In place: SERIAL numbers the existing rows while adding the column.
+        op.drop_constraint('shows_pkey', 'shows', type_='primary')
+        op.execute('ALTER TABLE shows ADD COLUMN id SERIAL NOT NULL')
+        op.create_primary_key('shows_pkey', 'shows', ['id'])
+        op.create_unique_constraint('uq_shows_artist_id_venue_id_start_time', 'shows', ['artist_id', 'venue_id', 'start_time'])
+        return
+
+    # Databases that cannot alter a primary key get a rebuilt table.
+    op.create_table('shows_new',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['artist_id'], ['artists.id'], ),
+    sa.ForeignKeyConstraint(['venue_id'], ['venues.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('artist_id', 'venue_id', 'start_time', name='uq_shows_artist_id_venue_id_start_time')
+    )
+    op.execute(
+        'INSERT INTO shows_new (artist_id, venue_id, start_time) '
+        'SELECT artist_id, venue_id, start_time FROM shows ORDER BY start_time'
+    )
+    op.drop_table('shows')
+    op.rename_table('shows_new', 'shows')
+    for name, columns in SHOW_INDEXES:
+        op.create_index(name, 'shows', columns, unique=False)
+
+
+def downgrade():
+    # The old key allows one show per artist/venue pair: only the earliest
+    # show of each pair survives the downgrade.
+    op.execute(
+        'DELETE FROM shows WHERE id NOT IN '
+        '(SELECT min(id) FROM shows GROUP BY artist_id, venue_id)'
+    )
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_constraint('uq_shows_artist_id_venue_id_start_time', 'shows', type_='unique')
+        op.drop_constraint('shows_pkey', 'shows', type_='primary')
+        op.drop_column('shows', 'id')
+        op.create_primary_key('shows_pkey', 'shows', ['artist_id', 'venue_id'])
+        return
+
+    op.create_table('shows_old',
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['artist_id'], ['artists.id'], ),
+    sa.ForeignKeyConstraint(['venue_id'], ['venues.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('artist_id', 'venue_id')
+    )
+    op.execute(
+        'INSERT INTO shows_old (artist_id, venue_id, start_time) '
+        'SELECT artist_id, venue_id, start_time FROM shows'
+    )
+    op.drop_table('shows')
+    op.rename_table('shows_old', 'shows')
+    for name, columns in SHOW_INDEXES:
+        op.create_index(name, 'shows', columns, unique=False)
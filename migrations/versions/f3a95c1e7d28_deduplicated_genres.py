@@ -0,0 +1,50 @@
+"""Removed duplicate genre rows and made genres unique per venue and artist
+
+Revision ID: f3a95c1e7d28
+Revises: 8d4a7c3e5f19
+Create Date: 2026-10-18 15:02:17.581904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a95c1e7d28'
+down_revision = '8d4a7c3e5f19'
+branch_labels = None
+depends_on = None
+
+
+GENRE_TABLES = [
+    ('venue_genres', 'venue_id', 'venues'),
+    ('artist_genres', 'artist_id', 'artists'),
+]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    genre_agg = "string_agg(genre, ' ')" if dialect == 'postgresql' else "group_concat(genre, ' ')"
+
+    for table, owner, owner_table in GENRE_TABLES:
+        # Edits used to append every submitted genre again: keep the first row
+        # of each (owner, genre) pair.
+        op.execute(
+            f'DELETE FROM {table} WHERE id NOT IN '
+            f'(SELECT min(id) FROM {table} GROUP BY {owner}, genre)'
+        )
+        op.create_index(f'uq_{table}_{owner}_genre', table, [owner, 'genre'], unique=True)
+
+        # Search documents were built from the duplicated rows (4c1f8a2b9d3e).
+        # On SQLite the FTS table follows through its update trigger.
+        op.execute(
+            f"UPDATE {owner_table} SET search_document = "
+            f"coalesce(name, '') || ' ' || coalesce(city, '') || ' ' || coalesce(state, '')"
+            f" || coalesce((SELECT ' ' || {genre_agg} FROM {table}"
+            f" WHERE {table}.{owner} = {owner_table}.id), '')"
+        )
+
+
+def downgrade():
+    for table, owner, _ in reversed(GENRE_TABLES):
+        op.drop_index(f'uq_{table}_{owner}_genre', table_name=table)
@@ -1,265 +1,293 @@
-from app import Venue, Venue_Genre, db
+import datetime
+import json
+import os
+import random
+from itertools import accumulate
 
+from forms import VenueForm
+from models import Venue, Artist, Show
+from counters import refresh_show_counters
+from importer import batches, insert_entities, insert_rows
+from scheduling import DEFAULT_SHOW_DURATION
 
-def insert_venue_record(data):
-    try:
-        new_venue = Venue(
-            name=data["name"],
-            city=data["city"],
-            state=data["state"],
-            address=data["address"],
-            phone=data["phone"],
-            facebook_link=data["facebook_link"],
-        )
-
-        genres_for_this_venue = []
-        for genre in data["genres"]:
-            current_genre = Venue_Genre(genre=genre)
-            current_genre.venue = new_venue
-            genres_for_this_venue.append(current_genre)
-
-        db.session.add(new_venue)
-        db.session.commit()
-        {"venue_insert_success": True}
-
-    except:
-        db.session.rollback()
-        return {"venue_insert_success": False}
-
-
-def populate_venue_table():
-    data1 = {
-        "name": "The Musical Hop",
-        "genres": ["Jazz", "Reggae", "Swing", "Classical", "Folk"],
-        "address": "1015 Folsom Street",
-        "city": "San Francisco",
-        "state": "CA",
-        "phone": "123-123-1234",
-        "website": "https://www.themusicalhop.com",
-        "facebook_link": "https://www.facebook.com/TheMusicalHop",
-        "seeking_talent": True,
-        "seeking_description": "We are on the lookout for a local artist to play every two weeks. Please call us.",
-        "image_link": "https://images.unsplash.com/photo-1543900694-133f37abaaa5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=400&q=60",
-    }
-
-    data2 = {
-        "name": "The Dueling Pianos Bar",
-        "genres": ["Classical", "R&B", "Hip-Hop"],
-        "address": "335 Delancey Street",
-        "city": "New York",
-        "state": "NY",
-        "phone": "914-003-1132",
-        "website": "https://www.theduelingpianos.com",
-        "facebook_link": "https://www.facebook.com/theduelingpianos",
-        "seeking_talent": False,
-        "image_link": "https://images.unsplash.com/photo-1497032205916-ac775f0649ae?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=750&q=80",
-    }
-
-    data3 = {
-        "name": "Park Square Live Music & Coffee",
-        "genres": ["Rock n Roll", "Jazz", "Classical", "Folk"],
-        "address": "34 Whiskey Moore Ave",
-        "city": "San Francisco",
-        "state": "CA",
-        "phone": "415-000-1234",
-        "website": "https://www.parksquarelivemusicandcoffee.com",
-        "facebook_link": "https://www.facebook.com/ParkSquareLiveMusicAndCoffee",
-        "seeking_talent": False,
-        "image_link": "https://images.unsplash.com/photo-1485686531765-ba63b07845a7?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=747&q=80",
-    }
-
-    mock_data = [data1, data2, data3]
-
-    for data in mock_data:
-        insert_venue_record(data)
-        # Maybe write a test for this?
-
-
-populate_venue_table()
-
-
-def insert_artist_record(data):
-    pass
-
-
-def populate_artist_table():
-    pass
-
-
-# populate_artist_table()
-
-
-def insert_show_record(data):
-    pass
-
-
-# populate_artist_table()
-
-
-# data1 = {
-#     "id": 1,
-#     "name": "The Musical Hop",
-#     "genres": ["Jazz", "Reggae", "Swing", "Classical", "Folk"],
-#     "address": "1015 Folsom Street",
-#     "city": "San Francisco",
-#     "state": "CA",
-#     "phone": "123-123-1234",
-#     "website": "https://www.themusicalhop.com",
-#     "facebook_link": "https://www.facebook.com/TheMusicalHop",
-#     "seeking_talent": True,
-#     "seeking_description": "We are on the lookout for a local artist to play every two weeks. Please call us.",
-#     "image_link": "https://images.unsplash.com/photo-1543900694-133f37abaaa5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=400&q=60",
-#     "past_shows": [
-#         {
-#             "artist_id": 4,
-#             "artist_name": "Guns N Petals",
-#             "artist_image_link": "https://images.unsplash.com/photo-1549213783-8284d0336c4f?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=300&q=80",
-#             "start_time": "2019-05-21T21:30:00.000Z",
-#         }
-#     ],
-#     "upcoming_shows": [],
-#     "past_shows_count": 1,
-#     "upcoming_shows_count": 0,
-# }
-# data2 = {
-#     "id": 2,
-#     "name": "The Dueling Pianos Bar",
-#     "genres": ["Classical", "R&B", "Hip-Hop"],
-#     "address": "335 Delancey Street",
-#     "city": "New York",
-#     "state": "NY",
-#     "phone": "914-003-1132",
-#     "website": "https://www.theduelingpianos.com",
-#     "facebook_link": "https://www.facebook.com/theduelingpianos",
-#     "seeking_talent": False,
-#     "image_link": "https://images.unsplash.com/photo-1497032205916-ac775f0649ae?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=750&q=80",
-#     "past_shows": [],
-#     "upcoming_shows": [],
-#     "past_shows_count": 0,
-#     "upcoming_shows_count": 0,
-# }
-# data3 = {
-#     "id": 3,
-#     "name": "Park Square Live Music & Coffee",
-#     "genres": ["Rock n Roll", "Jazz", "Classical", "Folk"],
-#     "address": "34 Whiskey Moore Ave",
-#     "city": "San Francisco",
-#     "state": "CA",
-#     "phone": "415-000-1234",
-#     "website": "https://www.parksquarelivemusicandcoffee.com",
-#     "facebook_link": "https://www.facebook.com/ParkSquareLiveMusicAndCoffee",
-#     "seeking_talent": False,
-#     "image_link": "https://images.unsplash.com/photo-1485686531765-ba63b07845a7?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=747&q=80",
-#     "past_shows": [
-#         {
-#             "artist_id": 5,
-#             "artist_name": "Matt Quevedo",
-#             "artist_image_link": "https://images.unsplash.com/photo-1495223153807-b916f75de8c5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=334&q=80",
-#             "start_time": "2019-06-15T23:00:00.000Z",
-#         }
-#     ],
-#     "upcoming_shows": [
-#         {
-#             "artist_id": 6,
-#             "artist_name": "The Wild Sax Band",
-#             "artist_image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
-#             "start_time": "2035-04-01T20:00:00.000Z",
-#         },
-#         {
-#             "artist_id": 6,
-#             "artist_name": "The Wild Sax Band",
-#             "artist_image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
-#             "start_time": "2035-04-08T20:00:00.000Z",
-#         },
-#         {
-#             "artist_id": 6,
-#             "artist_name": "The Wild Sax Band",
-#             "artist_image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
-#             "start_time": "2035-04-15T20:00:00.000Z",
-#         },
-#     ],
-#     "past_shows_count": 1,
-#     "upcoming_shows_count": 1,
-# }
-# # data = list(filter(lambda d: d["id"] == venue_id, [data1, data2, data3]))[0]
-
-# data1 = {
-#         "id": 4,
-#         "name": "Guns N Petals",
-#         "genres": ["Rock n Roll"],
-#         "city": "San Francisco",
-#         "state": "CA",
-#         "phone": "326-123-5000",
-#         "website": "https://www.gunsnpetalsband.com",
-#         "facebook_link": "https://www.facebook.com/GunsNPetals",
-#         "seeking_venue": True,
-#         "seeking_description": "Looking for shows to perform at in the San Francisco Bay Area!",
-#         "image_link": "https://images.unsplash.com/photo-1549213783-8284d0336c4f?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=300&q=80",
-#         "past_shows": [
-#             {
-#                 "venue_id": 1,
-#                 "venue_name": "The Musical Hop",
-#                 "venue_image_link": "https://images.unsplash.com/photo-1543900694-133f37abaaa5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=400&q=60",
-#                 "start_time": "2019-05-21T21:30:00.000Z",
-#             }
-#         ],
-#         "upcoming_shows": [],
-#         "past_shows_count": 1,
-#         "upcoming_shows_count": 0,
-#     }
-
-#     data2 = {
-#         "id": 5,
-#         "name": "Matt Quevedo",
-#         "genres": ["Jazz"],
-#         "city": "New York",
-#         "state": "NY",
-#         "phone": "300-400-5000",
-#         "facebook_link": "https://www.facebook.com/mattquevedo923251523",
-#         "seeking_venue": False,
-#         "image_link": "https://images.unsplash.com/photo-1495223153807-b916f75de8c5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=334&q=80",
-#         "past_shows": [
-#             {
-#                 "venue_id": 3,
-#                 "venue_name": "Park Square Live Music & Coffee",
-#                 "venue_image_link": "https://images.unsplash.com/photo-1485686531765-ba63b07845a7?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=747&q=80",
-#                 "start_time": "2019-06-15T23:00:00.000Z",
-#             }
-#         ],
-#         "upcoming_shows": [],
-#         "past_shows_count": 1,
-#         "upcoming_shows_count": 0,
-#     }
-#     data3 = {
-#         "id": 6,
-#         "name": "The Wild Sax Band",
-#         "genres": ["Jazz", "Classical"],
-#         "city": "San Francisco",
-#         "state": "CA",
-#         "phone": "432-325-5432",
-#         "seeking_venue": False,
-#         "image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
-#         "past_shows": [],
-#         "upcoming_shows": [
-#             {
-#                 "venue_id": 3,
-#                 "venue_name": "Park Square Live Music & Coffee",
-#                 "venue_image_link": "https://images.unsplash.com/photo-1485686531765-ba63b07845a7?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=747&q=80",
-#                 "start_time": "2035-04-01T20:00:00.000Z",
-#             },
-#             {
-#                 "venue_id": 3,
-#                 "venue_name": "Park Square Live Music & Coffee",
-#                 "venue_image_link": "https://images.unsplash.com/photo-1485686531765-ba63b07845a7?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=747&q=80",
-#                 "start_time": "2035-04-08T20:00:00.000Z",
-#             },
-#             {
-#                 "venue_id": 3,
-#                 "venue_name": "Park Square Live Music & Coffee",
-#                 "venue_image_link": "https://images.unsplash.com/photo-1485686531765-ba63b07845a7?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=747&q=80",
-#                 "start_time": "2035-04-15T20:00:00.000Z",
-#             },
-#         ],
-#         "past_shows_count": 0,
-#         "upcoming_shows_count": 3,
-#     }
+# ----------------------------------------------------------------------------#
+# Synthetic data.
+# ----------------------------------------------------------------------------#
+
+# `flask generate-data` builds a catalog of any size for load testing. The
+# same seed and anchor date always produce the same catalog. Popularity is
+# skewed: a few venues, artists and cities get most of the shows, as they do
+# in real listings. Most shows repeat weekly to monthly at the same venue,
+# and start dates run from `past_days` before the anchor to `future_days`
+# after it. Shows start in fixed evening slots, and no venue or artist is
+# ever booked twice in one slot, so the catalog has no double bookings.
+
+GENRES = [value for value, _ in VenueForm.genres.kwargs["choices"]]
+
+CITIES = [
+    ("New York", "NY"),
+    ("Los Angeles", "CA"),
+    ("San Francisco", "CA"),
+    ("Chicago", "IL"),
+    ("Austin", "TX"),
+    ("Nashville", "TN"),
+    ("Seattle", "WA"),
+    ("New Orleans", "LA"),
+    ("Atlanta", "GA"),
+    ("Denver", "CO"),
+    ("Portland", "OR"),
+    ("Boston", "MA"),
+    ("Philadelphia", "PA"),
+    ("Detroit", "MI"),
+    ("Minneapolis", "MN"),
+    ("Miami", "FL"),
+    ("Las Vegas", "NV"),
+    ("Memphis", "TN"),
+    ("Kansas City", "MO"),
+    ("Burlington", "VT"),
+]
+
+ADJECTIVES = (
+    "Musical Dueling Velvet Electric Blue Golden Rusty Midnight Crimson Silver "
+    "Wild Lucky Quiet Neon Hollow"
+).split()
+NOUNS = (
+    "Hop Pianos Lounge Room Garden Cellar Owl Anchor Lantern Harbor Fox Petals "
+    "Sax Crow Echo Mile"
+).split()
+VENUE_KINDS = ["Bar", "Club", "Hall", "Theatre", "Tavern", "Cafe", "Ballroom"]
+ARTIST_KINDS = ["Band", "Trio", "Quartet", "Collective", "Orchestra", "Project"]
+STREETS = ["Folsom", "Delancey", "Main", "Market", "Broad", "Elm", "Oak", "Pine"]
+
+VENUE_IMAGE = "https://images.unsplash.com/photo-1543900694-133f37abaaa5"
+ARTIST_IMAGE = "https://images.unsplash.com/photo-1549213783-8284d0336c4f"
+
+# Days between occurrences of a recurring show, with relative weights.
+RECURRENCE_INTERVALS = [7, 14, 28]
+RECURRENCE_WEIGHTS = [5, 3, 2]
+
+# Share of show series that are one-offs; the rest run 2..MAX_OCCURRENCES times.
+ONE_OFF_SHARE = 0.4
+MAX_OCCURRENCES = 26
+
+# Start times of the evening slots; shows last DEFAULT_SHOW_DURATION, so
+# slots do not overlap.
+SHOW_SLOTS = [datetime.time(17, 0), datetime.time(19, 30), datetime.time(22, 0)]
+
+# Consecutive series that may fail to find a free slot before giving up.
+MAX_BOOKING_ATTEMPTS = 1000
+
+
+def skewed_picker(rng, items, exponent=1.1):
+    """Pick from `items` with Zipf-like weights: earlier items are more popular."""
+    weights = (1 / rank ** exponent for rank in range(1, len(items) + 1))
+    cum_weights = list(accumulate(weights))
+
+    def pick():
+        return rng.choices(items, cum_weights=cum_weights)[0]
+
+    return pick
+
+
+def slug(name):
+    return "".join(c for c in name.lower() if c.isalnum())
+
+
+def entity_name(rng, kinds, number):
+    name = f"The {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {rng.choice(kinds)}"
+    # The number keeps names, and so links built from them, distinct.
+    return f"{name} {number}"
+
+
+def phone_number(rng):
+    return f"{rng.randint(201, 989)}-{rng.randint(0, 999):03}-{rng.randint(0, 9999):04}"
+
+
+def generate_venues(seed, count):
+    rng = random.Random(f"{seed}:venues")
+    pick_city = skewed_picker(rng, CITIES)
+
+    for number in range(1, count + 1):
+        name = entity_name(rng, VENUE_KINDS, number)
+        city, state = pick_city()
+        seeking_talent = rng.random() < 0.3
+        yield {
+            "name": name,
+            "city": city,
+            "state": state,
+            "address": f"{rng.randint(1, 9999)} {rng.choice(STREETS)} Street",
+            "phone": phone_number(rng),
+            "image_link": VENUE_IMAGE,
+            "genres": rng.sample(GENRES, rng.randint(1, 5)),
+            "facebook_link": f"https://www.facebook.com/{slug(name)}",
+            "website": f"https://www.{slug(name)}.com",
+            "seeking_talent": seeking_talent,
+            "seeking_description": (
+                "We are on the lookout for local artists." if seeking_talent else None
+            ),
+        }
+
+
+def generate_artists(seed, count):
+    rng = random.Random(f"{seed}:artists")
+    pick_city = skewed_picker(rng, CITIES)
+
+    for number in range(1, count + 1):
+        name = entity_name(rng, ARTIST_KINDS, number)
+        city, state = pick_city()
+        seeking_venue = rng.random() < 0.4
+        yield {
+            "name": name,
+            "city": city,
+            "state": state,
+            "phone": phone_number(rng),
+            "image_link": ARTIST_IMAGE,
+            "genres": rng.sample(GENRES, rng.randint(1, 3)),
+            "facebook_link": f"https://www.facebook.com/{slug(name)}",
+            "seeking_venue": seeking_venue,
+            "seeking_description": (
+                f"Looking for shows in {city}!" if seeking_venue else ""
+            ),
+        }
+
+
+class SlotBitmap:
+    """One bit per (entity, slot): whether the entity is booked in that slot."""
+
+    def __init__(self, entities, slots):
+        self.slots = slots
+        self._bits = bytearray((entities * slots + 7) // 8)
+
+    def booked(self, entity, slot):
+        bit = entity * self.slots + slot
+        return bool(self._bits[bit >> 3] & (1 << (bit & 7)))
+
+    def book(self, entity, slot):
+        bit = entity * self.slots + slot
+        self._bits[bit >> 3] |= 1 << (bit & 7)
+
+
+def generate_shows(seed, artist_ids, venue_ids, count, anchor, past_days, future_days):
+    """Yield `count` shows as series of recurring dates for an artist and venue.
+
+    A series ends early at the first date on which its artist or its venue
+    is already booked, or at the end of the date range.
+    """
+    rng = random.Random(f"{seed}:shows")
+    pick_artist = skewed_picker(rng, range(len(artist_ids)))
+    pick_venue = skewed_picker(rng, range(len(venue_ids)))
+    first_day = anchor - datetime.timedelta(days=past_days)
+
+    days = past_days + future_days
+    slots_per_day = len(SHOW_SLOTS)
+    artist_slots = SlotBitmap(len(artist_ids), days * slots_per_day)
+    venue_slots = SlotBitmap(len(venue_ids), days * slots_per_day)
+
+    produced = 0
+    failed_attempts = 0
+    while produced < count:
+        if failed_attempts == MAX_BOOKING_ATTEMPTS:
+            raise ValueError(
+                f"{len(artist_ids)} artists and {len(venue_ids)} venues have no "
+                f"free slots left for {count} shows in {days} days"
+            )
+
+        artist, venue = pick_artist(), pick_venue()
+        if rng.random() < ONE_OFF_SHARE:
+            occurrences = 1
+        else:
+            occurrences = rng.randint(2, MAX_OCCURRENCES)
+        occurrences = min(occurrences, count - produced)
+        interval = rng.choices(RECURRENCE_INTERVALS, RECURRENCE_WEIGHTS)[0]
+        first_slot = rng.randrange(days * slots_per_day)
+
+        booked = 0
+        for occurrence in range(occurrences):
+            slot = first_slot + occurrence * interval * slots_per_day
+            if slot >= days * slots_per_day:
+                break
+            if artist_slots.booked(artist, slot) or venue_slots.booked(venue, slot):
+                break
+            artist_slots.book(artist, slot)
+            venue_slots.book(venue, slot)
+
+            day, slot_of_day = divmod(slot, slots_per_day)
+            start_time = datetime.datetime.combine(
+                first_day + datetime.timedelta(days=day), SHOW_SLOTS[slot_of_day]
+            )
+            yield {
+                "artist_id": artist_ids[artist],
+                "venue_id": venue_ids[venue],
+                "start_time": start_time,
+                "end_time": start_time + DEFAULT_SHOW_DURATION,
+            }
+            booked += 1
+
+        produced += booked
+        failed_attempts = 0 if booked else failed_attempts + 1
+
+
+def write_files(
+    directory, seed, venues, artists, shows, anchor, past_days, future_days
+):
+    """Write venues.jsonl, artists.jsonl and shows.jsonl for `flask import`.
+
+    Shows refer to venues and artists by their position in the files, which
+    matches their ids once they are imported into an empty database.
+    """
+    os.makedirs(directory, exist_ok=True)
+    show_rows = generate_shows(
+        seed,
+        list(range(1, artists + 1)),
+        list(range(1, venues + 1)),
+        shows,
+        anchor,
+        past_days,
+        future_days,
+    )
+
+    for kind, rows in [
+        ("venues", generate_venues(seed, venues)),
+        ("artists", generate_artists(seed, artists)),
+        ("shows", show_rows),
+    ]:
+        path = os.path.join(directory, f"{kind}.jsonl")
+        written = 0
+        with open(path, "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, default=str) + "\n")
+                written += 1
+        yield kind, written, path
+
+
+def write_database(
+    session, seed, venues, artists, shows, anchor, past_days, future_days, batch_size
+):
+    """Insert the catalog in committed batches, yielding (kind, rows so far)."""
+    ids = {}
+    for kind, model, rows in [
+        ("venues", Venue, generate_venues(seed, venues)),
+        ("artists", Artist, generate_artists(seed, artists)),
+    ]:
+        ids[kind] = []
+        for batch in batches(rows, batch_size):
+            ids[kind].extend(insert_entities(session, model, batch))
+            session.commit()
+            yield kind, len(ids[kind])
+
+    show_rows = generate_shows(
+        seed, ids["artists"], ids["venues"], shows, anchor, past_days, future_days
+    )
+    now = datetime.datetime.utcnow()
+    written = 0
+    for batch in batches(show_rows, batch_size):
+        for show in batch:
+            show["updated_at"] = now
+        insert_rows(session, Show.__table__, batch)
+        session.commit()
+        written += len(batch)
+        yield "shows", written
+
+    refresh_show_counters(session, Venue)
+    refresh_show_counters(session, Artist)
+    session.commit()
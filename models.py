@@ -1,18 +1,75 @@
-from flask_sqlalchemy import SQLAlchemy
+import datetime
 
-db = SQLAlchemy()
+from replicas import RoutingSQLAlchemy
+
+# The application's only SQLAlchemy instance; create_app() binds it to the app.
+db = RoutingSQLAlchemy()
 
 # ----------------------------------------------------------------------------#
 # Models.
 # ----------------------------------------------------------------------------#
+class Genre(db.Model):
+    __tablename__ = "genres"
+    # The id is the genre's bit in Venue.genre_mask and Artist.genre_mask.
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(50), nullable=False, unique=True)
+
+    def __repr__(self):
+        return f"<Genre id:{self.id} name: {self.name}>"
+
+
+class Facet_Count(db.Model):
+    __tablename__ = "facet_counts"
+    # Number of venues or artists (`listing`) having each value of a facet.
+    listing = db.Column(db.String(20), primary_key=True)
+    facet = db.Column(db.String(20), primary_key=True)
+    value = db.Column(db.String(250), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<Facet_Count {self.listing} {self.facet}:{self.value} {self.count}>"
+
+
+class Job(db.Model):
+    __tablename__ = "jobs"
+    # Deferred work run by `flask worker`; see jobs.py.
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default="{}")
+    dedup_key = db.Column(db.String(250), nullable=True, index=True)
+    status = db.Column(db.String(20), nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False)
+    run_at = db.Column(db.DateTime, nullable=False)
+    locked_by = db.Column(db.String(120), nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    duration_ms = db.Column(db.Integer, nullable=True)
+
+    __table_args__ = (db.Index("ix_jobs_status_run_at", "status", "run_at"),)
+
+    def __repr__(self):
+        return f"<Job id:{self.id} kind: {self.kind} status: {self.status}>"
+
+
 class Venue_Genre(db.Model):
     __tablename__ = "venue_genres"
     id = db.Column(db.Integer, primary_key=True)
     venue_id = db.Column(
-        db.Integer, db.ForeignKey("venues.id", ondelete="CASCADE"), nullable=False
+        db.Integer,
+        db.ForeignKey("venues.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
     )
     genre = db.Column(db.String(50), nullable=False)
 
+    __table_args__ = (
+        db.Index("uq_venue_genres_venue_id_genre", "venue_id", "genre", unique=True),
+    )
+
     def __repr__(self):
         return f"<Venue_Genre venue_id:{self.venue_id} genre: {self.genre}>"
 
@@ -37,23 +94,98 @@ class Venue(db.Model):
     )
     facebook_link = db.Column(db.String(120), nullable=True, default="")
     website = db.Column(db.String(120), nullable=True)
+    search_document = db.Column(db.Text, nullable=True)
+    genre_mask = db.Column(db.BigInteger, nullable=False, default=0, server_default="0")
+    upcoming_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
+    past_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
+    next_show_at = db.Column(db.DateTime, nullable=True, index=True)
+    updated_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.datetime.utcnow,
+        onupdate=datetime.datetime.utcnow,
+    )
+    # Set when the venue is deleted; its rows are purged later (tombstones.py).
+    deleted_at = db.Column(db.DateTime, nullable=True)
+    # Declared on both sides rather than as a backref: a viewonly backref
+    # makes SQLAlchemy warn that it would sync nothing.
+    artists = db.relationship("Artist", secondary="shows", viewonly=True, lazy=True)
+
+    __table_args__ = (db.Index("ix_venues_state_city", "state", "city"),)
 
 
 class Show(db.Model):
     __tablename__ = "shows"
-    artist_id = db.Column(db.Integer, db.ForeignKey("artists.id"), primary_key=True)
+    id = db.Column(db.Integer, primary_key=True)
+    artist_id = db.Column(db.Integer, db.ForeignKey("artists.id"), nullable=False)
+    venue_id = db.Column(
+        db.Integer, db.ForeignKey("venues.id", ondelete="CASCADE"), nullable=False
+    )
+    start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.datetime.utcnow,
+        onupdate=datetime.datetime.utcnow,
+    )
+
+    # An artist may play the same venue any number of times, just not twice
+    # at the same moment. On Postgres, exclusion constraints added by the
+    # migration also reject overlapping [start_time, end_time) ranges per
+    # venue and per artist; see scheduling.py.
+    __table_args__ = (
+        db.UniqueConstraint(
+            "artist_id",
+            "venue_id",
+            "start_time",
+            name="uq_shows_artist_id_venue_id_start_time",
+        ),
+        db.Index("ix_shows_venue_id_start_time", "venue_id", "start_time"),
+        db.Index("ix_shows_artist_id_start_time", "artist_id", "start_time"),
+        db.Index(
+            "ix_shows_start_time_artist_id_venue_id",
+            "start_time",
+            "artist_id",
+            "venue_id",
+        ),
+    )
+
+
+class Show_Archive(db.Model):
+    # Past shows moved out of `shows` by `flask archive-shows`; ids are kept.
+    __tablename__ = "shows_archive"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    artist_id = db.Column(db.Integer, db.ForeignKey("artists.id"), nullable=False)
     venue_id = db.Column(
-        db.Integer, db.ForeignKey("venues.id", ondelete="CASCADE"), primary_key=True
+        db.Integer, db.ForeignKey("venues.id", ondelete="CASCADE"), nullable=False
     )
     start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index("ix_shows_archive_venue_id_start_time", "venue_id", "start_time"),
+        db.Index("ix_shows_archive_artist_id_start_time", "artist_id", "start_time"),
+    )
 
 
 class Artist_Genre(db.Model):
     __tablename__ = "artist_genres"
     id = db.Column(db.Integer, primary_key=True)
-    artist_id = db.Column(db.Integer, db.ForeignKey("artists.id"), nullable=False)
+    artist_id = db.Column(
+        db.Integer, db.ForeignKey("artists.id"), nullable=False, index=True
+    )
     genre = db.Column(db.String(50), nullable=False)
 
+    __table_args__ = (
+        db.Index("uq_artist_genres_artist_id_genre", "artist_id", "genre", unique=True),
+    )
+
     def __repr__(self):
         return f"<Artist_Genre artist_id:{self.artist_id} genre: {self.genre}>"
 
@@ -72,8 +204,22 @@ class Artist(db.Model):
         default="https://images.unsplash.com/photo-1549213783-8284d0336c4f?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=300&q=80",
     )
     facebook_link = db.Column(db.String(120), nullable=True)
-    venues = db.relationship(
-        "Venue", secondary="shows", backref=db.backref("artists", lazy=True)
-    )
+    # The reverse of Venue.artists; shows are added as Show rows.
+    venues = db.relationship("Venue", secondary="shows", viewonly=True)
     seeking_venue = db.Column(db.Boolean, nullable=True, default=False)
     seeking_description = db.Column(db.String(), nullable=True, default="")
+    search_document = db.Column(db.Text, nullable=True)
+    genre_mask = db.Column(db.BigInteger, nullable=False, default=0, server_default="0")
+    upcoming_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
+    past_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
+    next_show_at = db.Column(db.DateTime, nullable=True, index=True)
+    updated_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.datetime.utcnow,
+        onupdate=datetime.datetime.utcnow,
+    )
@@ -0,0 +1,106 @@
+import functools
+import threading
+from urllib.parse import urlencode
+
+from flask import _request_ctx_stack, make_response, request, session
+
+from replicas import pinned_to_primary, reading_from_replica
+from shared_cache import LRUCache, SQLiteCache, TieredCache
+
+# ----------------------------------------------------------------------------#
+# Page cache.
+# ----------------------------------------------------------------------------#
+
+# Rendered GET pages are cached per (endpoint, view args), with one variant per
+# query string, and expire after `ttl` seconds. Views that change data purge
+# the pages they affect by endpoint and view args. Pages are kept in a
+# shared_cache.TieredCache, whose namespaces are the (endpoint, view args)
+# pairs, so a purge in one worker is seen by every worker on the host.
+#
+# With read replicas, a page rendered from a replica soon after a purge may
+# predate the write behind the purge. Such pages are not stored until
+# `replica_lag` seconds after the purge, and users pinned to the primary by
+# their own writes (see replicas.py) always get a freshly rendered page.
+
+
+def page_namespace(endpoint, view_args):
+    return f"page:{endpoint}?{urlencode(sorted(view_args.items()))}"
+
+
+class PageCache:
+    def __init__(self, store=None, ttl=60):
+        self.store = store
+        self.ttl = ttl
+        self.replica_lag = 0
+        self.purges = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Build the store from the PAGE_CACHE_* and SHARED_CACHE_* settings."""
+        shared = None
+        if app.config["SHARED_CACHE_PATH"]:
+            shared = SQLiteCache(
+                app.config["SHARED_CACHE_PATH"], app.config["SHARED_CACHE_MAX_BYTES"]
+            )
+        local = LRUCache(app.config["PAGE_CACHE_LOCAL_ENTRIES"])
+        self.store = TieredCache(local, shared)
+        self.ttl = app.config["PAGE_CACHE_TTL"]
+        self.replica_lag = app.config["READ_YOUR_WRITES_SECONDS"]
+
+    def cached(self, view):
+        """Decorator caching a view's 200 responses that carry no flashed messages."""
+
+        @functools.wraps(view)
+        def wrapper(**view_args):
+            # A pending flash is rendered into the page, which makes it personal.
+            if self.ttl <= 0 or request.method != "GET" or "_flashes" in session:
+                return view(**view_args)
+
+            namespace = page_namespace(request.endpoint, view_args)
+            variant = request.query_string.decode("latin-1")
+
+            # Read before rendering: a purge landing mid-render then makes
+            # set() drop the page instead of storing it as current.
+            generation = self.store.generation(namespace)
+            if not pinned_to_primary():
+                page = self.store.get(namespace, variant, generation)
+                if page is not None:
+                    mimetype, _, body = page.partition(b"\n")
+                    return make_response(
+                        (body, 200, {"Content-Type": mimetype.decode("latin-1")})
+                    )
+
+            response = make_response(view(**view_args))
+
+            if (
+                response.status_code == 200
+                and not _request_ctx_stack.top.flashes
+                and self.settled(namespace)
+            ):
+                page = response.content_type.encode("latin-1") + b"\n"
+                self.store.set(
+                    namespace, variant, page + response.get_data(), self.ttl, generation
+                )
+
+            return response
+
+        return wrapper
+
+    def settled(self, namespace):
+        """Whether the page just rendered may be stored.
+
+        A page read from a replica may miss the write that purged it until
+        the replica catches up.
+        """
+        if not reading_from_replica():
+            return True
+        return not self.store.invalidated_within(namespace, self.replica_lag)
+
+    def purge(self, endpoint, **view_args):
+        """Drop every cached variant of `endpoint` rendered with `view_args`."""
+        self.store.invalidate(page_namespace(endpoint, view_args))
+        with self._lock:
+            self.purges += 1
+
+    def stats(self):
+        return dict(self.store.stats(), purges=self.purges)
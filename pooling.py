@@ -0,0 +1,156 @@
+import functools
+import threading
+import time
+from bisect import bisect_left
+
+from flask import current_app, g, has_request_context
+from sqlalchemy import event, text
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import QueuePool
+
+# ----------------------------------------------------------------------------#
+# Connection pooling.
+# ----------------------------------------------------------------------------#
+
+# Every process (each gunicorn worker, `flask worker`) has its own pool of
+# DATABASE_POOL_SIZE connections plus up to DATABASE_MAX_OVERFLOW extra ones,
+# so the database sees up to (size + overflow) x processes connections.
+# Connections are pinged before use and replaced after DATABASE_POOL_RECYCLE
+# seconds. The time each checkout waits for a connection is recorded per
+# process, which shows when a pool is too small for its worker's threads.
+#
+# On Postgres, statements issued while serving a request are cancelled after
+# STATEMENT_TIMEOUT_MS, or after the limit a view sets with
+# @statement_timeout. Commands and jobs run without a limit.
+
+# Upper bounds, in milliseconds, of the checkout wait histogram buckets.
+CHECKOUT_WAIT_BUCKETS_MS = [1, 5, 25, 100, 500, 1000, 5000]
+
+# SQLSTATE of a statement cancelled by statement_timeout.
+QUERY_CANCELED = "57014"
+
+
+class CheckoutMetrics:
+    """How long checkouts waited for a connection in this process."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.buckets = [0] * (len(CHECKOUT_WAIT_BUCKETS_MS) + 1)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        bucket = bisect_left(CHECKOUT_WAIT_BUCKETS_MS, seconds * 1000)
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            self.buckets[bucket] += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def stats(self, pool=None):
+        with self._lock:
+            labels = [f"<={bound}ms" for bound in CHECKOUT_WAIT_BUCKETS_MS]
+            stats = {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "average_wait_ms": (
+                    self.total_wait / self.checkouts * 1000 if self.checkouts else None
+                ),
+                "max_wait_ms": self.max_wait * 1000,
+                "wait_histogram": dict(zip(labels + ["slower"], self.buckets)),
+            }
+        if isinstance(pool, QueuePool):
+            stats["pool"] = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+            }
+        return stats
+
+
+checkout_metrics = CheckoutMetrics()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool recording the wait of every checkout in `checkout_metrics`."""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except TimeoutError:
+            checkout_metrics.record_timeout()
+            raise
+        checkout_metrics.record(time.perf_counter() - started)
+        return connection
+
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured database."""
+    url = config["SQLALCHEMY_DATABASE_URI"]
+    # SQLite gets SQLAlchemy's own pool, which takes none of these options.
+    if url is None or make_url(url).get_backend_name() == "sqlite":
+        return {}
+
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": config["DATABASE_POOL_SIZE"],
+        "max_overflow": config["DATABASE_MAX_OVERFLOW"],
+        "pool_timeout": config["DATABASE_POOL_TIMEOUT"],
+        "pool_recycle": config["DATABASE_POOL_RECYCLE"],
+        "pool_pre_ping": config["DATABASE_POOL_PRE_PING"],
+    }
+
+
+def statement_timeout_for():
+    """Timeout for the current request: the view's own, else the default."""
+    if not has_request_context():
+        return None
+    return g.get("statement_timeout_ms", current_app.config["STATEMENT_TIMEOUT_MS"])
+
+
+def apply_statement_timeouts(session):
+    """Limit each Postgres transaction of `session` to statement_timeout_for().
+
+    The setting is local to the transaction, so it never leaks to the next
+    user of a pooled connection.
+    """
+
+    @event.listens_for(session, "after_begin")
+    def set_timeout(session, transaction, connection):
+        milliseconds = statement_timeout_for()
+        if milliseconds and connection.dialect.name == "postgresql":
+            connection.execute(
+                text("SELECT set_config('statement_timeout', :value, true)"),
+                value=str(milliseconds),
+            )
+
+
+def is_statement_timeout(error):
+    """Whether a DBAPIError is Postgres cancelling a statement that ran too long."""
+    return getattr(error.orig, "pgcode", None) == QUERY_CANCELED
+
+
+def statement_timeout(setting):
+    """Decorator giving a view's transactions the timeout in config `setting`.
+
+    Transactions begun before the view runs keep the default, so it goes
+    above decorators that query, such as conditional_detail_page.
+    """
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**view_args):
+            g.statement_timeout_ms = current_app.config[setting]
+            return view(**view_args)
+
+        return wrapper
+
+    return decorator
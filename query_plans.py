@@ -0,0 +1,54 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+# ----------------------------------------------------------------------------#
+# Query plans.
+# ----------------------------------------------------------------------------#
+
+# Used by `flask explain-routes`: every SELECT a route issues is captured at
+# the cursor level and re-run under EXPLAIN, and any plan step that reads a
+# whole table instead of an index is reported.
+
+
+@contextmanager
+def captured_statements(engine):
+    """Collect (statement, parameters) for every SELECT run on `engine`."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def explain(engine, statement, parameters):
+    """Return the plan of `statement` as a list of text lines."""
+    if engine.dialect.name == "sqlite":
+        prefix, detail_column = "EXPLAIN QUERY PLAN ", -1
+    else:
+        prefix, detail_column = "EXPLAIN ", 0
+
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(prefix + statement, parameters)
+        return [str(row[detail_column]) for row in cursor.fetchall()]
+    finally:
+        connection.close()
+
+
+def table_scans(dialect, plan):
+    """Return the plan lines that read a table without an index."""
+    if dialect == "sqlite":
+        return [
+            line
+            for line in plan
+            if line.startswith("SCAN ") and " USING " not in line
+        ]
+    return [line.strip() for line in plan if "Seq Scan" in line]
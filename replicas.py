@@ -0,0 +1,139 @@
+import functools
+import random
+import sqlite3
+import threading
+from collections import Counter
+
+from flask import g, has_request_context, request
+from flask_sqlalchemy import SignallingSession, SQLAlchemy
+from sqlalchemy import orm
+from sqlalchemy.engine.url import make_url
+
+# ----------------------------------------------------------------------------#
+# Read replicas.
+# ----------------------------------------------------------------------------#
+
+# Views marked with @replicas.reads run their queries against one of the
+# replica binds (SQLALCHEMY_BINDS keys starting with "replica_"), picked at
+# random per request. Everything else, and every flush, uses the primary.
+#
+# A user who has just submitted a form could otherwise read from a replica
+# that has not caught up with their write. Any request to an unmarked view
+# that is not a GET therefore sets a cookie lasting READ_YOUR_WRITES_SECONDS,
+# and reads are sent to the primary while the cookie is present. The window
+# should be longer than the replicas' usual lag.
+#
+# The page cache follows the same rules: requests pinned to the primary are
+# never served a cached page, and a page rendered from a replica is not
+# cached within READ_YOUR_WRITES_SECONDS of a purge of that page, when the
+# replica may not have caught up with the write behind the purge.
+
+REPLICA_BIND_PREFIX = "replica_"
+
+STICKY_COOKIE = "fyyur_read_primary"
+
+# WSGI environ key that internal requests (e.g. page warming) set to read
+# from the primary. Clients cannot set it: headers arrive as HTTP_* keys.
+READ_PRIMARY_ENVIRON = "fyyur.read_primary"
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class RoutingSession(SignallingSession):
+    """Session reading from the replica chosen for the current request."""
+
+    def __init__(self, db, **options):
+        self.db = db
+        super().__init__(db, **options)
+
+    def get_bind(self, mapper=None, clause=None):
+        replica = g.get("replica_bind") if has_request_context() else None
+        if replica is not None and not self._flushing:
+            return self.db.get_engine(self.app, bind=replica)
+        return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+class ReplicaRouter:
+    def __init__(self, app=None):
+        self.replicas = []
+        self.window = 0
+        self.routed = Counter()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.replicas = sorted(
+            bind
+            for bind in app.config.get("SQLALCHEMY_BINDS") or {}
+            if bind.startswith(REPLICA_BIND_PREFIX)
+        )
+        self.window = app.config["READ_YOUR_WRITES_SECONDS"]
+        app.after_request(self.remember_writes)
+
+    def reads(self, view):
+        """Decorator sending a read-only view's queries to a replica.
+
+        It goes above decorators that query, such as conditional_detail_page.
+        """
+
+        @functools.wraps(view)
+        def wrapper(**view_args):
+            g.read_only_view = True
+            target = "primary"
+            if self.replicas and not pinned_to_primary():
+                g.replica_bind = target = random.choice(self.replicas)
+            with self._lock:
+                self.routed[target] += 1
+            return view(**view_args)
+
+        return wrapper
+
+    def remember_writes(self, response):
+        if self.window > 0 and request.method not in SAFE_METHODS:
+            if not g.get("read_only_view"):
+                response.set_cookie(
+                    STICKY_COOKIE, "1", max_age=self.window, httponly=True
+                )
+        return response
+
+    def stats(self):
+        with self._lock:
+            return {"replicas": self.replicas, "reads": dict(self.routed)}
+
+
+def pinned_to_primary():
+    """Whether the current request reads from the primary, even in a read view."""
+    return STICKY_COOKIE in request.cookies or bool(
+        request.environ.get(READ_PRIMARY_ENVIRON)
+    )
+
+
+def reading_from_replica():
+    """Whether the current request's queries go to a replica."""
+    return g.get("replica_bind") is not None
+
+
+def copy_sqlite_database(source_url, target_url):
+    """Copy one SQLite database over another, e.g. a primary to its replica.
+
+    Only meant for trying replica routing locally with two database files.
+    """
+    paths = []
+    for url in (source_url, target_url):
+        parsed = make_url(url)
+        if parsed.get_backend_name() != "sqlite" or not parsed.database:
+            raise ValueError(f"Not an SQLite database file: {url}")
+        paths.append(parsed.database)
+
+    source, target = sqlite3.connect(paths[0]), sqlite3.connect(paths[1])
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
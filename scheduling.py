@@ -0,0 +1,102 @@
+import datetime
+from bisect import bisect_right
+from collections import defaultdict
+
+from sqlalchemy import and_, or_
+
+from models import Show, Venue
+from tombstones import live
+
+# ----------------------------------------------------------------------------#
+# Scheduling.
+# ----------------------------------------------------------------------------#
+
+# A show occupies [start_time, end_time). A venue cannot host two shows, and
+# an artist cannot play two shows, whose ranges overlap. On Postgres the
+# shows table enforces this with two exclusion constraints over
+# tsrange(start_time, end_time); everywhere, bookings are checked first so
+# that conflicts can be reported on the form, and bulk loads check whole
+# batches in memory with an IntervalIndex.
+
+DEFAULT_SHOW_DURATION = datetime.timedelta(hours=2)
+
+# Longest show accepted. It bounds how far back a show that overlaps a new
+# booking can start, which turns the overlap test into a range scan of the
+# (venue_id, start_time) and (artist_id, start_time) indexes.
+MAX_SHOW_DURATION = datetime.timedelta(hours=12)
+
+
+def overlapping(model, start_time, end_time):
+    """Criterion for rows of `model` (Show or a subquery) overlapping a range."""
+    return and_(
+        model.start_time > start_time - MAX_SHOW_DURATION,
+        model.start_time < end_time,
+        model.end_time > start_time,
+    )
+
+
+def conflicting_shows(session, artist_id, venue_id, start_time, end_time):
+    """Shows of the artist, or at the venue, overlapping [start_time, end_time).
+
+    Shows at deleted venues no longer count. Their rows remain until the venue
+    is purged, and until then the Postgres exclusion constraints still see them.
+    """
+    return (
+        session.query(Show)
+        .join(Venue, Venue.id == Show.venue_id)
+        .filter(
+            live(Venue),
+            or_(Show.artist_id == artist_id, Show.venue_id == venue_id),
+            overlapping(Show, start_time, end_time),
+        )
+        .order_by(Show.start_time)
+        .all()
+    )
+
+
+class IntervalIndex:
+    """Booked ranges per key, e.g. ("venue", 3), for checking many bookings.
+
+    The ranges booked for one key never overlap each other, so each key keeps
+    them sorted by start: the only candidates for overlapping a new range are
+    its neighbours in that order, found by bisection.
+    """
+
+    def __init__(self):
+        self._starts = defaultdict(list)
+        self._ranges = defaultdict(list)
+
+    def conflict(self, key, start, end):
+        """The booked (start, end, value) overlapping [start, end), or None."""
+        starts, ranges = self._starts[key], self._ranges[key]
+        position = bisect_right(starts, start)
+        for neighbour in ranges[max(position - 1, 0) : position + 1]:
+            if neighbour[0] < end and neighbour[1] > start:
+                return neighbour
+        return None
+
+    def add(self, key, start, end, value=None):
+        starts = self._starts[key]
+        position = bisect_right(starts, start)
+        starts.insert(position, start)
+        self._ranges[key].insert(position, (start, end, value))
+
+    @classmethod
+    def for_shows(cls, session, artist_ids, venue_ids, start_time, end_time):
+        """Index of the shows of these artists and venues overlapping a window."""
+        index = cls()
+        shows = (
+            session.query(
+                Show.id, Show.artist_id, Show.venue_id, Show.start_time, Show.end_time
+            )
+            .join(Venue, Venue.id == Show.venue_id)
+            .filter(
+                live(Venue),
+                or_(Show.artist_id.in_(artist_ids), Show.venue_id.in_(venue_ids)),
+                overlapping(Show, start_time, end_time),
+            )
+        )
+        for show_id, artist_id, venue_id, start, end in shows:
+            index.add(("artist", artist_id), start, end, f"show {show_id}")
+            index.add(("venue", venue_id), start, end, f"show {show_id}")
+        return index
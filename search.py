@@ -0,0 +1,153 @@
+from sqlalchemy import event, func, text
+
+from models import Venue, Artist
+from tombstones import live
+
+# ----------------------------------------------------------------------------#
+# Search index.
+# ----------------------------------------------------------------------------#
+
+# Venues and artists carry a denormalized `search_document` column holding
+# their name, city, state and genres. On Postgres it is covered by a trigram
+# GIN index (which also serves ILIKE '%term%'); on SQLite it is mirrored into
+# an FTS5 table using the trigram tokenizer, kept in sync by triggers. The
+# migration creates these, and so does db.create_all() through an
+# after_create hook.
+
+SEARCHABLE_TABLES = {
+    "venues": ("venue_genres", "venue_id"),
+    "artists": ("artist_genres", "artist_id"),
+}
+
+POSTGRES_INDEX_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_{table}_search_document_trgm "
+    "ON {table} USING gin (search_document gin_trgm_ops)",
+]
+
+SQLITE_INDEX_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5("
+    "search_document, content='{table}', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS {table}_fts_ai AFTER INSERT ON {table} BEGIN "
+    "INSERT INTO {table}_fts(rowid, search_document) "
+    "VALUES (new.id, new.search_document); END",
+    "CREATE TRIGGER IF NOT EXISTS {table}_fts_ad AFTER DELETE ON {table} BEGIN "
+    "INSERT INTO {table}_fts({table}_fts, rowid, search_document) "
+    "VALUES ('delete', old.id, old.search_document); END",
+    "CREATE TRIGGER IF NOT EXISTS {table}_fts_au "
+    "AFTER UPDATE OF search_document ON {table} BEGIN "
+    "INSERT INTO {table}_fts({table}_fts, rowid, search_document) "
+    "VALUES ('delete', old.id, old.search_document); "
+    "INSERT INTO {table}_fts(rowid, search_document) "
+    "VALUES (new.id, new.search_document); END",
+]
+
+# Recomputes every search_document from the entity row and its genre rows.
+BACKFILL_SQL = (
+    "UPDATE {table} SET search_document = "
+    "coalesce(name, '') || ' ' || coalesce(city, '') || ' ' || coalesce(state, '')"
+    " || coalesce((SELECT ' ' || {genre_agg} FROM {genre_table}"
+    " WHERE {genre_table}.{genre_key} = {table}.id), '')"
+)
+
+# Tables whose tombstoned rows keep no search document (see tombstones.py).
+TOMBSTONED_TABLES = {"venues"}
+
+GENRE_AGGREGATES = {
+    "postgresql": "string_agg(genre, ' ')",
+    "sqlite": "group_concat(genre, ' ')",
+}
+
+INDEX_DDL = {"postgresql": POSTGRES_INDEX_DDL, "sqlite": SQLITE_INDEX_DDL}
+
+# FTS5's trigram tokenizer cannot match terms shorter than three characters.
+MIN_FTS_TERM_LENGTH = 3
+
+
+def build_search_document(name, city, state, genres):
+    return " ".join([name or "", city or "", state or ""] + list(genres))
+
+
+def rebuild_search_index(connection):
+    """Create the dialect's search index structures and backfill every row."""
+    dialect = connection.dialect.name
+    index_ddl = INDEX_DDL.get(dialect, [])
+
+    for table, (genre_table, genre_key) in SEARCHABLE_TABLES.items():
+        connection.execute(
+            text(
+                BACKFILL_SQL.format(
+                    table=table,
+                    genre_table=genre_table,
+                    genre_key=genre_key,
+                    genre_agg=GENRE_AGGREGATES.get(dialect, "group_concat(genre)"),
+                )
+            )
+        )
+        if table in TOMBSTONED_TABLES:
+            connection.execute(
+                text(
+                    f"UPDATE {table} SET search_document = NULL "
+                    "WHERE deleted_at IS NOT NULL"
+                )
+            )
+        for statement in index_ddl:
+            connection.execute(text(statement.format(table=table)))
+        if dialect == "sqlite":
+            connection.execute(
+                text(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')")
+            )
+
+
+@event.listens_for(Venue.__table__, "after_create")
+@event.listens_for(Artist.__table__, "after_create")
+def create_search_index(table, connection, **kw):
+    """Give tables made by db.create_all() the index the migration would add."""
+    for statement in INDEX_DDL.get(connection.dialect.name, []):
+        connection.execute(text(statement.format(table=table.name)))
+
+
+def escape_like(term):
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_catalog(session, model, term):
+    """Return (id, name, upcoming_shows_count) rows matching `term`, best first."""
+    term = term.strip()
+    # Tombstoned venues have no search document, so only this query needs
+    # to skip them explicitly.
+    query = session.query(model.id, model.name, model.upcoming_shows_count).filter(
+        live(model)
+    )
+
+    if not term:
+        return query.order_by(model.name).all()
+
+    dialect = session.get_bind().dialect.name
+    table = model.__tablename__
+
+    if dialect == "sqlite" and len(term) >= MIN_FTS_TERM_LENGTH:
+        # bm25 rank from the FTS table; the phrase is quoted so user input is
+        # never parsed as FTS query syntax.
+        return session.execute(
+            text(
+                f"SELECT {table}.id, {table}.name, {table}.upcoming_shows_count "
+                f"FROM {table}_fts "
+                f"JOIN {table} ON {table}.id = {table}_fts.rowid "
+                f"WHERE {table}_fts MATCH :phrase ORDER BY {table}_fts.rank"
+            ),
+            {"phrase": '"' + term.replace('"', '""') + '"'},
+        ).fetchall()
+
+    query = query.filter(
+        model.search_document.ilike(f"%{escape_like(term)}%", escape="\\")
+    )
+
+    if dialect == "postgresql":
+        query = query.order_by(
+            func.word_similarity(term, model.search_document).desc(), model.name
+        )
+    else:
+        query = query.order_by(model.name)
+
+    return query.all()
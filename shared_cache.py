@@ -0,0 +1,328 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+# ----------------------------------------------------------------------------#
+# Shared cache.
+# ----------------------------------------------------------------------------#
+
+# A two-tier cache for values that are bytes: a small LRU inside each worker
+# process in front of one SQLite file (WAL mode) shared by every worker on the
+# host. Values live in namespaces; invalidating a namespace bumps its
+# generation in the shared file, which makes every copy of its old values, in
+# any process, unreachable. Unreachable values age out through LRU eviction.
+
+
+@contextmanager
+def immediate_transaction(connection):
+    """Run a block as one write transaction on an autocommit connection."""
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    connection.execute("COMMIT")
+
+
+class LRUCache:
+    """In-process tier holding at most `max_entries` values."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache:
+    """Host-wide tier: an SQLite file kept under `max_bytes` of stored values."""
+
+    SCHEMA = [
+        "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB NOT NULL,"
+        " size INTEGER NOT NULL, expires_at REAL NOT NULL, used_at REAL NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS entries_used_at ON entries (used_at)",
+        "CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at)",
+        "CREATE TABLE IF NOT EXISTS generations"
+        " (namespace TEXT PRIMARY KEY, generation INTEGER NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS invalidations"
+        " (namespace TEXT PRIMARY KEY, invalidated_at REAL NOT NULL)",
+        # One row: the total size of `entries`, kept up to date by set() so
+        # that checking the byte budget never sums the table. Files written
+        # before it existed are summed once.
+        "CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 1),"
+        " stored_bytes INTEGER NOT NULL)",
+        "INSERT OR IGNORE INTO totals SELECT 1, coalesce(sum(size), 0) FROM entries",
+        # Where earlier versions kept that total.
+        "DELETE FROM generations WHERE namespace = '#stored_bytes'",
+    ]
+
+    # Rows removed per eviction round once the byte budget is exceeded.
+    EVICTION_BATCH = 64
+
+    # A hit only rewrites an entry's last-used time once it is this many
+    # seconds old, so that hot entries do not turn every read into a write.
+    TOUCH_INTERVAL = 1.0
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+    def _connection(self):
+        # Connections must not cross a fork (gunicorn --preload), nor threads.
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            for statement in self.SCHEMA:
+                connection.execute(statement)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def generation(self, namespace):
+        row = (
+            self._connection()
+            .execute(
+                "SELECT generation FROM generations WHERE namespace = ?", (namespace,)
+            )
+            .fetchone()
+        )
+        return row[0] if row else 0
+
+    def invalidate(self, namespace):
+        connection = self._connection()
+        with immediate_transaction(connection):
+            connection.execute(
+                "INSERT OR IGNORE INTO generations VALUES (?, 0)", (namespace,)
+            )
+            connection.execute(
+                "UPDATE generations SET generation = generation + 1"
+                " WHERE namespace = ?",
+                (namespace,),
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO invalidations VALUES (?, ?)",
+                (namespace, time.time()),
+            )
+
+    def invalidated_at(self, namespace):
+        row = (
+            self._connection()
+            .execute(
+                "SELECT invalidated_at FROM invalidations WHERE namespace = ?",
+                (namespace,),
+            )
+            .fetchone()
+        )
+        return row[0] if row else None
+
+    def get(self, key):
+        """Return (value, expires_at) for a live entry, otherwise None."""
+        now = time.time()
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT value, expires_at, used_at FROM entries"
+            " WHERE key = ? AND expires_at > ?",
+            (key, now),
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        value, expires_at, used_at = row
+        if used_at < now - self.TOUCH_INTERVAL:
+            connection.execute(
+                "UPDATE entries SET used_at = ? WHERE key = ?", (now, key)
+            )
+        return value, expires_at
+
+    def set(self, key, value, expires_at):
+        now = time.time()
+        connection = self._connection()
+        with immediate_transaction(connection):
+            replaced = connection.execute(
+                "SELECT size FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            connection.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), expires_at, now),
+            )
+            expired = connection.execute(
+                "SELECT coalesce(sum(size), 0) FROM entries WHERE expires_at <= ?",
+                (now,),
+            ).fetchone()[0]
+            connection.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+
+            added = len(value) - (replaced[0] if replaced else 0) - expired
+            stored = self._add_stored_bytes(connection, added)
+            while stored > self.max_bytes:
+                evicted = connection.execute(
+                    "SELECT key, size FROM entries ORDER BY used_at LIMIT ?",
+                    (self.EVICTION_BATCH,),
+                ).fetchall()
+                if not evicted:
+                    break
+                connection.executemany(
+                    "DELETE FROM entries WHERE key = ?", [(row[0],) for row in evicted]
+                )
+                stored = self._add_stored_bytes(
+                    connection, -sum(row[1] for row in evicted)
+                )
+
+    def _add_stored_bytes(self, connection, delta):
+        connection.execute(
+            "UPDATE totals SET stored_bytes = stored_bytes + ?", (delta,)
+        )
+        return connection.execute("SELECT stored_bytes FROM totals").fetchone()[0]
+
+
+class TieredCache:
+    """Per-process LRU in front of an optional SQLiteCache shared by all workers."""
+
+    def __init__(self, local, shared=None):
+        self.local = local
+        self.shared = shared
+        # Without a shared tier, generations only need to be tracked here.
+        self._generations = {}
+        self._invalidated_at = {}
+        # local_hits, shared_hits, misses, errors and stale_writes.
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    def _count(self, outcome):
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def generation(self, namespace):
+        """The namespace's current generation, or None if it cannot be read.
+
+        Callers computing a value read this first and pass it back to get()
+        and set(), so that a value computed across an invalidation is dropped.
+        """
+        if self.shared is None:
+            with self._lock:
+                return self._generations.get(namespace, 0)
+        try:
+            return self.shared.generation(namespace)
+        except sqlite3.Error:
+            self._count("errors")
+            return None
+
+    def get(self, namespace, variant, generation):
+        if generation is None:
+            return None
+        now = time.time()
+
+        entry = self.local.get((namespace, variant))
+        if entry is not None and entry[0] == generation and entry[1] > now:
+            self._count("local_hits")
+            return entry[2]
+
+        if self.shared is not None:
+            try:
+                found = self.shared.get(f"{namespace}|{generation}|{variant}")
+            except sqlite3.Error:
+                self._count("errors")
+                found = None
+
+            if found is not None:
+                value, expires_at = found
+                self.local.set((namespace, variant), (generation, expires_at, value))
+                self._count("shared_hits")
+                return value
+
+        self._count("misses")
+        return None
+
+    def set(self, namespace, variant, value, ttl, generation):
+        """Store a value computed while the namespace was at `generation`.
+
+        It is dropped if the namespace has been invalidated since.
+        """
+        if generation is None:
+            return
+        current = self.generation(namespace)
+        if current != generation:
+            if current is not None:
+                self._count("stale_writes")
+            return
+        expires_at = time.time() + ttl
+
+        if self.shared is not None:
+            try:
+                key = f"{namespace}|{generation}|{variant}"
+                self.shared.set(key, value, expires_at)
+            except sqlite3.Error:
+                self._count("errors")
+                return
+
+        self.local.set((namespace, variant), (generation, expires_at, value))
+
+    def invalidated_within(self, namespace, seconds):
+        """Whether the namespace was invalidated less than `seconds` ago."""
+        if seconds <= 0:
+            return False
+        if self.shared is None:
+            with self._lock:
+                invalidated_at = self._invalidated_at.get(namespace)
+        else:
+            try:
+                invalidated_at = self.shared.invalidated_at(namespace)
+            except sqlite3.Error:
+                # Assume the worst; the caller only skips storing a value.
+                self._count("errors")
+                return True
+        return invalidated_at is not None and invalidated_at > time.time() - seconds
+
+    def invalidate(self, namespace):
+        if self.shared is None:
+            with self._lock:
+                self._generations[namespace] = self._generations.get(namespace, 0) + 1
+                self._invalidated_at[namespace] = time.time()
+            return
+
+        try:
+            self.shared.invalidate(namespace)
+        except sqlite3.Error:
+            # Without a generation bump other workers would keep serving the
+            # stale value, so at least this worker stops trusting its copies.
+            self._count("errors")
+            self.local.clear()
+
+    def stats(self):
+        with self._lock:
+            counts = Counter(self.counts)
+        hits = counts["local_hits"] + counts["shared_hits"]
+        lookups = hits + counts["misses"]
+        return {
+            "hits": hits,
+            "local_hits": counts["local_hits"],
+            "shared_hits": counts["shared_hits"],
+            "misses": counts["misses"],
+            "hit_ratio": hits / lookups if lookups else None,
+            "errors": counts["errors"],
+            "stale_writes": counts["stale_writes"],
+        }
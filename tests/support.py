@@ -0,0 +1,95 @@
+import datetime
+import os
+import tempfile
+import types
+import unittest
+
+import config
+from app import create_app
+from genres import genre_mask
+from models import db, Artist, Artist_Genre, Show, Venue, Venue_Genre
+from search import build_search_document
+
+# ----------------------------------------------------------------------------#
+# Test support.
+# ----------------------------------------------------------------------------#
+
+# Tests run the app built by create_app() against a fresh SQLite file created
+# with db.create_all(), with the page cache off and no replicas, so that every
+# request reaches the database.
+
+
+def app_config(**overrides):
+    """The settings of config.py, with `overrides` applied."""
+    settings = {name: getattr(config, name) for name in dir(config) if name.isupper()}
+    settings.update(overrides)
+    return types.SimpleNamespace(**settings)
+
+
+class AppTestCase(unittest.TestCase):
+    # Settings a test case changes on top of the ones below.
+    config = {}
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        self.app = create_app(
+            app_config(
+                TESTING=True,
+                WTF_CSRF_ENABLED=False,
+                SQLALCHEMY_DATABASE_URI="sqlite:///"
+                + os.path.join(directory.name, "fyyur.sqlite3"),
+                SQLALCHEMY_BINDS={},
+                PAGE_CACHE_TTL=0,
+                SHARED_CACHE_PATH="",
+                **self.config,
+            )
+        )
+        context = self.app.app_context()
+        context.push()
+        self.addCleanup(context.pop)
+
+        db.create_all()
+        self.addCleanup(db.session.remove)
+        self.client = self.app.test_client()
+
+    def add_venue(self, name, city="San Francisco", state="CA", genres=("Jazz",)):
+        venue = Venue(
+            name=name,
+            city=city,
+            state=state,
+            address="1 Main St",
+            search_document=build_search_document(name, city, state, genres),
+            genre_mask=genre_mask(genres),
+        )
+        venue.genres = [Venue_Genre(genre=genre) for genre in genres]
+        db.session.add(venue)
+        db.session.commit()
+        return venue.id
+
+    def add_artist(self, name, city="San Francisco", state="CA", genres=("Jazz",)):
+        artist = Artist(
+            name=name,
+            city=city,
+            state=state,
+            phone="555-555-5555",
+            search_document=build_search_document(name, city, state, genres),
+            genre_mask=genre_mask(genres),
+        )
+        artist.genres = [Artist_Genre(genre=genre) for genre in genres]
+        db.session.add(artist)
+        db.session.commit()
+        return artist.id
+
+    def add_show(self, artist_id, venue_id, days_from_now):
+        start_time = datetime.datetime.now() + datetime.timedelta(days=days_from_now)
+        show = Show(
+            artist_id=artist_id,
+            venue_id=venue_id,
+            start_time=start_time,
+            end_time=start_time + datetime.timedelta(hours=2),
+        )
+        db.session.add(show)
+        db.session.commit()
+        return show.id
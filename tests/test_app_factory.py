@@ -0,0 +1,39 @@
+import logging
+import os
+import tempfile
+import unittest
+
+from app import create_app
+from tests.support import app_config
+
+
+class CreateAppLoggingTest(unittest.TestCase):
+    def file_handlers(self, app):
+        return [
+            handler
+            for handler in app.logger.handlers
+            if isinstance(handler, logging.FileHandler)
+        ]
+
+    def test_testing_apps_log_to_no_file(self):
+        app = create_app(app_config(TESTING=True, SHARED_CACHE_PATH=""))
+        self.assertEqual(self.file_handlers(app), [])
+
+    def test_apps_share_one_file_handler(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cwd = os.getcwd()
+        os.chdir(directory.name)
+        self.addCleanup(os.chdir, cwd)
+
+        apps = [create_app(app_config(SHARED_CACHE_PATH="")) for _ in range(3)]
+        handlers = self.file_handlers(apps[-1])
+        for handler in handlers:
+            self.addCleanup(apps[-1].logger.removeHandler, handler)
+            self.addCleanup(handler.close)
+
+        self.assertEqual(len(handlers), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import datetime
+import unittest
+
+from app import load_detail_page
+from archive import archive_shows
+from counters import refresh_show_counters
+from models import db, Artist, Show, Show_Archive, Venue
+from tests.support import AppTestCase
+
+
+class ArchiveTest(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.venue_id = self.add_venue("The Musical Hop")
+        self.artist_id = self.add_artist("Guns N Petals")
+        for days_from_now in [-300, -200, -100, -1, 5]:
+            self.add_show(self.artist_id, self.venue_id, days_from_now)
+
+    def archive(self, batch_size=2):
+        cutoff = datetime.datetime.now() - datetime.timedelta(days=90)
+        return list(archive_shows(db.session, cutoff, batch_size))
+
+    def test_old_shows_move_in_batches(self):
+        self.assertEqual(self.archive(), [2, 1])
+        self.assertEqual(Show.query.count(), 2)
+        self.assertEqual(Show_Archive.query.count(), 3)
+        self.assertEqual(self.archive(), [])
+
+    def test_detail_pages_read_through_the_archive(self):
+        self.archive()
+
+        for model, entity_id in [(Venue, self.venue_id), (Artist, self.artist_id)]:
+            with self.subTest(model=model.__name__):
+                _, _, past_shows, upcoming_shows = load_detail_page(model, entity_id)
+                self.assertEqual((len(past_shows), len(upcoming_shows)), (4, 1))
+
+    def test_counters_include_archived_shows(self):
+        self.archive()
+
+        refresh_show_counters(db.session, Venue)
+        db.session.commit()
+
+        venue = Venue.query.get(self.venue_id)
+        self.assertEqual((venue.upcoming_shows_count, venue.past_shows_count), (1, 4))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+
+from flask import Flask, render_template_string
+
+from assets import IMMUTABLE_CACHE_CONTROL, build_assets, register_assets
+
+STATIC_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static")
+
+
+class AssetsTest(unittest.TestCase):
+    """Bundles built from a copy of static/, so that the tree is left alone."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.static_folder = os.path.join(directory.name, "static")
+        for source in ["css", "js"]:
+            shutil.copytree(
+                os.path.join(STATIC_FOLDER, source),
+                os.path.join(self.static_folder, source),
+            )
+
+        self.manifest = build_assets(self.static_folder)
+        self.app = Flask(__name__, static_folder=self.static_folder)
+        register_assets(self.app)
+        self.client = self.app.test_client()
+
+    def read(self, path):
+        with open(os.path.join(self.static_folder, path), "rb") as f:
+            return f.read()
+
+    def test_bundles_are_named_after_their_content(self):
+        for name, path in self.manifest.items():
+            with self.subTest(name=name):
+                content = self.read(path)
+                digest = hashlib.sha256(content).hexdigest()[:12]
+                self.assertIn(f".{digest}.", path)
+                self.assertEqual(gzip.decompress(self.read(path + ".gz")), content)
+
+    def test_templates_link_the_hashed_bundle(self):
+        with self.app.test_request_context():
+            urls = render_template_string("{{ asset_urls('app.css')|join(' ') }}")
+        self.assertEqual(urls, "/static/" + self.manifest["app.css"])
+
+    def test_precompressed_variant_is_served_when_accepted(self):
+        path = "/static/" + self.manifest["app.js"]
+
+        response = self.client.get(path, headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertTrue(response.mimetype.endswith("javascript"))
+        self.assertEqual(response.headers["Cache-Control"], IMMUTABLE_CACHE_CONTROL)
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        response.close()
+
+        response = self.client.get(path, headers={"Accept-Encoding": "identity"})
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertEqual(response.get_data(), self.read(self.manifest["app.js"]))
+        response.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import datetime
+import unittest
+
+from archive import archive_shows
+from models import db
+from query_plans import captured_statements
+from tests.support import AppTestCase
+
+
+class ConditionalDetailPageTest(AppTestCase):
+    """Detail pages answer revalidations with a 304 until they change."""
+
+    def setUp(self):
+        super().setUp()
+        self.artist_id = self.add_artist("Guns N Petals")
+        self.venue_id = self.add_venue("The Musical Hop")
+        self.path = f"/venues/{self.venue_id}"
+
+    def etag(self):
+        # A fresh client, so that flashes from earlier posts do not skip the check.
+        response = self.app.test_client().get(self.path)
+        self.assertEqual(response.status_code, 200)
+        return response.headers["ETag"]
+
+    def revalidate(self, etag):
+        return self.app.test_client().get(self.path, headers={"If-None-Match": etag})
+
+    def create_show(self, start_time):
+        self.client.post(
+            "/shows/create",
+            data={
+                "artist_id": str(self.artist_id),
+                "venue_id": str(self.venue_id),
+                "start_time": start_time,
+            },
+        )
+
+    def test_unchanged_page_is_revalidated_with_one_query(self):
+        etag = self.etag()
+
+        with captured_statements(db.engine) as statements:
+            response = self.revalidate(etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(statements), 1)
+
+    def test_new_show_changes_the_etag(self):
+        etag = self.etag()
+
+        self.create_show("2030-05-01 20:00:00")
+
+        self.assertEqual(self.revalidate(etag).status_code, 200)
+        self.assertNotEqual(self.etag(), etag)
+
+    def test_editing_an_artist_changes_the_pages_of_its_venues(self):
+        self.create_show("2030-05-01 20:00:00")
+        etag = self.etag()
+
+        self.client.post(
+            f"/artists/{self.artist_id}/edit",
+            data={
+                "name": "Guns N Roses",
+                "city": "San Francisco",
+                "state": "CA",
+                "phone": "555-555-5555",
+                "genres": ["Jazz"],
+            },
+        )
+
+        self.assertEqual(self.revalidate(etag).status_code, 200)
+
+    def test_archiving_changes_the_etag(self):
+        self.add_show(self.artist_id, self.venue_id, days_from_now=-200)
+        etag = self.etag()
+
+        cutoff = datetime.datetime.now() - datetime.timedelta(days=90)
+        self.assertEqual(list(archive_shows(db.session, cutoff, 10)), [1])
+
+        self.assertEqual(self.revalidate(etag).status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import datetime
+import unittest
+
+from counters import roll_past_shows
+from models import db, Artist, Show, Venue
+from tests.support import AppTestCase
+
+
+class ShowCountersTest(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.venue_id = self.add_venue("The Musical Hop")
+        self.artist_id = self.add_artist("Guns N Petals")
+
+    def create_show(self, start_time):
+        self.client.post(
+            "/shows/create",
+            data={
+                "artist_id": str(self.artist_id),
+                "venue_id": str(self.venue_id),
+                "start_time": f"{start_time:%Y-%m-%d %H:%M:%S}",
+            },
+        )
+
+    def counters(self, model, entity_id):
+        db.session.expire_all()
+        entity = model.query.get(entity_id)
+        return entity.upcoming_shows_count, entity.past_shows_count, entity.next_show_at
+
+    def test_creating_shows_bumps_both_counters(self):
+        now = datetime.datetime.now().replace(microsecond=0)
+        later = now + datetime.timedelta(days=30)
+        sooner = now + datetime.timedelta(days=10)
+        self.create_show(later)
+        self.create_show(sooner)
+        self.create_show(now - datetime.timedelta(days=10))
+
+        for model, entity_id in [(Venue, self.venue_id), (Artist, self.artist_id)]:
+            with self.subTest(model=model.__name__):
+                self.assertEqual(self.counters(model, entity_id), (2, 1, sooner))
+
+    def test_rolling_moves_started_shows_to_past(self):
+        self.create_show(datetime.datetime.now() + datetime.timedelta(days=1))
+        # As if the show had started since it was booked.
+        started = datetime.datetime.now() - datetime.timedelta(hours=1)
+        Show.query.update({Show.start_time: started})
+        Venue.query.update({Venue.next_show_at: started})
+        db.session.commit()
+
+        roll_past_shows(db.session)
+        db.session.commit()
+
+        self.assertEqual(self.counters(Venue, self.venue_id), (0, 1, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
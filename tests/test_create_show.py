@@ -0,0 +1,48 @@
+import datetime
+import unittest
+
+from models import Show
+from tests.support import AppTestCase
+
+
+class CreateShowDurationTest(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.artist_id = self.add_artist("Guns N Petals")
+        self.venue_id = self.add_venue("The Musical Hop")
+
+    def submit(self, duration):
+        return self.client.post(
+            "/shows/create",
+            data={
+                "artist_id": str(self.artist_id),
+                "venue_id": str(self.venue_id),
+                "start_time": "2030-05-01 20:00:00",
+                "duration": duration,
+            },
+        )
+
+    def test_durations_outside_the_form_range_are_rejected(self):
+        for duration in ["abc", "-30", "0", "5", "14", "721"]:
+            with self.subTest(duration=duration):
+                response = self.submit(duration)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn(b"The duration must be", response.data)
+                self.assertEqual(Show.query.count(), 0)
+
+    def test_duration_sets_the_end_time(self):
+        self.submit("90")
+
+        show = Show.query.one()
+        duration = show.end_time - show.start_time
+        self.assertEqual(duration, datetime.timedelta(minutes=90))
+
+    def test_blank_duration_uses_the_default(self):
+        self.submit("")
+
+        show = Show.query.one()
+        self.assertEqual(show.end_time - show.start_time, datetime.timedelta(hours=2))
+
+
+if __name__ == "__main__":
+    unittest.main()
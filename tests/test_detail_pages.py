@@ -0,0 +1,55 @@
+import unittest
+
+from app import load_detail_page
+from models import Artist, Venue
+from tests.support import AppTestCase
+
+
+class DetailPageTest(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.venue_id = self.add_venue("The Musical Hop", genres=("Jazz", "Folk"))
+        self.artist_id = self.add_artist("Guns N Petals")
+        self.other_artist_id = self.add_artist("Matt Quevedo")
+        self.add_show(self.artist_id, self.venue_id, days_from_now=3)
+        self.add_show(self.other_artist_id, self.venue_id, days_from_now=-2)
+        self.add_show(self.artist_id, self.venue_id, days_from_now=-5)
+
+    def test_venue_shows_are_split_into_past_and_upcoming(self):
+        venue, genres, past_shows, upcoming_shows = load_detail_page(
+            Venue, self.venue_id
+        )
+
+        self.assertEqual(venue.name, "The Musical Hop")
+        self.assertEqual(sorted(genres), ["Folk", "Jazz"])
+        self.assertEqual(
+            [show["artist_name"] for show in past_shows],
+            ["Guns N Petals", "Matt Quevedo"],
+        )
+        self.assertEqual(
+            [show["artist_id"] for show in upcoming_shows], [self.artist_id]
+        )
+
+    def test_artist_shows_name_the_venue(self):
+        _, _, past_shows, upcoming_shows = load_detail_page(Artist, self.artist_id)
+
+        self.assertEqual(len(past_shows), 1)
+        self.assertEqual(upcoming_shows[0]["venue_name"], "The Musical Hop")
+
+    def test_missing_entity(self):
+        missing_id = self.venue_id + 100
+
+        self.assertIsNone(load_detail_page(Venue, missing_id))
+        self.assertEqual(self.client.get(f"/venues/{missing_id}").status_code, 404)
+
+    def test_pages_render(self):
+        for path in [f"/venues/{self.venue_id}", f"/artists/{self.artist_id}"]:
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn(b"Something went wrong", response.data)
+                self.assertIn(b"The Musical Hop", response.data)
+
+
+if __name__ == "__main__":
+    unittest.main()
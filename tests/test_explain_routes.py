@@ -0,0 +1,30 @@
+import unittest
+
+from app import page_cache
+from tests.support import AppTestCase
+
+
+class ExplainRoutesTest(AppTestCase):
+    def test_reports_queries_of_cached_pages(self):
+        venue_id = self.add_venue("The Musical Hop")
+        artist_id = self.add_artist("Guns N Petals")
+        self.add_show(artist_id, venue_id, days_from_now=1)
+
+        ttl, page_cache.ttl = page_cache.ttl, 60
+        self.addCleanup(setattr, page_cache, "ttl", ttl)
+        paths = ["/venues", "/artists", "/shows"]
+        paths += [f"/venues/{venue_id}", f"/artists/{artist_id}"]
+        for path in paths:
+            self.client.get(path)
+
+        result = self.app.test_cli_runner().invoke(args=["explain-routes"])
+
+        self.assertIsNone(result.exception)
+        self.assertNotIn("no queries captured", result.output)
+        for path in paths:
+            self.assertIn(path + "\n", result.output)
+        self.assertEqual(page_cache.ttl, 60)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+from facets import facet_counts, rebuild_facet_counts
+from models import db, Venue
+from tests.support import AppTestCase
+
+
+CITIES = {"CA": "San Francisco", "NY": "New York"}
+
+
+class FacetCountTest(AppTestCase):
+    """Counts kept up by the venue views match a recount from the table."""
+
+    def submit_venue(self, path, name, state, genres):
+        self.client.post(
+            path,
+            data={
+                "name": name,
+                "city": CITIES[state],
+                "state": state,
+                "address": "1 Main St",
+                "phone": "555-555-5555",
+                "genres": genres,
+                "facebook_link": "https://www.facebook.com/venue",
+            },
+        )
+
+    def assert_counts_match_a_recount(self):
+        kept = facet_counts(db.session, Venue)
+        rebuild_facet_counts(db.session)
+        self.assertEqual(kept, facet_counts(db.session, Venue))
+        return kept
+
+    def test_create(self):
+        self.submit_venue("/venues/create", "The Musical Hop", "CA", ["Jazz", "Folk"])
+        self.submit_venue("/venues/create", "The Dueling Pianos Bar", "NY", ["Jazz"])
+
+        counts = self.assert_counts_match_a_recount()
+        self.assertEqual(counts["genre"], [("Jazz", 2), ("Folk", 1)])
+        self.assertEqual(counts["seeking"], [("no", 2)])
+
+    def test_edit_and_delete(self):
+        self.submit_venue("/venues/create", "The Musical Hop", "CA", ["Jazz"])
+        self.submit_venue("/venues/create", "Park Square", "CA", ["Jazz"])
+        first, second = [venue_id for (venue_id,) in db.session.query(Venue.id)]
+
+        self.submit_venue(f"/venues/{first}/edit", "The Musical Hop", "NY", ["Pop"])
+        self.client.post(f"/venues/{second}/delete")
+
+        counts = self.assert_counts_match_a_recount()
+        self.assertEqual(counts["state"], [("NY", 1)])
+        self.assertEqual(counts["city"], [("New York, NY", 1)])
+        self.assertEqual(counts["genre"], [("Pop", 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
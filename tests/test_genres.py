@@ -0,0 +1,23 @@
+import unittest
+
+from forms import ArtistForm, VenueForm
+from genres import GENRE_BITS, GENRE_NAMES
+from models import db, Genre
+from tests.support import AppTestCase
+
+
+class GenreListTest(AppTestCase):
+    def test_forms_offer_the_genre_list(self):
+        with self.app.test_request_context():
+            for form in (VenueForm(), ArtistForm()):
+                with self.subTest(form=type(form).__name__):
+                    names = [value for value, _ in form.genres.choices]
+                    self.assertEqual(names, GENRE_NAMES)
+
+    def test_created_table_holds_the_mask_bits(self):
+        rows = db.session.query(Genre.id, Genre.name).order_by(Genre.id)
+        self.assertEqual({name: 1 << genre_id for genre_id, name in rows}, GENRE_BITS)
+
+
+if __name__ == "__main__":
+    unittest.main()
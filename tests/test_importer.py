@@ -0,0 +1,64 @@
+import datetime
+import io
+import os
+import tempfile
+import unittest
+
+from importer import import_file, validate_row
+from models import db, Artist
+from tests.support import AppTestCase
+
+
+class ValidateShowRowTest(AppTestCase):
+    def test_row_with_start_time(self):
+        record, errors = validate_row(
+            "shows",
+            {"artist_id": "1", "venue_id": "2", "start_time": "2030-05-01 20:00:00"},
+        )
+        self.assertIsNone(errors)
+        self.assertEqual(record["start_time"], datetime.datetime(2030, 5, 1, 20))
+
+    def test_row_without_start_time_is_rejected(self):
+        record, errors = validate_row("shows", {"artist_id": "1", "venue_id": "2"})
+        self.assertIsNone(record)
+        self.assertIn("start_time", errors)
+
+    def test_row_with_blank_start_time_is_rejected(self):
+        record, errors = validate_row(
+            "shows", {"artist_id": "1", "venue_id": "2", "start_time": ""}
+        )
+        self.assertIsNone(record)
+        self.assertIn("start_time", errors)
+
+
+class ImportArtistsTest(AppTestCase):
+    def import_csv(self, kind, text):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, f"{kind}.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+        rejects = io.StringIO()
+        reports = list(import_file(db.session, kind, path, 100, rejects))
+        return reports, rejects.getvalue()
+
+    def test_blank_optional_fields_get_column_defaults(self):
+        reports, rejects = self.import_csv(
+            "artists",
+            "name,city,state,phone,image_link,genres,facebook_link\n"
+            "Guns N Petals,San Francisco,CA,,,Rock n Roll,"
+            "https://www.facebook.com/GunsNPetals\n",
+        )
+
+        self.assertEqual(rejects, "")
+        self.assertEqual(reports[0]["inserted"], 1)
+        artist = Artist.query.one()
+        self.assertEqual(artist.phone, "")
+        self.assertEqual(
+            artist.image_link, Artist.__table__.c.image_link.default.arg
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
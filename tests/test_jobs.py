@@ -0,0 +1,84 @@
+import datetime
+import unittest
+
+from jobs import (
+    DONE,
+    FAILED,
+    JOB_LEASE,
+    JOB_RETENTION,
+    QUEUED,
+    RUNNING,
+    claim_next,
+    enqueue,
+    purge_finished_jobs,
+    renew_leases,
+    requeue_expired,
+)
+from models import db, Job
+from tests.support import AppTestCase
+
+
+class JobLeaseTest(AppTestCase):
+    def claim_stale_job(self, max_attempts=5):
+        enqueue(db.session, "roll_past_shows", max_attempts=max_attempts)
+        db.session.commit()
+        job_id = claim_next(db.session, "host:1")
+        # As if the job had been running for longer than a lease.
+        Job.query.filter(Job.id == job_id).update(
+            {Job.locked_at: datetime.datetime.utcnow() - JOB_LEASE * 2}
+        )
+        db.session.commit()
+        return job_id
+
+    def test_renewed_lease_is_not_requeued(self):
+        job_id = self.claim_stale_job()
+
+        self.assertEqual(renew_leases(db.session, "host:1", [job_id]), 1)
+        self.assertEqual(requeue_expired(db.session), 0)
+        self.assertEqual(Job.query.get(job_id).status, RUNNING)
+
+    def test_other_workers_cannot_renew(self):
+        job_id = self.claim_stale_job()
+
+        self.assertEqual(renew_leases(db.session, "host:2", [job_id]), 0)
+        self.assertEqual(requeue_expired(db.session), 1)
+
+    def test_expired_job_with_attempts_left_is_queued_again(self):
+        job_id = self.claim_stale_job(max_attempts=2)
+
+        self.assertEqual(requeue_expired(db.session), 1)
+        self.assertEqual(Job.query.get(job_id).status, QUEUED)
+
+    def test_expired_job_out_of_attempts_fails(self):
+        job_id = self.claim_stale_job(max_attempts=1)
+
+        self.assertEqual(requeue_expired(db.session), 1)
+        job = Job.query.get(job_id)
+        self.assertEqual(job.status, FAILED)
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(job.last_error, "Lease expired")
+
+
+class JobRetentionTest(AppTestCase):
+    def add_job(self, status, finished_ago):
+        job = enqueue(db.session, "roll_past_shows")
+        job.status = status
+        if finished_ago is not None:
+            job.finished_at = datetime.datetime.utcnow() - finished_ago
+        db.session.commit()
+        return job.id
+
+    def test_only_old_finished_jobs_are_purged(self):
+        old = JOB_RETENTION + datetime.timedelta(days=1)
+        self.add_job(DONE, old)
+        self.add_job(FAILED, old)
+        recent = self.add_job(DONE, datetime.timedelta(hours=1))
+        queued = self.add_job(QUEUED, None)
+
+        self.assertEqual(purge_finished_jobs(db.session), 2)
+        remaining = sorted(job_id for (job_id,) in db.session.query(Job.id))
+        self.assertEqual(remaining, sorted([recent, queued]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+from tests.support import AppTestCase
+
+
+class PageCacheTest(AppTestCase):
+    config = {"PAGE_CACHE_TTL": 60}
+
+    def get(self, path):
+        # A fresh client each time, so that flashes from posts do not bypass the cache.
+        response = self.app.test_client().get(path)
+        self.assertEqual(response.status_code, 200)
+        return response.get_data(as_text=True)
+
+    def test_listing_is_served_from_the_cache(self):
+        self.add_venue("The Musical Hop")
+        self.assertIn("The Musical Hop", self.get("/venues"))
+
+        # Written behind the views' back, so nothing is purged.
+        self.add_venue("Park Square Live Music & Coffee")
+        self.assertNotIn("Park Square", self.get("/venues"))
+
+    def test_writes_purge_the_pages_they_change(self):
+        venue_id = self.add_venue("The Musical Hop")
+        artist_id = self.add_artist("Guns N Petals")
+        self.assertNotIn("Guns N Petals", self.get(f"/venues/{venue_id}"))
+        self.get("/shows")
+
+        self.client.post(
+            "/shows/create",
+            data={
+                "artist_id": str(artist_id),
+                "venue_id": str(venue_id),
+                "start_time": "2035-05-01 20:00:00",
+            },
+        )
+
+        self.assertIn("Guns N Petals", self.get(f"/venues/{venue_id}"))
+        self.assertIn("Guns N Petals", self.get("/shows"))
+
+    def test_variants_are_kept_per_query_string(self):
+        self.add_venue("The Musical Hop")
+        self.add_venue("Park Square Live Music & Coffee", city="New York", state="NY")
+
+        self.assertIn("The Musical Hop", self.get("/venues"))
+        self.assertNotIn("The Musical Hop", self.get("/venues?state=NY"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+
+from models import db
+from query_plans import captured_statements
+from tests.support import AppTestCase
+
+
+class QueryCountTest(AppTestCase):
+    """Listing and detail pages issue as many queries for many rows as for one."""
+
+    def queries_for(self, path):
+        with captured_statements(db.engine) as statements:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        # Views report their own failures as a flash rather than a 500.
+        self.assertNotIn(b"Something went wrong", response.data)
+        return len(statements)
+
+    def add_catalog(self, venues, start=0):
+        """Add `venues` venues in several cities, each with a past and an
+        upcoming show by an artist of its own."""
+        venue_ids = []
+        for number in range(start, start + venues):
+            venue_id = self.add_venue(f"Venue {number}", city=f"City {number % 3}")
+            artist_id = self.add_artist(f"Artist {number}")
+            self.add_show(artist_id, venue_id, days_from_now=-number - 1)
+            self.add_show(artist_id, venue_id, days_from_now=number + 1)
+            venue_ids.append(venue_id)
+        return venue_ids
+
+    def test_listings(self):
+        self.add_catalog(1)
+        paths = ["/venues", "/artists", "/shows"]
+        few = {path: self.queries_for(path) for path in paths}
+
+        self.add_catalog(20, start=1)
+        for path, count in few.items():
+            with self.subTest(path=path):
+                self.assertEqual(self.queries_for(path), count)
+
+    def test_venue_detail(self):
+        quiet_venue = self.add_venue("Quiet Venue")
+        self.add_show(self.add_artist("Solo Artist"), quiet_venue, days_from_now=1)
+
+        busy_venue = self.add_venue("Busy Venue")
+        for number in range(10):
+            artist_id = self.add_artist(f"Touring Artist {number}")
+            self.add_show(artist_id, busy_venue, days_from_now=number - 5)
+
+        self.assertEqual(
+            self.queries_for(f"/venues/{busy_venue}"),
+            self.queries_for(f"/venues/{quiet_venue}"),
+        )
+
+    def test_artist_detail(self):
+        quiet_artist = self.add_artist("Quiet Artist")
+        self.add_show(quiet_artist, self.add_venue("Local Venue"), days_from_now=1)
+
+        busy_artist = self.add_artist("Busy Artist")
+        for number in range(10):
+            venue_id = self.add_venue(f"Tour Stop {number}", city=f"City {number}")
+            self.add_show(busy_artist, venue_id, days_from_now=number - 5)
+
+        self.assertEqual(
+            self.queries_for(f"/artists/{busy_artist}"),
+            self.queries_for(f"/artists/{quiet_artist}"),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+from collections import Counter
+
+from app import replicas
+from replicas import STICKY_COOKIE, copy_sqlite_database
+from tests.support import AppTestCase
+
+
+class ReplicaRoutingTest(AppTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.replica_url = "sqlite:///" + os.path.join(
+            directory.name, "replica.sqlite3"
+        )
+        self.config = {
+            "SQLALCHEMY_BINDS": {"replica_0": self.replica_url},
+            "READ_YOUR_WRITES_SECONDS": 10,
+        }
+        super().setUp()
+
+        self.add_venue("The Musical Hop")
+        primary_url = self.app.config["SQLALCHEMY_DATABASE_URI"]
+        copy_sqlite_database(primary_url, self.replica_url)
+        # Written after the copy, as if the replica had not caught up yet.
+        self.client.post(
+            "/venues/create",
+            data={
+                "name": "Park Square Live Music & Coffee",
+                "city": "San Francisco",
+                "state": "CA",
+                "address": "34 Whiskey Moore Ave",
+                "phone": "415-000-1234",
+                "genres": ["Jazz"],
+                "facebook_link": "https://www.facebook.com/ParkSquare",
+            },
+        )
+
+    def reads_of(self, client, path):
+        """The page, and where its queries went."""
+        before = Counter(replicas.stats()["reads"])
+        page = client.get(path).get_data(as_text=True)
+        return page, Counter(replicas.stats()["reads"]) - before
+
+    def test_writer_reads_from_the_primary(self):
+        cookies = {cookie.name for cookie in self.client.cookie_jar}
+        self.assertIn(STICKY_COOKIE, cookies)
+
+        page, reads = self.reads_of(self.client, "/venues")
+        self.assertIn("Park Square", page)
+        self.assertEqual(reads, Counter(primary=1))
+
+    def test_other_users_read_from_a_replica(self):
+        page, reads = self.reads_of(self.app.test_client(), "/venues")
+
+        self.assertIn("The Musical Hop", page)
+        self.assertNotIn("Park Square", page)
+        self.assertEqual(reads, Counter(replica_0=1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+import datetime
+import unittest
+
+from models import db, Venue
+from scheduling import conflicting_shows
+from tests.support import AppTestCase
+from tombstones import tombstone_venue
+
+
+class ConflictingShowsTest(AppTestCase):
+    def test_shows_at_deleted_venues_do_not_conflict(self):
+        artist_id = self.add_artist("Guns N Petals")
+        old_venue_id = self.add_venue("The Musical Hop")
+        new_venue_id = self.add_venue("Park Square Live Music & Coffee")
+        self.add_show(artist_id, old_venue_id, days_from_now=1)
+
+        start = datetime.datetime.now() + datetime.timedelta(days=1)
+        end = start + datetime.timedelta(hours=1)
+        conflicts = conflicting_shows(db.session, artist_id, new_venue_id, start, end)
+        self.assertEqual(len(conflicts), 1)
+
+        tombstone_venue(Venue.query.get(old_venue_id))
+        db.session.commit()
+
+        conflicts = conflicting_shows(db.session, artist_id, new_venue_id, start, end)
+        self.assertEqual(conflicts, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
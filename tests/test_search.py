@@ -0,0 +1,73 @@
+import unittest
+
+from app import search_results
+from models import Artist, Venue
+from tests.support import AppTestCase
+
+
+class SearchTest(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_venue("The Musical Hop", genres=("Jazz", "Folk"))
+        self.add_venue("Park Square Live Music & Coffee", city="New York", state="NY")
+        self.add_artist("Guns N Petals", genres=("Rock n Roll",))
+        self.add_artist("Matt Quevedo", city="New York", state="NY")
+
+    def search(self, path, term):
+        response = self.client.post(path, data={"search_term": term})
+        self.assertEqual(response.status_code, 200)
+        return response.get_data(as_text=True)
+
+    def test_venue_search(self):
+        # An indexed term, and one too short for the index, matched with LIKE.
+        for term in ["musical", "Ho"]:
+            with self.subTest(term=term):
+                page = self.search("/venues/search", term)
+                self.assertIn("The Musical Hop", page)
+                self.assertNotIn("Park Square", page)
+
+        page = self.search("/venues/search", "NY")
+        self.assertIn("Park Square", page)
+        self.assertNotIn("The Musical Hop", page)
+
+    def test_venue_search_by_genre(self):
+        page = self.search("/venues/search", "folk")
+        self.assertIn("The Musical Hop", page)
+        self.assertNotIn("Park Square", page)
+
+    def test_artist_search(self):
+        page = self.search("/artists/search", "petals")
+        self.assertIn("Guns N Petals", page)
+        self.assertNotIn("Matt Quevedo", page)
+
+        page = self.search("/artists/search", "A")
+        self.assertIn("Guns N Petals", page)
+        self.assertIn("Matt Quevedo", page)
+
+
+class SearchUpcomingCountTest(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.venue_id = self.add_venue("The Musical Hop")
+        self.artist_id = self.add_artist("Guns N Petals")
+        for year in [2019, 2035, 2036]:
+            self.client.post(
+                "/shows/create",
+                data={
+                    "artist_id": str(self.artist_id),
+                    "venue_id": str(self.venue_id),
+                    "start_time": f"{year}-05-01 20:00:00",
+                },
+            )
+
+    def test_results_count_upcoming_shows(self):
+        with self.app.test_request_context():
+            for model, term in [(Venue, "musical"), (Artist, "petals")]:
+                with self.subTest(model=model.__name__):
+                    results = search_results(model, term)
+                    self.assertEqual(results["count"], 1)
+                    self.assertEqual(results["data"][0]["num_upcoming_shows"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from app import page_cache
+from shared_cache import LRUCache, SQLiteCache, TieredCache
+from tests.support import AppTestCase
+
+
+class SharedCacheTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "cache.sqlite3")
+
+    def worker(self, max_bytes=1024):
+        """A TieredCache as one gunicorn worker would build it."""
+        return TieredCache(LRUCache(16), SQLiteCache(self.path, max_bytes))
+
+    def test_workers_see_each_others_values_and_purges(self):
+        first, second = self.worker(), self.worker()
+
+        first.set("page", "", b"rendered", 60, first.generation("page"))
+        self.assertEqual(second.get("page", "", second.generation("page")), b"rendered")
+
+        second.invalidate("page")
+        self.assertIsNone(first.get("page", "", first.generation("page")))
+
+    def test_byte_total_follows_the_entries(self):
+        cache = SQLiteCache(self.path, max_bytes=250)
+        for number in range(10):
+            cache.set(f"key {number}", b"x" * 100, expires_at=2e9)
+        cache.set("key 9", b"x" * 50, expires_at=2e9)
+
+        with sqlite3.connect(self.path) as connection:
+            (total,) = connection.execute("SELECT stored_bytes FROM totals").fetchone()
+            (stored,) = connection.execute(
+                "SELECT coalesce(sum(size), 0) FROM entries"
+            ).fetchone()
+        self.assertEqual(total, stored)
+        self.assertLessEqual(total, 250)
+
+
+class SharedPageCacheTest(AppTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.config = {
+            "PAGE_CACHE_TTL": 60,
+            "SHARED_CACHE_PATH": os.path.join(directory.name, "cache.sqlite3"),
+        }
+        super().setUp()
+
+    def test_pages_are_shared_between_workers(self):
+        self.add_venue("The Musical Hop")
+        self.client.get("/venues")
+
+        # As if the next request reached another worker.
+        page_cache.store.local.clear()
+        response = self.client.get("/venues")
+
+        self.assertIn(b"The Musical Hop", response.data)
+        self.assertEqual(page_cache.stats()["shared_hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
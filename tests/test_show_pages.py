@@ -0,0 +1,60 @@
+import html
+import re
+import unittest
+
+from tests.support import AppTestCase
+
+
+class ShowPaginationTest(AppTestCase):
+    config = {"SHOWS_PAGE_SIZE": 2}
+
+    def setUp(self):
+        super().setUp()
+        venue_id = self.add_venue("The Musical Hop")
+        for number in range(5):
+            artist_id = self.add_artist(f"Artist {number}")
+            self.add_show(artist_id, venue_id, days_from_now=number + 1)
+
+    def page(self, path):
+        """Artists on a page of /shows, and its earlier and later links."""
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        text = response.data.decode()
+        links = {
+            direction: html.unescape(href)
+            for direction, href in re.findall(
+                r'<li class="(\w+)"><a href="([^"]+)"', text
+            )
+        }
+        artists = re.findall(r'<a href="/artists/\d+">([^<]+)</a>', text)
+        return artists, links.get("previous"), links.get("next")
+
+    def test_later_pages_follow_each_other(self):
+        artists, earlier, later = self.page("/shows")
+        self.assertEqual(artists, ["Artist 0", "Artist 1"])
+        self.assertIsNone(earlier)
+
+        artists, earlier, later = self.page(later)
+        self.assertEqual(artists, ["Artist 2", "Artist 3"])
+        self.assertIsNotNone(earlier)
+
+        artists, _, later = self.page(later)
+        self.assertEqual(artists, ["Artist 4"])
+        self.assertIsNone(later)
+
+    def test_earlier_page_comes_back(self):
+        _, _, later = self.page("/shows")
+        _, _, later = self.page(later)
+        _, earlier, _ = self.page(later)
+
+        artists, earlier, _ = self.page(earlier)
+        self.assertEqual(artists, ["Artist 2", "Artist 3"])
+
+        artists, earlier, later = self.page(earlier)
+        self.assertEqual(artists, ["Artist 0", "Artist 1"])
+        self.assertIsNone(earlier)
+        self.assertIsNotNone(later)
+
+
+if __name__ == "__main__":
+    unittest.main()
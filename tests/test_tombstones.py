@@ -0,0 +1,28 @@
+import unittest
+
+from counters import refresh_show_counters
+from models import db, Artist
+from tests.support import AppTestCase
+
+
+class DeleteVenueCountersTest(AppTestCase):
+    def test_artist_counters_drop_the_deleted_venues_shows(self):
+        artist_id = self.add_artist("Guns N Petals")
+        kept_venue_id = self.add_venue("Park Square Live Music & Coffee")
+        deleted_venue_id = self.add_venue("The Musical Hop")
+        self.add_show(artist_id, kept_venue_id, days_from_now=2)
+        self.add_show(artist_id, deleted_venue_id, days_from_now=1)
+        self.add_show(artist_id, deleted_venue_id, days_from_now=-1)
+        refresh_show_counters(db.session, Artist)
+        db.session.commit()
+
+        # No worker runs here, so the venue's shows are not purged.
+        self.client.post(f"/venues/{deleted_venue_id}/delete")
+
+        artist = Artist.query.get(artist_id)
+        self.assertEqual(artist.upcoming_shows_count, 1)
+        self.assertEqual(artist.past_shows_count, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import datetime
+
+from sqlalchemy import func, true
+
+from models import Venue, Venue_Genre, Artist, Show, Show_Archive
+from counters import refresh_show_counters
+
+# ----------------------------------------------------------------------------#
+# Venue deletion.
+# ----------------------------------------------------------------------------#
+
+# Deleting a venue with years of shows in one transaction would hold locks on
+# `shows` for as long as the cascade takes. Instead, the venue is tombstoned:
+# setting `deleted_at` hides it from every page at once. Its shows, archived
+# shows and genres are then removed in short batches outside the request.
+# The tombstone row is kept so that progress can still be reported.
+
+DELETION_BATCH_SIZE = 1000
+
+# Rows removed with a venue, in the order they are purged.
+VENUE_DEPENDENTS = [
+    ("shows", Show),
+    ("shows_archive", Show_Archive),
+    ("genres", Venue_Genre),
+]
+
+
+def live(model):
+    """Criterion excluding tombstoned rows; always true for models without them."""
+    deleted_at = getattr(model, "deleted_at", None)
+    return true() if deleted_at is None else deleted_at.is_(None)
+
+
+def tombstone_venue(venue):
+    now = datetime.datetime.utcnow()
+    venue.deleted_at = now
+    venue.updated_at = now
+    # Also drops the venue from the search index.
+    venue.search_document = None
+
+
+def purge_venue(session, venue_id, batch_size=DELETION_BATCH_SIZE):
+    """Delete the shows and genres of a tombstoned venue in short transactions.
+
+    The counters of the artists whose shows go are refreshed in the same
+    transaction as each batch. Yields the number of rows removed per batch.
+    """
+    for _, model in VENUE_DEPENDENTS:
+        columns = [model.id]
+        if hasattr(model, "artist_id"):
+            columns.append(model.artist_id)
+
+        while True:
+            rows = (
+                session.query(*columns)
+                .filter(model.venue_id == venue_id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+
+            session.execute(
+                model.__table__.delete().where(model.id.in_([row[0] for row in rows]))
+            )
+            artist_ids = {row[1] for row in rows if len(row) > 1}
+            if artist_ids:
+                refresh_show_counters(session, Artist, Artist.id.in_(artist_ids))
+            session.commit()
+
+            yield len(rows)
+
+
+def deletion_status(session, venue_id):
+    """Progress of a venue's deletion, or None if it is not being deleted."""
+    deleted_at = session.query(Venue.deleted_at).filter(Venue.id == venue_id).scalar()
+    if deleted_at is None:
+        return None
+
+    remaining = {
+        name: session.query(func.count(model.id))
+        .filter(model.venue_id == venue_id)
+        .scalar()
+        for name, model in VENUE_DEPENDENTS
+    }
+
+    return {
+        "venue_id": venue_id,
+        "status": "deleting" if any(remaining.values()) else "deleted",
+        "deleted_at": deleted_at.isoformat() + "Z",
+        "remaining": remaining,
+    }
+
+
+def venues_being_deleted(session):
+    """Ids of tombstoned venues that still have rows to purge."""
+    pending = set()
+    for _, model in VENUE_DEPENDENTS:
+        pending.update(
+            venue_id
+            for (venue_id,) in session.query(model.venue_id)
+            .join(Venue, Venue.id == model.venue_id)
+            .filter(Venue.deleted_at.isnot(None))
+            .distinct()
+        )
+    return sorted(pending)